@@ -0,0 +1,487 @@
+"""Benchmark suite for the hosts-file and config hot paths.
+
+Generates synthetic hosts files and configs, times the operations below and
+writes the results as JSON. Results are compared against stored baselines
+and a case regresses when it is slower than its baseline by more than the
+threshold.
+
+    hosts.parse          HostsFile.parse of the whole file
+    hosts.edit           add and remove a 100-host group on the parsed model
+    hosts.update_group   enable + disable a 100-host group
+    hosts.apply          whole-config reconciliation (no-op and full)
+    config.toggle        toggle a group and read get_blocked_hosts
+    config.load/save     load_config (cold JSON and cached) and save_config
+    hosts.sanitize       sanitize_hosts over a host list
+    config.lint          lint_config over every group
+    watcher.latency      ConfigWatcher reaction time to a config write
+    importer.build_store streaming blocklist import into a DomainStore
+    trie.build/lookup    DomainTrie construction and 1000 lookups
+    dns.resolve.*        sinkhole answers for blocked, cached and forwarded names
+    hosts.render/parse   the managed section in each hosts_format
+    fanout.apply_many    one config applied to many hosts files
+    hosts.update_group.streamed
+                         the same update on a memory-mapped large file
+    journal.rollback     undo a large group import
+    names.*              validate_host vs normalize_hosts on a name list
+
+Usage:
+    python benchmarks/suite.py [--profile quick|full] [--output FILE]
+                               [--baseline FILE] [--update-baseline] [--check]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config, ConfigWatcher, get_blocked_hosts, load_config, save_config
+from blocker.dns import RCODE_NOERROR, TYPE_A, DnsSinkhole, build_response, parse_question
+from blocker.fanout import apply_many
+from blocker.hosts import BLOCK_IP, HostsFile, HostsFormat, HostsManager, sanitize_hosts, validate_host
+from blocker.importer import build_store, iter_domains
+from blocker.journal import Journal, journal_path
+from blocker.lint import lint_config
+from blocker.metrics import Metrics
+from blocker.names import normalize_host, normalize_hosts
+from blocker.trie import DomainTrie
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+
+PROFILES = {
+    "smoke": {
+        "lines": [100],
+        "configs": [(2, 50)],
+        "names": [1_000],
+        "queries": [200],
+        "targets": [(4, 2)],
+        "stream_mb": [1],
+        "repeat": 1,
+    },
+    "quick": {
+        "lines": [1_000, 10_000],
+        "configs": [(10, 1_000), (100, 10_000)],
+        "names": [10_000, 100_000],
+        "queries": [5_000],
+        "targets": [(50, 8)],
+        "stream_mb": [20],
+        "repeat": 3,
+    },
+    "full": {
+        "lines": [1_000, 10_000, 100_000, 1_000_000],
+        "configs": [(10, 1_000), (100, 100_000), (1_000, 1_000_000)],
+        "names": [10_000, 100_000, 1_000_000],
+        "queries": [20_000],
+        "targets": [(500, 16)],
+        "stream_mb": [200],
+        "repeat": 3,
+    },
+}
+
+GROUP_SIZE = 100
+FORMATS = {
+    "classic": HostsFormat(),
+    "compact": HostsFormat.compact(),
+    "compact+ipv6": HostsFormat.compact(ipv6=True),
+}
+DNS_CONCURRENCY = 100
+TRIE_QUERIES = 1_000
+
+
+def make_hosts_file(path: str, lines: int) -> None:
+    """Hosts file mixing comments, foreign entries and legacy blocked entries."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# synthetic hosts file\n127.0.0.1 localhost\n::1 localhost\n")
+        for i in range(lines - 3):
+            kind = i % 10
+            if kind == 0:
+                f.write(f"# comment {i}\n")
+            elif kind < 4:
+                f.write(f"{BLOCK_IP} legacy{i}.example.com\n")
+            else:
+                f.write(f"10.{i % 250}.{i % 200}.{i % 100} host{i}.lan host{i} # note\n")
+
+
+def make_config(groups: int, hosts: int) -> Config:
+    """Config of overlapping groups; every other group is enabled."""
+    per_group = max(1, hosts // groups)
+    config = Config()
+    for g in range(groups):
+        # Half of each group overlaps with the next one
+        names = [f"h{(g * per_group // 2) + i}.example.com" for i in range(per_group)]
+        config.groups[f"group{g}"] = BlockGroup(on=g % 2 == 0, description=f"Group {g}", hosts=names)
+    return config
+
+
+def make_blocklist(path: str, entries: int) -> None:
+    """Blocklist mixing hosts-file, Adblock and bare-name lines."""
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(entries):
+            kind = i % 3
+            if kind == 0:
+                f.write(f"0.0.0.0 ads{i}.example{i % 97}.com\n")
+            elif kind == 1:
+                f.write(f"||track{i}.example{i % 89}.net^\n")
+            else:
+                f.write(f"Pixel{i}.Example.org.\n")
+
+
+def make_query(name: str, msg_id: int) -> bytes:
+    qname = b"".join(bytes([len(label)]) + label.encode() for label in name.split(".")) + b"\0"
+    return struct.pack("!HHHHHH", msg_id, 0x0100, 1, 0, 0, 0) + qname + struct.pack("!HH", TYPE_A, 1)
+
+
+def measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], object]] = None) -> float:
+    """Median wall time of ``fn`` in seconds."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_hosts(lines: int, repeat: int, tmp: str) -> dict[str, float]:
+    path = os.path.join(tmp, f"hosts-{lines}")
+    make_hosts_file(path, lines)
+    manager = HostsManager(path)
+    group = [f"group{i}.example.com" for i in range(GROUP_SIZE)]
+    config = Config(groups={"g": BlockGroup(on=True, hosts=group)})
+
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    hosts_file = HostsFile.parse(content)
+
+    results = {}
+    results[f"hosts.parse[lines={lines}]"] = measure(lambda: HostsFile.parse(content), repeat)
+    results[f"hosts.edit[lines={lines}]"] = measure(
+        lambda: ([hosts_file.add(host) for host in group], [hosts_file.remove(host) for host in group]), repeat
+    )
+    results[f"hosts.update_group[lines={lines}]"] = measure(
+        lambda: (manager.update_group(group, enable=True), manager.update_group(group, enable=False)),
+        repeat,
+    )
+    results[f"hosts.apply.full[lines={lines}]"] = measure(
+        lambda: manager.apply(config), repeat, setup=lambda: make_hosts_file(path, lines)
+    )
+    manager.apply(config)
+    results[f"hosts.apply.noop[lines={lines}]"] = measure(lambda: manager.apply(config), repeat)
+    os.remove(path)
+    return results
+
+
+def bench_config(groups: int, hosts: int, repeat: int, tmp: str) -> dict[str, float]:
+    key = f"groups={groups},hosts={hosts}"
+    config = make_config(groups, hosts)
+    config.index  # build once, as the application does at startup
+
+    results = {}
+    results[f"hosts.sanitize[{key}]"] = measure(
+        lambda: [sanitize_hosts(group.hosts) for group in config.groups.values()], repeat
+    )
+    results[f"config.lint[{key}]"] = measure(lambda: lint_config(config), repeat)
+    results[f"config.toggle[{key}]"] = measure(
+        lambda: (config.toggle_group("group0"), len(get_blocked_hosts(config)),
+                 config.toggle_group("group0"), len(get_blocked_hosts(config))),
+        repeat,
+    )
+
+    path = os.path.join(tmp, f"config-{groups}-{hosts}.json")
+    cache = os.path.splitext(path)[0] + ".cache"
+    results[f"config.save[{key}]"] = measure(lambda: save_config(config, path), repeat)
+    results[f"config.load.cached[{key}]"] = measure(lambda: load_config(path), repeat)
+    results[f"config.load.cold[{key}]"] = measure(
+        lambda: load_config(path).index, repeat, setup=lambda: os.path.exists(cache) and os.remove(cache)
+    )
+    return results
+
+
+def bench_watcher(repeat: int, tmp: str) -> dict[str, float]:
+    path = os.path.join(tmp, "watched.json")
+    config = make_config(10, 100)
+    save_config(config, path)
+    fired = threading.Event()
+    watcher = ConfigWatcher(path, lambda diff: fired.set(), debounce=0.0)
+    watcher.start(interval=0.01)
+    latencies = []
+    try:
+        for _ in range(max(repeat, 3)):
+            fired.clear()
+            config.groups["group1"].on = not config.groups["group1"].on
+            start = time.perf_counter()
+            save_config(config, path)
+            if fired.wait(5):
+                latencies.append(time.perf_counter() - start)
+    finally:
+        watcher.stop()
+    return {"watcher.latency": statistics.median(latencies) if latencies else float("inf")}
+
+
+def bench_importer(entries: int, repeat: int, tmp: str) -> dict[str, float]:
+    path = os.path.join(tmp, f"blocklist-{entries}.txt")
+    make_blocklist(path, entries)
+    results = {f"importer.build_store[entries={entries}]": measure(lambda: build_store(iter_domains(path)), repeat)}
+    os.remove(path)
+    return results
+
+
+def bench_trie(rules: int, repeat: int) -> dict[str, float]:
+    hosts = [f"h{i}.d{i % 1000}.example.com" for i in range(rules)]
+    patterns = hosts[: rules - rules // 10] + [f"*.w{i}.example.org" for i in range(rules // 10)]
+    rng = random.Random(84)
+    queries = [rng.choice(hosts) for _ in range(TRIE_QUERIES // 2)]
+    queries += [f"miss{i}.d{i}.example.net" for i in range(TRIE_QUERIES // 2)]
+    trie = DomainTrie(patterns)
+    return {
+        f"trie.build[rules={rules}]": measure(lambda: DomainTrie(patterns), repeat),
+        f"trie.lookup[rules={rules}]": measure(lambda: [trie.is_blocked(q) for q in queries], repeat),
+    }
+
+
+class StubUpstream(asyncio.DatagramProtocol):
+    """Answers every query at once with 10.0.0.1."""
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        end = parse_question(data)[5]
+        self.transport.sendto(build_response(data, end, RCODE_NOERROR, [(TYPE_A, b"\x0a\x00\x00\x01")]), addr)
+
+
+async def _bench_dns(queries: int, repeat: int) -> dict[str, float]:
+    blocked = [f"ads{i}.example.com" for i in range(1_000)]
+    config = Config(groups={"ads": BlockGroup(on=True, hosts=blocked)})
+    loop = asyncio.get_running_loop()
+    upstream, _ = await loop.create_datagram_endpoint(StubUpstream, local_addr=("127.0.0.1", 0))
+    sinkhole = DnsSinkhole(config, upstream=upstream.get_extra_info("sockname")[:2])
+    semaphore = asyncio.Semaphore(DNS_CONCURRENCY)
+
+    async def one(i: int, name: str) -> None:
+        async with semaphore:
+            await sinkhole.resolve(make_query(name, i & 0xFFFF))
+
+    async def timed(names: list[str]) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i, name) for i, name in enumerate(names)))
+        return time.perf_counter() - start
+
+    cases = {
+        "blocked": lambda run: [blocked[i % len(blocked)] for i in range(queries)],
+        # Fresh names on every run so none of them is cached
+        "forward": lambda run: [f"site{i}.r{run}.example.org" for i in range(queries)],
+        "cached": lambda run: [f"site{i % 100}.example.org" for i in range(queries)],
+    }
+    results = {}
+    try:
+        for case, names in cases.items():
+            results[f"dns.resolve.{case}[queries={queries}]"] = statistics.median(
+                [await timed(names(run)) for run in range(repeat)]
+            )
+    finally:
+        await sinkhole.close()
+        upstream.close()
+    return results
+
+
+def bench_dns(queries: int, repeat: int) -> dict[str, float]:
+    return asyncio.run(_bench_dns(queries, repeat))
+
+
+def bench_format(count: int, repeat: int) -> dict[str, float]:
+    hosts = {f"h{i}.d{i % 5000}.example.com" for i in range(count)}
+    results = {}
+    for name, fmt in FORMATS.items():
+        hosts_file = HostsFile.parse("127.0.0.1 localhost\n", fmt)
+        hosts_file.add_all(hosts)
+        content = hosts_file.render()
+        results[f"hosts.render[format={name},hosts={count}]"] = measure(hosts_file.render, repeat)
+        results[f"hosts.parse[format={name},hosts={count}]"] = measure(lambda: HostsFile.parse(content, fmt), repeat)
+    return results
+
+
+def bench_fanout(targets: int, jobs: int, repeat: int, tmp: str) -> dict[str, float]:
+    config = Config(groups={"g": BlockGroup(on=True, hosts=[f"h{i}.example.com" for i in range(2_000)])})
+    content = "127.0.0.1 localhost\n" + "".join(f"10.0.0.{j % 250} host{j}\n" for j in range(200))
+    paths = [os.path.join(tmp, "roots", f"root{i}", "etc", "hosts") for i in range(targets)]
+    for path in paths:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def reset() -> None:
+        for path in paths:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+
+    results = {}
+    for workers in (1, jobs):
+        results[f"fanout.apply_many[targets={targets},jobs={workers}]"] = measure(
+            lambda: apply_many(config, paths, workers, metrics=Metrics()), repeat, setup=reset
+        )
+    shutil.rmtree(os.path.join(tmp, "roots"))
+    return results
+
+
+def bench_stream(megabytes: int, repeat: int, tmp: str) -> dict[str, float]:
+    path = os.path.join(tmp, f"hosts-{megabytes}mb")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"127.0.0.1 localhost\n{BLOCK_IP} legacy.example.com\n")
+        written, i = 0, 0
+        while written < megabytes << 20:
+            chunk = "".join(f"10.0.0.1 host{i + j}.lan\n" for j in range(10_000))
+            f.write(chunk)
+            written += len(chunk)
+            i += 10_000
+    manager = HostsManager(path, metrics=Metrics())
+    manager.stream_threshold = 1
+    group = [f"group{i}.example.com" for i in range(GROUP_SIZE)]
+    results = {
+        f"hosts.update_group.streamed[mb={megabytes}]": measure(
+            lambda: (manager.update_group(group, enable=True), manager.update_group(group, enable=False)),
+            repeat,
+        )
+    }
+    os.remove(path)
+    return results
+
+
+def bench_journal(count: int, repeat: int, tmp: str) -> dict[str, float]:
+    path = os.path.join(tmp, f"hosts-journal-{count}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("127.0.0.1 localhost\n" + "".join(f"10.0.0.{i % 250} lan{i}\n" for i in range(10_000)))
+    manager = HostsManager(path, metrics=Metrics(), journal=Journal(journal_path(path)))
+    hosts = [f"imported{i}.example.com" for i in range(count)]
+    results = {
+        f"journal.rollback[hosts={count}]": measure(
+            manager.rollback, repeat, setup=lambda: manager.update_group(hosts, enable=True)
+        )
+    }
+    os.remove(path)
+    os.remove(journal_path(path))
+    return results
+
+
+def bench_names(count: int, repeat: int) -> dict[str, float]:
+    canonical = [f"tracker{i}.ads{i % 977}.example.com" for i in range(count)]
+    # One name in ten needs case folding, a trailing dot stripped or IDNA
+    mixed = [
+        name if i % 10 else ("Tracker.Example.COM", "mc.yandex.ru.", "реклама.рф")[i // 10 % 3]
+        for i, name in enumerate(canonical)
+    ]
+    return {
+        f"names.validate_host[names={count}]": measure(lambda: [h for h in canonical if validate_host(h)], repeat),
+        f"names.normalize.canonical[names={count}]": measure(lambda: normalize_hosts(canonical), repeat),
+        f"names.normalize.mixed[names={count}]": measure(
+            lambda: normalize_hosts(mixed), repeat, setup=normalize_host.cache_clear
+        ),
+    }
+
+
+def run(profile: str) -> dict[str, float]:
+    settings = PROFILES[profile]
+    repeat = settings["repeat"]
+    results: dict[str, float] = {}
+    tmp = tempfile.mkdtemp(prefix="rublocker-bench-")
+    try:
+        for lines in settings["lines"]:
+            results.update(bench_hosts(lines, repeat, tmp))
+        for groups, hosts in settings["configs"]:
+            results.update(bench_config(groups, hosts, repeat, tmp))
+        results.update(bench_watcher(repeat, tmp))
+        for megabytes in settings["stream_mb"]:
+            results.update(bench_stream(megabytes, repeat, tmp))
+        for count in settings["names"]:
+            results.update(bench_format(count, repeat))
+            results.update(bench_names(count, repeat))
+            results.update(bench_trie(count, repeat))
+            results.update(bench_importer(count, repeat, tmp))
+            results.update(bench_journal(count, repeat, tmp))
+        for targets, jobs in settings["targets"]:
+            results.update(bench_fanout(targets, jobs, repeat, tmp))
+        for queries in settings["queries"]:
+            results.update(bench_dns(queries, repeat))
+    finally:
+        shutil.rmtree(tmp)
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> dict[str, dict]:
+    """Classify each case against its baseline time."""
+    report = {}
+    for case, seconds in results.items():
+        base = baseline.get(case)
+        if base is None:
+            status = "new"
+        elif seconds > base * (1 + threshold):
+            status = "regression"
+        elif seconds < base * (1 - threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        report[case] = {"seconds": seconds, "baseline": base, "status": status}
+    return report
+
+
+def load_baseline(path: str) -> tuple[dict[str, float], float]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}, DEFAULT_THRESHOLD
+    return data.get("cases", {}), data.get("threshold", DEFAULT_THRESHOLD)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="RUBlocker84 benchmark suite")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--output", default="bench_results.json", help="machine-readable results")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, help="allowed slowdown, e.g. 0.25 for +25%%")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any case regressed")
+    args = parser.parse_args(argv)
+
+    baseline, threshold = load_baseline(args.baseline)
+    if args.threshold is not None:
+        threshold = args.threshold
+
+    results = run(args.profile)
+    report = compare(results, baseline, threshold)
+    for case, entry in report.items():
+        base = f"{entry['baseline'] * 1000:10.2f} ms" if entry["baseline"] is not None else " " * 13
+        print(f"{case:<55} {entry['seconds'] * 1000:10.2f} ms  {base}  {entry['status']}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "profile": args.profile,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "threshold": threshold,
+            "cases": report,
+        }, f, indent=2)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"threshold": threshold, "cases": dict(sorted(baseline.items()))}, f, indent=2)
+            f.write("\n")
+
+    regressed = [case for case, entry in report.items() if entry["status"] == "regression"]
+    return 1 if args.check and regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
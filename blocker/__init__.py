@@ -1,6 +1,6 @@
 """RUBlocker84 - Hosts-based tracker blocker."""
 
-from .config import Config, load_config, save_config, get_blocked_hosts, ConfigWatcher
+from .config import Config, ConfigDiff, HostDelta, load_config, save_config, get_blocked_hosts, ConfigWatcher
 from .hosts import HostsManager
 
-__all__ = ["Config", "load_config", "save_config", "get_blocked_hosts", "ConfigWatcher", "HostsManager"]
\ No newline at end of file
+__all__ = ["Config", "ConfigDiff", "HostDelta", "load_config", "save_config", "get_blocked_hosts", "ConfigWatcher", "HostsManager"]
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""ASCII animation frames for the RUBlocker84 CLI."""
+
+LOCK_CLOSED = """                                                                                                
+                                     .:=#%@@@@@@@@@@@@@@@@%#=:.                                     
+                              ..:*@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@*:..                              
+                          .:+@@@@@@@@%+-..                ..-+%@@@@@@@@+:.                          
+                       :*@@@@@@%*-.                              .:+%@@@@@@*:                       
+                    -%@@@@@%=.                                        .=%@@@@@%=                    
+                .=@@@@@@+.                                                .+@@@@@@=.                
+             .=@@@@@%-                     .-*@@@@@@@@*-.                     -%@@@@@=.             
+           :%@@@@%-.                    :#@@@@@@@@@@@@@@@@#:                    .-%@@@@%:           
+        .*@@@@@=.                     :@@@@@@@@@@@@@@@@@@@@@@:                     .-@@@@@*.        
+      .%@@@@#                        *@@@@@@@@@@@@@@@@@@@@@@@@#                        *@@@@%.      
+    :%@@@@-.                       .@@@@@@@@@@@@@@@@@@@@@@@@@@@@.                       .-@@@@@:    
+   -@@@%:                          +@@@@@@@@@@@@@@@@@@@@@@@@@@@@+                          :%@@@-   
+  .@@@%.                          .@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@.                          .%@@@.  
+  -@@@-                           .@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@:                           -@@@-  
+  .@@@%.                          .@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@.                          .%@@@.  
+   -@@@%:                          +@@@@@@@@@@@@@@@@@@@@@@@@@@@@+                          :%@@@-   
+    :%@@@@-.                       .@@@@@@@@@@@@@@@@@@@@@@@@@@@@.                       .-@@@@@:    
+      .%@@@@#                        *@@@@@@@@@@@@@@@@@@@@@@@@#                        *@@@@%.      
+        .*@@@@@=.                     :@@@@@@@@@@@@@@@@@@@@@@:                     .-@@@@@*.        
+           :%@@@@%-.                    :#@@@@@@@@@@@@@@@@#:                    .-%@@@@%:           
+             .=@@@@@%-                     .-*@@@@@@@@*-.                     -%@@@@@=.             
+                .=@@@@@@+.                                                .+@@@@@@=.                
+                    -%@@@@@%=.                                        .=%@@@@@%=                    
+                       :*@@@@@@%*-.                              .:+%@@@@@@*:                       
+                          .:+@@@@@@@@%+-..                ..-+%@@@@@@@@+:.                          
+                              ..:*@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@*:..                              
+                                     .:=#%@@@@@@@@@@@@@@@@%#=:.                                     
+    """
+
+LOCK_OPENING = """          
+                                                                                .*@@@:              
+                                                                              .*@@@@@=              
+                                                                            .*@@@@@#.               
+                                                                          .*@@@@@*.                 
+                                      .-#%@@@@@@@@@@@@@@@@%%+:.         .*@@@@@*.                   
+                               ..=@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@#-. .*@@@@@*.                     
+                          ..=%@@@@@@@%*=:.                 .:+#@@@+ .*@@@@@*.                       
+                       .=%@@@@@@#=..                              .*@@@@@+..:                       
+                    .#@@@@@@*:.                                 .#@@@@@+. +@@@@=                    
+                 .#@@@@@%:                                    .#@@@@@+    .=@@@@@@+.                
+              :#@@@@@#.                    .:+%@@@@@@@#=:.  .#@@@@@+.         -%@@@@@=.             
+           .+@@@@@+.                    .*@@@@@@@@@@@@@@= .#@@@@@+.             .-#@@@@%-           
+         :%@@@@#.                     .%@@@@@@@@@@@@@@=..%@@@@@+.                   -@@@@@#.        
+       =@@@@@-                       -@@@@@@@@@@@@@@- .%@@@@@+                         *@@@@%.      
+     =@@@@#.                        =@@@@@@@@@@@@@= .#@@@@@+..*@.                        -@@@@%:    
+   .#@@@*.                         :@@@@@@@@@@@@= .#@@@@@+..*@@@#.                         :%@@@-   
+   -@@@=                          .*@@@@@@@@@@= .#@@@@@=..*@@@@@@.                          .#@@@.  
+   *@@@.                          .#@@@@@@@@- .%@@@@@=  *@@@@@@@@:                           -@@@-  
+   -@@@=                          .*@@@@@@-..#@@@@@= .*@@@@@@@@@@.                          .#@@@.  
+   .#@@@*.                         :@@@@- .#@@@@@=..*@@@@@@@@@@@#.                         :%@@@-   
+     =@@@@#.                        =@- .%@@@@@-..#@@@@@@@@@@@@@.                        -@@@@%:    
+       =@@@@@-                        .@@@@@@-  #@@@@@@@@@@@@@@.                       *@@@@%.      
+         :%@@@@#.                   .@@@@@@= .#@@@@@@@@@@@@@@+                      -@@@@@#.        
+           .+@@@@@+.              .%@@@@@=..#@@@@@@@@@@@@@%-.                   .-#@@@@%-           
+              :#@@@@@#.         .%@@@@@-.  .:+%@@@@@@@#=:                     -%@@@@@=.             
+                 .#@@@@@%:    .%@@@@@-.                                   .=@@@@@@+.                
+                    .#@@@@: :%@@@@@-                                  .-%@@@@@@=                    
+                       .: :%@@@@@-                               .:+%@@@@@@*:                       
+                        .%@@@@@-..%@@%*=:.                 .:+#@@@@@@@@*:.                          
+                      .@@@@@@:. .=@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@#-..                              
+                    :@@@@@@-          .-#%@@@@@@@@@@@@@@@@%%+:.                                     
+                  :@@@@@@-                                                                          
+                :%@@@@@-                                                                            
+               #@@@@@:.                                                                             
+               +@@@:                                                                                
+    """
+
+FREEDOM = """
+
+          ✨ ✨ ✨
+       ✨  FREE  ✨
+          ✨ ✨ ✨
+
+    """
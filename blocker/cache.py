@@ -0,0 +1,159 @@
+"""Compiled snapshot cache of the configuration file.
+
+Parsing a large ``config.json`` and validating every host dominates startup,
+so the parsed groups, together with their validated hosts, are stored next to
+the config in ``marshal`` form. The snapshot is keyed by a hash of the
+config's content and by the interpreter that wrote it, since the ``marshal``
+format differs between Python versions. It also records the config file's
+size, mtime, ctime and inode, so an unchanged file is recognised without
+reading it.
+
+The snapshot is written when the config is saved and, for callers that ask
+for it, when a load finds it stale (e.g. after a hand edit). Read-only
+commands never create files; for them a stale or foreign snapshot is ignored
+and the JSON is parsed instead.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import sys
+from array import array
+from typing import Any, Optional, Sequence
+
+from .config import BlockGroup, Config
+from .storage import ShardHosts
+from .store import DomainStore
+
+CACHE_VERSION = 6
+# Snapshots are only read back by the interpreter and marshal format that wrote them
+RUNTIME = (sys.implementation.cache_tag, marshal.version)
+
+
+def cache_path(config_file: str) -> str:
+    return os.path.splitext(config_file)[0] + ".cache"
+
+
+def content_hash(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def stat_key(st: os.stat_result) -> tuple[int, int, int, int]:
+    # ctime cannot be set back by hand, unlike mtime
+    return (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+
+
+def _join(hosts: Sequence[str]) -> Any:
+    # One newline-joined string loads far faster than a list of small strings
+    joined = "\n".join(hosts)
+    if hosts and joined.count("\n") != len(hosts) - 1:
+        return list(hosts)
+    return joined
+
+
+def _split(hosts: Any) -> list[str]:
+    if isinstance(hosts, str):
+        return hosts.split("\n") if hosts else []
+    return hosts
+
+
+def _encode_group(name: str, group: BlockGroup) -> tuple:
+    if isinstance(group.hosts, ShardHosts):
+        # Keep shards lazy: record where they are, not what they hold
+        shard = group.hosts
+        hosts: Any = ("shard", shard.path, len(shard), shard.digest, shard.compact)
+        return (name, group.on, group.description, group.kernel, hosts, None, None)
+
+    concrete, patterns = group.split_hosts()
+    if isinstance(group.hosts, DomainStore):
+        hosts: Any = ("store", group.hosts._data, group.hosts._offsets.tobytes())
+        valid = None
+    else:
+        hosts = _join(group.hosts)
+        valid = None if list(concrete) == list(group.hosts) else _join(concrete)
+    return (name, group.on, group.description, group.kernel, hosts, valid, patterns)
+
+
+def _decode_group(record: tuple) -> tuple[str, BlockGroup]:
+    name, on, description, kernel, hosts, valid, patterns = record
+    if isinstance(hosts, tuple) and hosts[0] == "shard":
+        hosts = ShardHosts(*hosts[1:])
+    elif isinstance(hosts, tuple):
+        offsets = array("I")
+        offsets.frombytes(hosts[2])
+        hosts = DomainStore(hosts[1], offsets)
+    else:
+        hosts = _split(hosts)
+    group = BlockGroup(on=on, description=description, hosts=hosts, kernel=kernel)
+    if patterns is not None:
+        group.set_valid(hosts if valid is None else _split(valid), patterns)
+    return name, group
+
+
+def _decode(snapshot: dict) -> Config:
+    return Config(
+        active_groups=snapshot["active_groups"],
+        groups=dict(_decode_group(record) for record in snapshot["groups"]),
+        sharded=snapshot["sharded"],
+        hosts_format=snapshot["hosts_format"],
+    )
+
+
+def read_snapshot(config_file: str) -> Optional[dict]:
+    try:
+        with open(cache_path(config_file), "rb") as f:
+            snapshot = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != CACHE_VERSION:
+        return None
+    if tuple(snapshot.get("runtime", ())) != RUNTIME:
+        return None
+    return snapshot
+
+
+def write_snapshot(config_file: str, config: Config, digest: bytes, st: os.stat_result) -> None:
+    """Store ``config`` as the compiled form of ``config_file``, whose content hashes to ``digest``."""
+    try:
+        snapshot = {
+            "version": CACHE_VERSION,
+            "runtime": RUNTIME,
+            "hash": digest,
+            "stat": stat_key(st),
+            "active_groups": list(config.active_groups),
+            "sharded": config.sharded,
+            "hosts_format": dict(config.hosts_format),
+            "groups": [_encode_group(name, group) for name, group in config.groups.items()],
+        }
+        path = cache_path(config_file)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            marshal.dump(snapshot, f)
+        os.replace(tmp, path)
+    except OSError:
+        # The cache is an optimisation only, e.g. the directory may be read-only
+        pass
+
+
+def load_cached(config_file: str, refresh: bool = False) -> Config:
+    """Load ``config_file`` through its snapshot when the snapshot matches its content.
+
+    The file is only hashed when its stat differs from the snapshot's. With
+    ``refresh`` a stale or missing snapshot is rewritten; otherwise nothing
+    is written.
+    """
+    snapshot = read_snapshot(config_file)
+    with open(config_file, "rb") as f:
+        st = os.fstat(f.fileno())
+        if snapshot and tuple(snapshot.get("stat", ())) == stat_key(st):
+            return _decode(snapshot)
+        data = f.read()
+    digest = content_hash(data)
+    if snapshot and snapshot["hash"] == digest:
+        config = _decode(snapshot)
+    else:
+        config = Config.from_dict(json.loads(data), os.path.dirname(os.path.abspath(config_file)))
+    if refresh:
+        write_snapshot(config_file, config, digest, st)
+    return config
@@ -1,55 +1,300 @@
 """Configuration management for RUBlocker84."""
 
 import json
+import logging
 import os
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Iterable, KeysView, Optional, Sequence
 import threading
 import time
 
+from .metrics import METRICS, Metrics, OpStats
+from .storage import ShardHosts, shard_dir, shard_name, write_shard
+from .store import DomainStore
+from .trie import WILDCARD_PREFIX, DomainTrie, expand_wildcard, reverse_host, split_hosts
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class BlockGroup:
     on: bool = False
     description: str = ""
-    hosts: list[str] = field(default_factory=list)
+    # A plain list for hand-written presets, a compact DomainStore for imports
+    hosts: Sequence[str] = field(default_factory=list)
     kernel: bool = False
+    _valid: Optional[tuple[Sequence[str], list[str]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _valid_key: Optional[tuple[int, int]] = field(default=None, init=False, repr=False, compare=False)
+
+    def split_hosts(self) -> tuple[Sequence[str], list[str]]:
+        """Valid concrete hostnames and wildcard patterns of the group.
+
+        Validated once per ``hosts`` object and reused on every toggle; assign
+        a new list to ``hosts`` rather than mutating it in place.
+        """
+        key = (id(self.hosts), len(self.hosts))
+        if self._valid is None or self._valid_key != key:
+            if isinstance(self.hosts, DomainStore):
+                # Imported stores hold only validated, concrete names
+                self._valid = (self.hosts, [])
+            else:
+                self._valid = split_hosts(self.hosts)
+            self._valid_key = key
+        return self._valid
+
+    def set_valid(self, concrete: Sequence[str], patterns: list[str]) -> None:
+        """Seed the validation cache, e.g. from a config snapshot."""
+        self._valid = (concrete, patterns)
+        self._valid_key = (id(self.hosts), len(self.hosts))
+
+    @property
+    def valid_hosts(self) -> Sequence[str]:
+        return self.split_hosts()[0]
+
+
+@dataclass
+class HostDelta:
+    """Hosts to add to and remove from the hosts file."""
+
+    added: set[str] = field(default_factory=set)
+    removed: set[str] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed)
+
+    def merge(self, later: "HostDelta") -> None:
+        """Fold a delta produced after this one into it; the later one wins."""
+        self.added -= later.removed
+        self.removed -= later.added
+        self.added |= later.added
+        self.removed |= later.removed
+
+
+class HostIndex:
+    """Reference-counted map of each blocked host to the enabled groups using it.
+
+    Enabling or disabling a group returns the exact ``HostDelta`` for the hosts
+    file: a host is only removed once no other enabled group references it.
+    Wildcard entries (``*.domain``) are kept in a ``DomainTrie`` for
+    ``is_blocked`` and expanded into hosts entries only for concrete names
+    listed in some group of the config whose hosts are in memory.
+    """
+
+    def __init__(
+        self,
+        groups: Optional[dict[str, BlockGroup]] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ):
+        """Index the enabled ``groups``.
+
+        ``progress(done, total)`` is called after each group with the number
+        of its entries indexed so far.
+        """
+        self._groups = groups if groups is not None else {}
+        self._refs: dict[str, set[str]] = {}
+        self._enabled: set[str] = set()
+        self._wildcards = DomainTrie()
+        self._expanded: dict[str, tuple[list[str], list[str]]] = {}
+        self._known: Optional[list[str]] = None
+        self._known_key: Optional[tuple] = None
+        # Bumped whenever the blocked set may have changed
+        self.version = 0
+        enabled = [(name, group) for name, group in self._groups.items() if group.on]
+        total = sum(len(group.hosts) for _, group in enabled)
+        done = 0
+        for name, group in enabled:
+            self.enable(name, group)
+            done += len(group.hosts)
+            if progress is not None:
+                progress(done, total)
+
+    @property
+    def blocked(self) -> KeysView[str]:
+        """Live view of every host blocked by at least one enabled group."""
+        return self._refs.keys()
+
+    def groups_for(self, host: str) -> set[str]:
+        return set(self._refs.get(host, ()))
+
+    def groups_blocking(self, host: str) -> set[str]:
+        """Enabled groups blocking ``host``, exactly or through a wildcard."""
+        groups = self.groups_for(host)
+        labels = host.split(".")
+        suffixes = {WILDCARD_PREFIX + ".".join(labels[i:]) for i in range(1, len(labels))}
+        for name, (patterns, _) in self._expanded.items():
+            if suffixes.intersection(patterns):
+                groups.add(name)
+        return groups
+
+    def hosts_of(self, name: str) -> list[str]:
+        """Blocked hosts that the enabled group ``name`` contributes."""
+        return [host for host, refs in self._refs.items() if name in refs]
+
+    def is_blocked(self, host: str) -> bool:
+        """Whether ``host`` is blocked, exactly or by a wildcard, in O(labels)."""
+        return host in self._refs or self._wildcards.is_blocked(host)
+
+    def _known_names(self) -> list[str]:
+        """Sorted reversed names of every concrete host in the config.
+
+        Shards of disabled groups that have not been read yet are skipped
+        rather than loaded, so their names are only expanded once read.
+        """
+        groups = {
+            name: group for name, group in self._groups.items()
+            if group.on or not isinstance(group.hosts, ShardHosts) or group.hosts.loaded
+        }
+        key = tuple((name, id(group.hosts), len(group.hosts)) for name, group in groups.items())
+        if key != self._known_key:
+            names: set[str] = set()
+            for group in groups.values():
+                names.update(group.valid_hosts)
+            self._known = sorted(reverse_host(name) for name in names)
+            self._known_key = key
+        return self._known
+
+    def _add_refs(self, name: str, hosts: Iterable[str], delta: HostDelta) -> None:
+        for host in hosts:
+            refs = self._refs.setdefault(host, set())
+            if not refs:
+                delta.added.add(host)
+            refs.add(name)
+
+    def _drop_refs(self, name: str, hosts: Iterable[str], delta: HostDelta) -> None:
+        for host in hosts:
+            refs = self._refs.get(host)
+            if refs is None:
+                continue
+            refs.discard(name)
+            if not refs:
+                del self._refs[host]
+                delta.removed.add(host)
+
+    def enable(self, name: str, group: BlockGroup) -> HostDelta:
+        delta = HostDelta()
+        if name in self._enabled:
+            return delta
+        self._enabled.add(name)
+        self.version += 1
+        concrete, patterns = group.split_hosts()
+        self._add_refs(name, concrete, delta)
+        if patterns:
+            known = self._known_names()
+            expanded = []
+            for pattern in patterns:
+                self._wildcards.add(pattern)
+                expanded.extend(expand_wildcard(pattern, known))
+            self._expanded[name] = (patterns, expanded)
+            self._add_refs(name, expanded, delta)
+        return delta
+
+    def disable(self, name: str, group: BlockGroup) -> HostDelta:
+        delta = HostDelta()
+        if name not in self._enabled:
+            return delta
+        self._enabled.discard(name)
+        self.version += 1
+        self._drop_refs(name, group.valid_hosts, delta)
+        patterns, expanded = self._expanded.pop(name, ((), ()))
+        for pattern in patterns:
+            self._wildcards.remove(pattern)
+        self._drop_refs(name, expanded, delta)
+        return delta
 
 
 @dataclass
 class Config:
     active_groups: list[str] = field(default_factory=list)
     groups: dict[str, BlockGroup] = field(default_factory=dict)
+    # Store host lists in per-group shard files (see blocker.storage)
+    sharded: bool = False
+    # Managed hosts-section layout, see blocker.hosts.HostsFormat.from_dict
+    hosts_format: dict[str, Any] = field(default_factory=dict)
+    _index: Optional[HostIndex] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def index(self) -> HostIndex:
+        """Host index of the enabled groups, built on first use.
+
+        Toggle groups through ``set_group`` to keep it in sync.
+        """
+        if self._index is None:
+            self._index = HostIndex(self.groups)
+        return self._index
+
+    def build_index(self, progress: Optional[Callable[[int, int], None]] = None) -> HostIndex:
+        """Build the index up front, reporting progress as ``HostIndex`` does."""
+        if self._index is None:
+            self._index = HostIndex(self.groups, progress)
+        return self._index
+
+    def set_group(self, name: str, on: bool) -> HostDelta:
+        """Enable or disable a group and return the resulting hosts delta."""
+        index = self.index
+        group = self.groups[name]
+        group.on = on
+        if on:
+            return index.enable(name, group)
+        return index.disable(name, group)
+
+    def toggle_group(self, name: str) -> HostDelta:
+        return self.set_group(name, not self.groups[name].on)
+
+    def is_blocked(self, host: str) -> bool:
+        return self.index.is_blocked(host)
 
     @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "Config":
+    def from_dict(cls, data: dict[str, Any], base_dir: str = "") -> "Config":
         groups = {}
         for name, group_data in data.get("groups", {}).items():
+            if "shard" in group_data:
+                hosts: Sequence[str] = ShardHosts(
+                    os.path.join(base_dir, group_data["shard"]),
+                    count=group_data.get("count"),
+                    digest=group_data.get("sha256"),
+                    compact=group_data.get("compact", False),
+                )
+            else:
+                hosts = group_data.get("hosts", [])
             groups[name] = BlockGroup(
                 on=group_data.get("on", False),
                 description=group_data.get("description", ""),
-                hosts=group_data.get("hosts", []),
+                hosts=hosts,
                 kernel=group_data.get("kernel", False),
             )
         return cls(
             active_groups=data.get("active_groups", []),
             groups=groups,
+            sharded=data.get("layout") == "sharded",
+            hosts_format=data.get("hosts_format", {}),
         )
 
-    def to_dict(self) -> dict[str, Any]:
-        return {
-            "active_groups": self.active_groups,
-            "groups": {
-                name: {
-                    "on": group.on,
-                    "description": group.description,
-                    "hosts": group.hosts,
-                    "kernel": group.kernel,
-                }
-                for name, group in self.groups.items()
-            },
-        }
+    def to_dict(self, base_dir: str = "") -> dict[str, Any]:
+        data: dict[str, Any] = {"active_groups": self.active_groups}
+        if self.sharded:
+            data["layout"] = "sharded"
+        if self.hosts_format:
+            data["hosts_format"] = self.hosts_format
+        data["groups"] = {name: _group_to_dict(group, base_dir) for name, group in self.groups.items()}
+        return data
+
+
+def _group_to_dict(group: BlockGroup, base_dir: str) -> dict[str, Any]:
+    data: dict[str, Any] = {"on": group.on, "description": group.description}
+    if isinstance(group.hosts, ShardHosts):
+        shard = group.hosts
+        data["shard"] = os.path.relpath(shard.path, base_dir) if base_dir else shard.path
+        data["count"] = len(shard)
+        data["sha256"] = shard.digest
+        if shard.compact:
+            data["compact"] = True
+    else:
+        data["hosts"] = list(group.hosts)
+    data["kernel"] = group.kernel
+    return data
 
 
 def get_resource_path(filename: str) -> str:
@@ -63,67 +308,245 @@ def get_resource_path(filename: str) -> str:
 CONFIG_FILE = get_resource_path("config.json")
 
 
-def load_config() -> Config:
-    if not os.path.exists(CONFIG_FILE):
+def load_config(config_file: Optional[str] = None, refresh_cache: bool = False) -> Config:
+    """Load the config; ``refresh_cache`` rewrites its snapshot if stale (see ``blocker.cache``)."""
+    from .cache import load_cached
+
+    config_file = config_file or CONFIG_FILE
+    if not os.path.exists(config_file):
         return Config()
     try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return Config.from_dict(data)
-    except (json.JSONDecodeError, KeyError):
+        return load_cached(config_file, refresh_cache)
+    except (json.JSONDecodeError, UnicodeDecodeError, KeyError):
         return Config()
 
 
-def save_config(config: Config) -> None:
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config.to_dict(), f, indent=2)
+def save_config(config: Config, config_file: Optional[str] = None) -> None:
+    """Write the config; in the sharded layout only new or replaced shards are written."""
+    from .cache import content_hash, write_snapshot
+
+    config_file = config_file or CONFIG_FILE
+    base_dir = os.path.dirname(os.path.abspath(config_file))
+    if config.sharded:
+        _write_shards(config, config_file)
+    data = json.dumps(config.to_dict(base_dir), indent=2).encode("utf-8")
+    with open(config_file, "wb") as f:
+        f.write(data)
+        f.flush()
+        st = os.fstat(f.fileno())
+    write_snapshot(config_file, config, content_hash(data), st)
+
+
+def _write_shards(config: Config, config_file: str) -> None:
+    directory = shard_dir(os.path.abspath(config_file))
+    taken = {
+        os.path.basename(group.hosts.path)
+        for group in config.groups.values()
+        if isinstance(group.hosts, ShardHosts)
+    }
+    for name, group in config.groups.items():
+        if isinstance(group.hosts, ShardHosts):
+            continue
+        filename = shard_name(name, taken)
+        taken.add(filename)
+        group.hosts = write_shard(os.path.join(directory, filename), group.hosts)
+
+
+def convert_to_sharded(config_file: Optional[str] = None) -> Config:
+    """Convert a single-file config to the sharded layout in place."""
+    config = load_config(config_file)
+    config.sharded = True
+    save_config(config, config_file)
+    return config
+
+
+def get_blocked_hosts(config: Config) -> KeysView[str]:
+    return config.index.blocked
+
+
+@dataclass
+class ConfigDiff:
+    """Structured difference between two configs."""
+
+    config: Config
+    groups_added: list[str] = field(default_factory=list)
+    groups_removed: list[str] = field(default_factory=list)
+    groups_toggled: dict[str, bool] = field(default_factory=dict)
+    hosts_added: dict[str, set[str]] = field(default_factory=dict)
+    hosts_removed: dict[str, set[str]] = field(default_factory=dict)
+    # The hosts file layout changed: every entry has to be rewritten
+    format_changed: bool = False
+    delta: HostDelta = field(default_factory=HostDelta)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.groups_added or self.groups_removed or self.groups_toggled
+            or self.hosts_added or self.hosts_removed or self.format_changed
+        )
+
 
+def diff_configs(old: Config, new: Config) -> ConfigDiff:
+    """Compare two configs group by group.
 
-def get_blocked_hosts(config: Config) -> list[str]:
-    blocked = []
-    for group in config.groups.values():
-        if group.on:
-            blocked.extend(group.hosts)
-    return list(set(blocked))
+    ``delta`` holds the resulting hosts file changes, ready for
+    ``HostsManager.apply_delta``.
+    """
+    diff = ConfigDiff(config=new)
+    for name, group in new.groups.items():
+        previous = old.groups.get(name)
+        if previous is None:
+            diff.groups_added.append(name)
+            continue
+        if previous.on != group.on:
+            diff.groups_toggled[name] = group.on
+        if previous.hosts != group.hosts:
+            before, after = set(previous.hosts), set(group.hosts)
+            if after - before:
+                diff.hosts_added[name] = after - before
+            if before - after:
+                diff.hosts_removed[name] = before - after
+    diff.groups_removed = [name for name in old.groups if name not in new.groups]
+    diff.format_changed = old.hosts_format != new.hosts_format
+
+    if diff:
+        old_blocked, new_blocked = old.index.blocked, new.index.blocked
+        diff.delta = HostDelta(
+            added=new_blocked - old_blocked,
+            removed=old_blocked - new_blocked,
+        )
+    return diff
 
 
 class ConfigWatcher:
-    """Watch configuration file for changes and reload when modified."""
+    """Watch configuration file for changes and report what changed.
 
-    def __init__(self, config_file: str, callback: callable):
+    On Linux the file's directory is watched with inotify; elsewhere the file
+    is polled. Bursts of writes within ``debounce`` seconds are coalesced into
+    a single reload, and ``callback`` receives a ``ConfigDiff`` against the
+    previously loaded config; errors from loading or from the callback are
+    logged and watching goes on. Each reload is recorded in ``metrics`` as a
+    ``watcher_reload`` operation whose total time runs from the first
+    detected change to the end of the callback. With ``refresh_cache`` each
+    reload also rewrites the config snapshot, so the next start can use it.
+    """
+
+    def __init__(
+        self,
+        config_file: str,
+        callback: Callable[[ConfigDiff], None],
+        debounce: float = 0.2,
+        config: Optional[Config] = None,
+        metrics: Optional[Metrics] = None,
+        refresh_cache: bool = False,
+    ):
         self.config_file = Path(config_file)
         self.callback = callback
-        self._last_mtime: Optional[float] = None
+        self.debounce = debounce
+        self.config = config
+        self.metrics = metrics or METRICS
+        self.refresh_cache = refresh_cache
+        self._last_signature: Optional[tuple[int, int, int]] = None
         self._running = False
         self._thread: Optional[threading.Thread] = None
 
-    def _check(self) -> None:
+    def _signature(self) -> Optional[tuple[int, int, int]]:
         try:
-            mtime = self.config_file.stat().st_mtime
-            if self._last_mtime is None:
-                self._last_mtime = mtime
-                return
-
-            if mtime > self._last_mtime:
-                self._last_mtime = mtime
-                new_config = load_config()
-                self.callback(new_config)
-        except Exception:
-            pass
+            st = self.config_file.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _check(self, detected: Optional[float] = None) -> None:
+        from .cache import load_cached
+
+        start = time.perf_counter()
+        detected = start if detected is None else detected
+        signature = self._signature()
+        if signature is None or signature == self._last_signature:
+            return
+        self._last_signature = signature
+
+        op = OpStats("watcher_reload", str(self.config_file))
+        try:
+            new_config = load_cached(str(self.config_file), self.refresh_cache)
+        except Exception as e:
+            # Caught mid-write or invalid: keep the current config and
+            # retry on the next change
+            logger.warning(f"Cannot reload {self.config_file}, keeping the current config: {e}")
+            self._last_signature = None
+            return
+        op.read_time = time.perf_counter() - start
+        if self.config is None:
+            self.config = new_config
+            return
+        diff_start = time.perf_counter()
+        diff = diff_configs(self.config, new_config)
+        op.diff_time = time.perf_counter() - diff_start
+        op.added, op.removed = len(diff.delta.added), len(diff.delta.removed)
+        self.config = new_config
+        if diff:
+            try:
+                self.callback(diff)
+            except Exception:
+                # A failing callback must not stop the watcher thread
+                logger.exception("Config change callback failed")
+                op.ok = False
+        op.total_time = time.perf_counter() - detected
+        self.metrics.record(op)
 
     def start(self, interval: float = 1.0) -> None:
+        if self.config is None:
+            self.config = load_config(str(self.config_file), self.refresh_cache)
+        self._last_signature = self._signature()
         self._running = True
-        self._thread = threading.Thread(
-            target=self._watch_loop,
-            args=(interval,),
-            daemon=True
-        )
+
+        from . import inotify
+
+        target, args = self._poll_loop, (interval,)
+        if inotify.available():
+            try:
+                watch = inotify.Inotify(str(self.config_file.parent.resolve()))
+                target, args = self._inotify_loop, (watch,)
+            except OSError:
+                pass
+
+        self._thread = threading.Thread(target=target, args=args, daemon=True)
         self._thread.start()
 
-    def _watch_loop(self, interval: float) -> None:
+    def _inotify_loop(self, watch) -> None:
+        deadline: Optional[float] = None
+        detected: Optional[float] = None
+        try:
+            while self._running:
+                timeout = 0.5 if deadline is None else max(0.0, deadline - time.monotonic())
+                if self.config_file.name in watch.read(min(timeout, 0.5)):
+                    deadline = time.monotonic() + self.debounce
+                    detected = detected or time.perf_counter()
+                if deadline is not None and time.monotonic() >= deadline:
+                    deadline = None
+                    self._check(detected)
+                    detected = None
+        finally:
+            watch.close()
+
+    def _poll_loop(self, interval: float) -> None:
+        seen = self._last_signature
+        deadline: Optional[float] = None
+        detected: Optional[float] = None
         while self._running:
-            self._check()
-            time.sleep(interval)
+            signature = self._signature()
+            if signature != seen:
+                seen = signature
+                deadline = time.monotonic() + self.debounce
+                detected = detected or time.perf_counter()
+            if deadline is not None and time.monotonic() >= deadline:
+                deadline = None
+                self._check(detected)
+                detected = None
+            time.sleep(interval if deadline is None else min(interval, self.debounce))
 
     def stop(self) -> None:
-        self._running = False
\ No newline at end of file
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,431 @@
+"""Local DNS sinkhole resolver for RUBlocker84.
+
+An alternative to very large hosts files: a small asyncio DNS server on
+localhost answers names blocked by the enabled groups of a ``Config`` itself
+(``0.0.0.0``/``::`` or NXDOMAIN) and forwards every other query to an upstream
+resolver. Upstream queries are pipelined over one UDP socket; a response is
+only accepted when its ID and question match the query, and truncated
+answers are fetched again over TCP for TCP clients. Responses are kept in a
+bounded, TTL-aware cache.
+
+Wildcard group entries (``*.domain``) work here, unlike in the hosts file.
+"""
+
+import asyncio
+import errno
+import logging
+import random
+import struct
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+TYPE_A = 1
+TYPE_SOA = 6
+TYPE_AAAA = 28
+TYPE_OPT = 41
+CLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+RCODE_REFUSED = 5
+
+FLAG_QR = 0x8000
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+FLAG_RA = 0x0080
+
+# TTL of synthesised answers for blocked names
+BLOCK_TTL = 300
+# TTL used for cached answers carrying no records to take one from
+NEGATIVE_TTL = 30
+MAX_TTL = 86400
+# Ports tried when listening on port 0, which picks the UDP port first
+PORT_ATTEMPTS = 5
+
+_HEADER = struct.Struct("!HHHHHH")
+_RR_FIXED = struct.Struct("!HHIH")
+
+
+class DnsFormatError(ValueError):
+    """Malformed DNS message."""
+
+
+def _skip_name(data: bytes, offset: int) -> int:
+    while True:
+        if offset >= len(data):
+            raise DnsFormatError("name runs past end of message")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        if length & 0xC0:
+            raise DnsFormatError("unsupported label type")
+        offset += 1 + length
+        if length == 0:
+            return offset
+
+
+def parse_question(data: bytes) -> tuple[int, int, str, int, int, int]:
+    """Return (id, flags, qname, qtype, qclass, end of question) of a query."""
+    if len(data) < _HEADER.size:
+        raise DnsFormatError("message shorter than header")
+    msg_id, flags, qdcount, _, _, _ = _HEADER.unpack_from(data)
+    if qdcount != 1:
+        raise DnsFormatError("expected exactly one question")
+
+    labels = []
+    offset = _HEADER.size
+    while True:
+        if offset >= len(data):
+            raise DnsFormatError("question runs past end of message")
+        length = data[offset]
+        offset += 1
+        if length == 0:
+            break
+        if length & 0xC0:
+            raise DnsFormatError("compressed question name")
+        labels.append(data[offset:offset + length].decode("ascii", "replace"))
+        offset += length
+    if offset + 4 > len(data):
+        raise DnsFormatError("truncated question")
+    qtype, qclass = struct.unpack_from("!HH", data, offset)
+    return msg_id, flags, ".".join(labels).lower(), qtype, qclass, offset + 4
+
+
+def parse_records(data: bytes) -> tuple[list[int], Optional[int]]:
+    """Offsets of every TTL field in a response and the TTL to cache it for.
+
+    The cache TTL is the smallest answer TTL, or for answers without records
+    the SOA TTL from the authority section. OPT pseudo-records are skipped.
+    """
+    _, _, qdcount, ancount, nscount, arcount = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+    for _ in range(qdcount):
+        offset = _skip_name(data, offset) + 4
+
+    ttl_offsets = []
+    answer_ttl: Optional[int] = None
+    soa_ttl: Optional[int] = None
+    for index in range(ancount + nscount + arcount):
+        offset = _skip_name(data, offset)
+        if offset + _RR_FIXED.size > len(data):
+            raise DnsFormatError("truncated resource record")
+        rtype, _, ttl, rdlength = _RR_FIXED.unpack_from(data, offset)
+        if rtype != TYPE_OPT:
+            ttl_offsets.append(offset + 4)
+            if index < ancount:
+                answer_ttl = ttl if answer_ttl is None else min(answer_ttl, ttl)
+            elif index < ancount + nscount and rtype == TYPE_SOA:
+                soa_ttl = ttl
+        offset += _RR_FIXED.size + rdlength
+        if offset > len(data):
+            raise DnsFormatError("truncated resource record data")
+    return ttl_offsets, answer_ttl if answer_ttl is not None else soa_ttl
+
+
+def _answers_query(response: bytes, msg_id: int, question: tuple[str, int, int]) -> bool:
+    """Whether ``response`` is a reply with ``msg_id`` to ``question``."""
+    try:
+        response_id, flags, qname, qtype, qclass, _ = parse_question(response)
+    except DnsFormatError:
+        return False
+    return response_id == msg_id and bool(flags & FLAG_QR) and (qname, qtype, qclass) == question
+
+
+def build_response(query: bytes, question_end: int, rcode: int, answers: list[tuple[int, bytes]] = ()) -> bytes:
+    """Answer ``query`` with ``rcode`` and (type, rdata) records for its name."""
+    msg_id, flags = struct.unpack_from("!HH", query)
+    flags = FLAG_QR | (flags & 0x7800) | (flags & FLAG_RD) | FLAG_RA | rcode
+    out = bytearray(_HEADER.pack(msg_id, flags, 1, len(answers), 0, 0))
+    out += query[_HEADER.size:question_end]
+    for rtype, rdata in answers:
+        # 0xC00C points back at the question name
+        out += b"\xc0\x0c" + _RR_FIXED.pack(rtype, CLASS_IN, BLOCK_TTL, len(rdata)) + rdata
+    return bytes(out)
+
+
+class ResponseCache:
+    """Bounded LRU cache of upstream responses, honouring their TTLs.
+
+    TTLs in a cached response are lowered by the time it spent in the cache
+    before it is served again.
+    """
+
+    def __init__(self, maxsize: int = 10_000, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, tuple[bytes, list[int], float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> Optional[bytearray]:
+        entry = self._entries.get(key)
+        now = self.clock()
+        if entry is None or entry[3] <= now:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        response, ttl_offsets, stored, _ = entry
+        elapsed = int(now - stored)
+        out = bytearray(response)
+        if elapsed:
+            for offset in ttl_offsets:
+                ttl = struct.unpack_from("!I", out, offset)[0]
+                struct.pack_into("!I", out, offset, max(0, ttl - elapsed))
+        return out
+
+    def put(self, key: tuple, response: bytes) -> None:
+        flags = struct.unpack_from("!H", response, 2)[0]
+        if flags & FLAG_TC or flags & 0x000F not in (RCODE_NOERROR, RCODE_NXDOMAIN):
+            return
+        try:
+            ttl_offsets, ttl = parse_records(response)
+        except (DnsFormatError, struct.error):
+            return
+        ttl = NEGATIVE_TTL if ttl is None else min(ttl, MAX_TTL)
+        if ttl <= 0:
+            return
+        now = self.clock()
+        self._entries[key] = (response, ttl_offsets, now, now + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class _UpstreamProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client: "UpstreamClient"):
+        self.client = client
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.client._on_response(data)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.warning(f"Upstream DNS error: {exc}")
+
+
+class UpstreamClient:
+    """Pipelined UDP client: many queries in flight on one socket.
+
+    Responses are matched by ID and question; anything else arriving on the
+    socket, such as a spoofed reply, is ignored.
+    """
+
+    def __init__(self, address: tuple[str, int], timeout: float = 2.0):
+        self.address = address
+        self.timeout = timeout
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._pending: dict[int, tuple[asyncio.Future, tuple[str, int, int]]] = {}
+
+    async def connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _UpstreamProtocol(self), remote_addr=self.address
+        )
+
+    def _on_response(self, data: bytes) -> None:
+        if len(data) < _HEADER.size:
+            return
+        msg_id = struct.unpack_from("!H", data)[0]
+        pending = self._pending.get(msg_id)
+        if pending is None or pending[0].done():
+            return
+        future, question = pending
+        if not _answers_query(data, msg_id, question):
+            logger.debug(f"Ignoring upstream response {msg_id} that does not match its query")
+            return
+        future.set_result(data)
+
+    async def query(self, packet: bytes) -> bytes:
+        if self._transport is None:
+            await self.connect()
+        if len(self._pending) >= 0xFFFF:
+            raise RuntimeError("too many upstream queries in flight")
+        upstream_id = random.getrandbits(16)
+        while upstream_id in self._pending:
+            upstream_id = random.getrandbits(16)
+
+        question = parse_question(packet)[2:5]
+        future = asyncio.get_running_loop().create_future()
+        self._pending[upstream_id] = (future, question)
+        try:
+            self._transport.sendto(struct.pack("!H", upstream_id) + packet[2:])
+            response = await asyncio.wait_for(future, self.timeout)
+        finally:
+            del self._pending[upstream_id]
+        return packet[:2] + response[2:]
+
+    async def query_tcp(self, packet: bytes) -> bytes:
+        """Send ``packet`` over a new TCP connection, for answers too large for UDP."""
+        question = parse_question(packet)[2:5]
+        upstream_id = random.getrandbits(16)
+
+        async def exchange() -> bytes:
+            reader, writer = await asyncio.open_connection(*self.address)
+            try:
+                writer.write(struct.pack("!HH", len(packet), upstream_id) + packet[2:])
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+                return await reader.readexactly(length)
+            finally:
+                writer.close()
+
+        response = await asyncio.wait_for(exchange(), self.timeout)
+        if not _answers_query(response, upstream_id, question):
+            raise DnsFormatError("upstream TCP response does not match the query")
+        return packet[:2] + response[2:]
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+class _UdpServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, sinkhole: "DnsSinkhole"):
+        self.sinkhole = sinkhole
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        # The event loop only keeps weak references to tasks
+        self._tasks: set[asyncio.Task] = set()
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        task = asyncio.ensure_future(self._respond(data, addr))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _respond(self, data: bytes, addr) -> None:
+        response = await self.sinkhole.resolve(data)
+        if response is not None and self.transport is not None:
+            self.transport.sendto(response, addr)
+
+
+class DnsSinkhole:
+    """Resolver answering blocked names locally and forwarding the rest."""
+
+    def __init__(
+        self,
+        config: Config,
+        upstream: tuple[str, int] = ("1.1.1.1", 53),
+        nxdomain: bool = False,
+        cache_size: int = 10_000,
+        timeout: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config
+        self.nxdomain = nxdomain
+        self.cache = ResponseCache(cache_size, clock)
+        self.upstream = UpstreamClient(upstream, timeout)
+        self.blocked_queries = 0
+        self.forwarded_queries = 0
+        self._servers: list = []
+
+    def update(self, config: Config) -> None:
+        """Switch to a new config, e.g. from a ``ConfigWatcher`` callback."""
+        self.config = config
+
+    def answer_blocked(self, query: bytes, qtype: int, question_end: int) -> bytes:
+        if self.nxdomain:
+            return build_response(query, question_end, RCODE_NXDOMAIN)
+        if qtype == TYPE_A:
+            return build_response(query, question_end, RCODE_NOERROR, [(TYPE_A, bytes(4))])
+        if qtype == TYPE_AAAA:
+            return build_response(query, question_end, RCODE_NOERROR, [(TYPE_AAAA, bytes(16))])
+        return build_response(query, question_end, RCODE_NOERROR)
+
+    async def resolve(self, query: bytes, tcp: bool = False) -> Optional[bytes]:
+        """Answer one DNS query message; None drops it.
+
+        With ``tcp`` the query came over TCP, so a truncated upstream answer
+        is fetched again over TCP instead of being passed on.
+        """
+        try:
+            _, flags, qname, qtype, qclass, question_end = parse_question(query)
+        except DnsFormatError:
+            return None
+        if flags & FLAG_QR:
+            return None
+
+        if self.config.is_blocked(qname):
+            self.blocked_queries += 1
+            return self.answer_blocked(query, qtype, question_end)
+
+        key = (qname, qtype, qclass)
+        cached = self.cache.get(key)
+        if cached is not None:
+            cached[:2] = query[:2]
+            return bytes(cached)
+
+        self.forwarded_queries += 1
+        try:
+            response = await self.upstream.query(query)
+            if tcp and struct.unpack_from("!H", response, 2)[0] & FLAG_TC:
+                # Not cached: the full answer may not fit a UDP reply
+                return await self.upstream.query_tcp(query)
+        except (asyncio.TimeoutError, OSError, RuntimeError, EOFError, DnsFormatError) as e:
+            logger.warning(f"Upstream query for {qname} failed: {e!r}")
+            return build_response(query, question_end, RCODE_SERVFAIL)
+        self.cache.put(key, response)
+        return response
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+                response = await self.resolve(await reader.readexactly(length), tcp=True)
+                if response is None:
+                    break
+                writer.write(struct.pack("!H", len(response)) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 53) -> tuple[str, int]:
+        """Listen on UDP and TCP; returns the bound address (useful with port 0)."""
+        loop = asyncio.get_running_loop()
+        await self.upstream.connect()
+        for attempt in range(PORT_ATTEMPTS if port == 0 else 1):
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UdpServerProtocol(self), local_addr=(host, port)
+            )
+            bound = transport.get_extra_info("sockname")[:2]
+            try:
+                tcp = await asyncio.start_server(self._handle_tcp, host, bound[1])
+                break
+            except OSError as e:
+                transport.close()
+                # A port picked for UDP may already be taken for TCP; pick another
+                if e.errno != errno.EADDRINUSE or attempt == PORT_ATTEMPTS - 1 or port:
+                    raise
+        self._servers = [transport, tcp]
+        logger.info(f"DNS sinkhole listening on {bound[0]}:{bound[1]}")
+        return bound
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+            if isinstance(server, asyncio.AbstractServer):
+                await server.wait_closed()
+        self._servers = []
+        self.upstream.close()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 53) -> None:
+        await self.start(host, port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.close()
@@ -0,0 +1,116 @@
+"""Apply one config to many hosts files at once.
+
+For fleets of root filesystems (container images, chroots, mounted VM disks)
+the desired entry set is computed once and every target hosts file is then
+reconciled on a bounded thread pool. Each target is locked and timed on its
+own, so a rollout costs roughly as much as its slowest target.
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AbstractSet, Iterable, Optional
+
+from .hosts import CLASSIC_FORMAT, HostsFormat, HostsManager, desired_hosts
+from .metrics import Metrics
+
+if TYPE_CHECKING:
+    from .config import Config
+
+DEFAULT_JOBS = 16
+
+
+@dataclass
+class TargetResult:
+    path: str
+    ok: bool
+    added: int = 0
+    removed: int = 0
+    write_skipped: bool = False
+    seconds: float = 0.0
+    error: str = ""
+
+
+@dataclass
+class FanoutReport:
+    results: list[TargetResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.results)
+
+    @property
+    def failed(self) -> list[TargetResult]:
+        return [result for result in self.results if not result.ok]
+
+    def summary(self) -> str:
+        lines = []
+        for result in self.results:
+            if not result.ok:
+                state = f"FAILED {result.error}".rstrip()
+            elif result.write_skipped:
+                state = "unchanged"
+            else:
+                state = f"+{result.added} -{result.removed}"
+            lines.append(f"{'OK  ' if result.ok else 'FAIL'} {result.path}: {state} ({result.seconds * 1000:.1f} ms)")
+        slowest = max((result.seconds for result in self.results), default=0.0)
+        lines.append(
+            f"{len(self.results)} targets: {len(self.results) - len(self.failed)} ok, "
+            f"{len(self.failed)} failed in {self.seconds * 1000:.1f} ms "
+            f"(slowest {slowest * 1000:.1f} ms)"
+        )
+        return "\n".join(lines)
+
+
+def expand_targets(patterns: Iterable[str]) -> list[str]:
+    """Hosts-file paths named by ``patterns``: plain paths or globs (``**`` too)."""
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(glob.glob(pattern, recursive=True))
+        else:
+            paths.append(pattern)
+    return sorted({os.path.normpath(path) for path in paths})
+
+
+def apply_target(
+    path: str,
+    desired: AbstractSet[str],
+    hosts_format: HostsFormat = CLASSIC_FORMAT,
+    metrics: Optional[Metrics] = None,
+) -> TargetResult:
+    manager = HostsManager(path, metrics=metrics, hosts_format=hosts_format)
+    start = time.perf_counter()
+    try:
+        ok = manager.apply_hosts(desired)
+    except Exception as e:
+        return TargetResult(path, False, seconds=time.perf_counter() - start, error=str(e))
+    op = manager.last_stats
+    return TargetResult(
+        path,
+        ok,
+        added=op.added,
+        removed=op.removed,
+        write_skipped=op.write_skipped,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def apply_many(
+    config: "Config",
+    targets: Iterable[str],
+    jobs: int = DEFAULT_JOBS,
+    hosts_format: HostsFormat = CLASSIC_FORMAT,
+    metrics: Optional[Metrics] = None,
+) -> FanoutReport:
+    """Reconcile every target hosts file with ``config``, ``jobs`` at a time."""
+    start = time.perf_counter()
+    # Shared read-only by every worker
+    desired = frozenset(desired_hosts(config))
+    paths = list(targets)
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="fanout") as pool:
+        results = list(pool.map(lambda path: apply_target(path, desired, hosts_format, metrics), paths))
+    return FanoutReport(results, time.perf_counter() - start)
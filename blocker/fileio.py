@@ -0,0 +1,152 @@
+"""Cross-process file locking and atomic file replacement.
+
+``file_lock`` serialises writers across processes (``fcntl.flock`` on POSIX,
+``msvcrt.locking`` on Windows) through a sidecar ``.lock`` file, e.g.
+``/etc/hosts.lock`` for the hosts file, which is created on first use and
+left in place. ``atomic_write`` / ``atomic_replace`` replace a file through a
+synced temporary file so readers see either the old or the new content,
+never a truncated one. Both act on the file a symlink points to.
+
+A file that is a mount point of its own, as ``/etc/hosts`` is in Docker and
+other containers, cannot be renamed over (``EBUSY``/``EXDEV``); it is then
+rewritten in place instead, which is not atomic.
+"""
+
+import errno
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT = 10.0
+# rename() errors of a bind-mounted target
+_NOT_RENAMEABLE = (errno.EBUSY, errno.EXDEV)
+
+
+def lock_path(path: str) -> str:
+    """Sidecar lock file of ``path``, next to the file a symlink resolves to."""
+    return os.path.realpath(path) + LOCK_SUFFIX
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if os.name == "nt":
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int) -> None:
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+    """Hold the exclusive writer lock of ``path``.
+
+    Creates ``lock_path(path)`` if needed. Raises ``TimeoutError`` if another
+    process keeps the lock for ``timeout`` seconds.
+    """
+    fd = os.open(lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for the lock on {path}")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_replace(path: str) -> Iterator[BinaryIO]:
+    """Binary file whose content replaces ``path`` when the block exits.
+
+    The content goes to a temporary file that is synced and renamed over
+    ``path``, so it can be streamed without holding it in memory. The
+    permissions (and, where allowed, the owner) of an existing file are
+    carried over to the new one. A symlinked ``path`` keeps its link; the
+    file it points to is replaced. If the rename is refused because ``path``
+    is a mount point, the content is copied into it instead. On an exception
+    ``path`` is left untouched.
+    """
+    path = os.path.realpath(path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    renamed = True
+    try:
+        with open(tmp, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            pass
+        else:
+            os.chmod(tmp, st.st_mode & 0o7777)
+            if hasattr(os, "chown"):
+                try:
+                    os.chown(tmp, st.st_uid, st.st_gid)
+                except PermissionError:
+                    pass
+        try:
+            os.replace(tmp, path)
+        except OSError as e:
+            if e.errno not in _NOT_RENAMEABLE:
+                raise
+            _copy_into(tmp, path)
+            os.remove(tmp)
+            renamed = False
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    if renamed and os.name != "nt":
+        # Persist the rename itself
+        try:
+            dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+def _copy_into(source: str, path: str) -> None:
+    """Overwrite ``path`` in place with the content of ``source``."""
+    with open(source, "rb") as src, open(path, "r+b") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+        dst.truncate()
+        dst.flush()
+        os.fsync(dst.fileno())
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Replace ``path`` with ``data`` via temp file, fsync and rename."""
+    with atomic_replace(path) as f:
+        f.write(data)
@@ -1,9 +1,22 @@
 """Hosts file management for RUBlocker84."""
 
+import hashlib
+import ipaddress
 import logging
 import os
 import re
-from typing import Optional
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AbstractSet, Any, BinaryIO, Callable, Iterable, Iterator, Optional, Sequence, Union
+
+from .fileio import atomic_replace, file_lock
+from .metrics import METRICS, Metrics, OpStats
+from .names import normalize_hosts
+
+if TYPE_CHECKING:
+    from .config import BlockGroup, Config, HostDelta
+    from .journal import Journal
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +26,21 @@ HOSTS_FILE = (
     else "/etc/hosts"
 )
 BLOCK_IP = "127.0.0.2"
+# Addresses the managed section may point blocked names at
+SINK_ADDRESSES = (BLOCK_IP, "0.0.0.0", "::")
+IPV6_SINK = "::"
+
+# Hostnames per line the platform resolver reliably reads: the Windows DNS
+# client ignores aliases past the ninth, older glibc stops at 35
+MAX_ALIASES = 9 if os.name == "nt" else 35
+
+# Hosts files at least this large are memory-mapped and streamed instead of
+# being read into memory (see ``blocker.stream``)
+STREAM_THRESHOLD = 16 << 20
+
+# Markers delimiting the section of the hosts file owned by RUBlocker84
+SECTION_BEGIN = "# BEGIN RUBlocker84"
+SECTION_END = "# END RUBlocker84"
 
 # Valid hostname pattern (RFC 1123)
 HOSTNAME_PATTERN = re.compile(r"^[a-zA-Z0-9]([a-zA-Z0-9\-]*[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]*[a-zA-Z0-9])?)*$")
@@ -25,73 +53,736 @@ def validate_host(host: str) -> bool:
     return bool(HOSTNAME_PATTERN.match(host))
 
 
-def sanitize_hosts(hosts: list[str]) -> list[str]:
-    """Filter out invalid hosts."""
-    return [h for h in hosts if validate_host(h)]
+def sanitize_hosts(hosts: Iterable[str]) -> list[str]:
+    """Normalise hosts and drop invalid ones (see ``blocker.names``)."""
+    return [host for host in normalize_hosts(hosts) if not host.startswith("*")]
+
+
+def desired_hosts(config: "Config") -> set[str]:
+    """Collect the valid hosts of every enabled group."""
+    return set(config.index.blocked)
+
+
+@dataclass(frozen=True)
+class HostsFormat:
+    """Layout of the managed section.
+
+    The classic layout writes one ``127.0.0.2 host`` line per name; the compact
+    one packs up to ``aliases`` names per line, which shrinks the file and the
+    number of lines the resolver has to scan. With ``ipv6`` every line is
+    repeated for the ``::`` sink. Names are always sorted, so output is stable.
+    """
+
+    sink: str = BLOCK_IP
+    aliases: int = 1
+    ipv6: bool = False
+
+    def __post_init__(self):
+        if self.sink not in SINK_ADDRESSES:
+            raise ValueError(f"Unsupported sink address: {self.sink}")
+        if not 1 <= self.aliases <= MAX_ALIASES:
+            raise ValueError(f"aliases must be between 1 and {MAX_ALIASES}")
+
+    @classmethod
+    def compact(cls, ipv6: bool = False) -> "HostsFormat":
+        return cls(sink="0.0.0.0", aliases=MAX_ALIASES, ipv6=ipv6)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "HostsFormat":
+        """Format from the ``hosts_format`` config entry; aliases are capped."""
+        base = cls.compact() if data.get("compact") else cls()
+        aliases = data.get("aliases", base.aliases)
+        return cls(
+            sink=data.get("sink", base.sink),
+            aliases=max(1, min(int(aliases), MAX_ALIASES)),
+            ipv6=data.get("ipv6", False),
+        )
+
+    def lines(self, hosts: Iterable[str]) -> list[str]:
+        ordered = sorted(hosts)
+        sinks = [self.sink]
+        if self.ipv6 and self.sink != IPV6_SINK:
+            sinks.append(IPV6_SINK)
+        if self.aliases == 1 and len(sinks) == 1:
+            return [f"{self.sink} {host}\n" for host in ordered]
+        out = []
+        for i in range(0, len(ordered), self.aliases):
+            names = " ".join(ordered[i:i + self.aliases])
+            out.extend(f"{sink} {names}\n" for sink in sinks)
+        return out
+
+
+CLASSIC_FORMAT = HostsFormat()
+
+
+@dataclass(frozen=True)
+class HostsEntry:
+    """One address line of a hosts file."""
+
+    address: str
+    names: tuple[str, ...]
+    comment: str = ""
+
+
+@dataclass(frozen=True)
+class HostsConflict:
+    """A foreign entry mapping a blocked name to a real address."""
+
+    host: str
+    address: str
+    line: str
+
+
+def _valid_address(address: str) -> bool:
+    try:
+        ipaddress.ip_address(address.partition("%")[0])
+    except ValueError:
+        return False
+    return True
+
+
+def parse_entry(line: str) -> Optional[HostsEntry]:
+    """Parse one hosts-file line.
+
+    Handles tabs and runs of whitespace, aliases, IPv4 and IPv6 (with zone
+    index) addresses, CRLF endings and trailing ``#`` comments. Returns None
+    for blank lines, comments and lines without a valid address and name.
+    """
+    text, _, comment = line.partition("#")
+    parts = text.split()
+    if len(parts) < 2 or not _valid_address(parts[0]):
+        return None
+    return HostsEntry(parts[0], tuple(parts[1:]), comment.strip())
+
+
+def _section_hosts(line: str) -> list[str]:
+    """Hostnames of a sink entry in the managed section, in either layout."""
+    parts = line.split("#", 1)[0].split()
+    if len(parts) < 2 or parts[0] not in SINK_ADDRESSES:
+        return []
+    return parts[1:]
+
+
+def _blocked_host(line: str) -> Optional[str]:
+    """Return the hostname of a ``BLOCK_IP`` entry, or None for other lines."""
+    parts = line.split()
+    if len(parts) < 2 or parts[0] != BLOCK_IP:
+        return None
+    if len(parts) > 2 and not parts[2].startswith("#"):
+        return None
+    return parts[1]
+
+
+def _section_bounds(lines: list[str]) -> Optional[tuple[int, int]]:
+    """Indices of the managed section's begin and end marker lines.
+
+    The section is the last begin marker before the first end marker after
+    it. A begin marker with no end marker, e.g. in a truncated file, is no
+    section at all: what follows it cannot be told apart from foreign lines.
+    """
+    begin = None
+    for i, line in enumerate(lines):
+        if "RUBlocker84" not in line:
+            continue
+        stripped = line.strip()
+        if stripped.startswith(SECTION_BEGIN):
+            begin = i
+        elif begin is not None and stripped == SECTION_END:
+            return begin, i
+    return None
+
+
+def _section_hash(body: list[str]) -> Optional[str]:
+    if not body:
+        return None
+    return hashlib.sha256("".join(body).encode("utf-8")).hexdigest()
+
+
+class HostsFile:
+    """Parsed hosts file.
+
+    Blocked entries live in a managed section delimited by ``SECTION_BEGIN``
+    and ``SECTION_END``; the begin marker stores a hash of the section body so
+    an unchanged section is detected without comparing entries. All other
+    lines, including lines added to the section by hand and everything after
+    a begin marker that has no end marker, are kept verbatim and in order. Legacy ``BLOCK_IP`` entries found
+    outside the section are indexed by exact hostname until ``migrate`` moves
+    them into the section.
+
+    The section is read in any ``HostsFormat`` and written in ``hosts_format``;
+    switching formats changes the section hash and so forces one rewrite.
+    The section is written with the file's own line endings (CRLF or LF).
+    """
+
+    def __init__(self, lines: list[str], hosts_format: HostsFormat = CLASSIC_FORMAT):
+        self.hosts_format = hosts_format
+        self._lines: list[Optional[str]] = []
+        self._index: dict[str, list[int]] = {}
+        self._section: set[str] = set()
+        # (format, body, hash) of the last render; reset whenever the section changes
+        self._rendered: Optional[tuple[HostsFormat, list[str], Optional[str]]] = None
+        self._section_pos: Optional[int] = None
+        self._foreign: Optional[dict[str, list[tuple[str, str]]]] = None
+        self.stored_hash: Optional[str] = None
+        self._lines_changed = False
+        # Net blocked entries added and removed since parse or ``commit``
+        self._added: set[str] = set()
+        self._removed: set[str] = set()
+        self.lines_scanned = len(lines)
+        if lines and lines[0].endswith("\r\n"):
+            self.newline = "\r\n"
+        elif lines and lines[0].endswith("\n"):
+            self.newline = "\n"
+        else:
+            self.newline = os.linesep
+
+        bounds = _section_bounds(lines)
+        begin, end = bounds if bounds is not None else (len(lines), len(lines))
+        self._keep(lines[:begin])
+        body: list[str] = []
+        if bounds is not None:
+            marker = lines[begin].strip()
+            self.stored_hash = marker[len(SECTION_BEGIN):].strip().partition("sha256=")[2] or None
+            self._section_pos = len(self._lines)
+            self._lines.append(None)
+            kept = []
+            for line in lines[begin + 1:end]:
+                # Hash the section independently of its line endings
+                body.append(line.rstrip("\r\n") + "\n")
+                hosts = _section_hosts(line)
+                if hosts:
+                    self._section.update(hosts)
+                else:
+                    # Lines added to the section by hand end up right after it
+                    kept.append(line)
+            self._keep(kept)
+            self._keep(lines[end + 1:])
+
+        # A section edited by hand no longer matches its stored hash
+        self._intact = _section_hash(body) == self.stored_hash
+
+    def _keep(self, lines: list[str]) -> None:
+        """Append foreign lines, indexing legacy ``BLOCK_IP`` entries."""
+        for line in lines:
+            if line.lstrip().startswith(BLOCK_IP):
+                host = _blocked_host(line)
+                if host is not None:
+                    self._index.setdefault(host, []).append(len(self._lines))
+            self._lines.append(line)
+
+    @classmethod
+    def parse(cls, content: str, hosts_format: HostsFormat = CLASSIC_FORMAT) -> "HostsFile":
+        return cls(content.splitlines(keepends=True), hosts_format)
+
+    def __contains__(self, host: str) -> bool:
+        return host in self._section or host in self._index
+
+    def __len__(self) -> int:
+        return len(self._section) + sum(1 for h in self._index if h not in self._section)
+
+    def hosts(self) -> set[str]:
+        """Blocked hostnames currently present in the file."""
+        return self._section | self._index.keys()
+
+    @property
+    def legacy_hosts(self) -> set[str]:
+        """Blocked hostnames found outside the managed section."""
+        return set(self._index)
+
+    @property
+    def has_legacy(self) -> bool:
+        """Whether ``migrate`` has anything to move."""
+        return bool(self._index)
+
+    @property
+    def changed(self) -> bool:
+        return (
+            self._lines_changed
+            or not self._intact
+            or self.section_hash() != self.stored_hash
+        )
+
+    def _note_added(self, hosts: set[str]) -> None:
+        self._added |= hosts - self._removed
+        self._removed -= hosts
+
+    def _note_removed(self, host: str) -> None:
+        if host in self._added:
+            self._added.discard(host)
+        else:
+            self._removed.add(host)
+
+    def changes(self) -> tuple[set[str], set[str]]:
+        """Blocked entries (added, removed) since parse or the last ``commit``."""
+        return set(self._added), set(self._removed)
+
+    def add(self, host: str) -> bool:
+        if host in self:
+            return False
+        self._section.add(host)
+        self._rendered = None
+        self._note_added({host})
+        return True
+
+    def add_all(self, hosts: Iterable[str]) -> int:
+        """Add every host in ``hosts``; returns how many were new."""
+        new = set(hosts) - self._section - self._index.keys()
+        self._section |= new
+        self._rendered = None
+        self._note_added(new)
+        return len(new)
+
+    def _drop_legacy(self, positions: list[int]) -> None:
+        for pos in positions:
+            self._lines[pos] = None
+
+    def remove(self, host: str) -> bool:
+        found = host in self._section
+        self._section.discard(host)
+        self._rendered = None
+        positions = self._index.pop(host, None)
+        if positions is not None:
+            self._drop_legacy(positions)
+            self._lines_changed = True
+            found = True
+        if found:
+            self._note_removed(host)
+        return found
+
+    def prune(self, keep: set[str]) -> int:
+        """Remove blocked entries not in ``keep``; returns the number removed."""
+        removed = 0
+        for host in [h for h in self._section if h not in keep]:
+            self._section.discard(host)
+            self._rendered = None
+            if host not in self._index:
+                self._note_removed(host)
+            removed += 1
+        for host in [h for h in self._index if h not in keep]:
+            removed += len(self._index[host])
+            self.remove(host)
+        return removed
+
+    def migrate(self) -> int:
+        """Move legacy ``BLOCK_IP`` entries into the managed section."""
+        moved = 0
+        for host, positions in self._index.items():
+            self._drop_legacy(positions)
+            self._section.add(host)
+            self._rendered = None
+            moved += 1
+        if moved:
+            self._index.clear()
+            self._lines_changed = True
+        return moved
+
+    def _render_section(self) -> tuple[list[str], Optional[str]]:
+        """Section body and its hash, rendered again only after the section changed."""
+        if self._rendered is None or self._rendered[0] != self.hosts_format:
+            body = self.hosts_format.lines(self._section)
+            self._rendered = (self.hosts_format, body, _section_hash(body))
+        return self._rendered[1], self._rendered[2]
+
+    def section_body(self) -> list[str]:
+        return list(self._render_section()[0])
+
+    def section_hash(self) -> Optional[str]:
+        return self._render_section()[1]
+
+    def _section_lines(self) -> list[str]:
+        body, digest = self._render_section()
+        if not body:
+            return []
+        section = [f"{SECTION_BEGIN} sha256={digest}\n", *body, f"{SECTION_END}\n"]
+        if self.newline != "\n":
+            section = [line[:-1] + self.newline for line in section]
+        return section
+
+    def _split_lines(self) -> tuple[list[str], list[str]]:
+        """Kept lines before and after the section position."""
+        before = [line for line in self._lines[:self._section_pos] if line is not None]
+        after = []
+        if self._section_pos is not None:
+            after = [line for line in self._lines[self._section_pos + 1:] if line is not None]
+        return before, after
+
+    def lines(self) -> list[str]:
+        section = self._section_lines()
+        out, after = self._split_lines()
+        if out and not out[-1].endswith("\n") and section:
+            out[-1] += self.newline
+        out.extend(section)
+        out.extend(after)
+        return out
+
+    def commit(self) -> None:
+        """Mark the current state as written, as if re-parsed from ``render()``."""
+        before, after = self._split_lines()
+        if self._section:
+            if before and not before[-1].endswith("\n"):
+                before[-1] += self.newline
+            self._section_pos = len(before)
+            self._lines = [*before, None, *after]
+        else:
+            self._section_pos = None
+            self._lines = before + after
+        if self._index:
+            # Only legacy entries have positions to re-point
+            self._index = {}
+            for pos, line in enumerate(self._lines):
+                host = _blocked_host(line) if line is not None else None
+                if host is not None:
+                    self._index.setdefault(host, []).append(pos)
+        self.stored_hash = self.section_hash()
+        self._intact = True
+        self._lines_changed = False
+        self._added, self._removed = set(), set()
+
+    def entries(self) -> Iterator[HostsEntry]:
+        """Address entries outside the managed section."""
+        for line in self._lines:
+            if line is not None:
+                entry = parse_entry(line)
+                if entry is not None:
+                    yield entry
+
+    def conflicts(self, blocked: AbstractSet[str]) -> list[HostsConflict]:
+        """Foreign entries pointing a name in ``blocked`` at a non-sink address.
+
+        The resolver uses the first matching line, so such entries may
+        override the block. Foreign names are lowercased before the lookup.
+        """
+        if self._foreign is None:
+            # Foreign lines never change through this class, so index them once
+            self._foreign = {}
+            for line in self._lines:
+                if line is None:
+                    continue
+                entry = parse_entry(line)
+                if entry is None or entry.address in SINK_ADDRESSES:
+                    continue
+                for name in entry.names:
+                    self._foreign.setdefault(name.lower(), []).append((entry.address, line.strip()))
+        return [
+            HostsConflict(name, address, line)
+            for name in sorted(self._foreign)
+            if name in blocked
+            for address, line in self._foreign[name]
+        ]
+
+    def render(self) -> str:
+        return "".join(self.lines())
+
+    def write_to(self, out: BinaryIO) -> int:
+        """Write the rendered file to ``out``; returns the number of bytes."""
+        data = self.render().encode("utf-8")
+        out.write(data)
+        return len(data)
 
 
 class HostsManager:
-    def __init__(self, hosts_file: str = HOSTS_FILE):
+    def __init__(
+        self,
+        hosts_file: str = HOSTS_FILE,
+        metrics: Optional[Metrics] = None,
+        hosts_format: HostsFormat = CLASSIC_FORMAT,
+        journal: Optional["Journal"] = None,
+    ):
         self.hosts_file = hosts_file
+        self.metrics = metrics or METRICS
+        self.hosts_format = hosts_format
+        # Records every write for ``rollback`` (see ``blocker.journal``)
+        self.journal = journal
+        # Files of this size or more are streamed rather than loaded
+        self.stream_threshold = STREAM_THRESHOLD
+        # Statistics of this manager's most recent operation
+        self.last_stats: Optional[OpStats] = None
+        # Called as on_phase(phase, entries) when an update enters a phase
+        self.on_phase: Optional[Callable[[str, int], None]] = None
+        # Parsed file from the last operation, keyed by (inode, size, mtime)
+        self._parsed: Optional[tuple[tuple[int, int, int], HostsFile]] = None
+        self._parsed_lock = threading.Lock()
 
-    def update_group(self, hosts: list[str], enable: bool) -> bool:
-        hosts = sanitize_hosts(hosts)
-        if not hosts:
-            return True
+    def stats(self) -> dict:
+        """Statistics of the operations recorded so far (see ``blocker.metrics``)."""
+        return self.metrics.snapshot()
+
+    def _file_key(self) -> tuple[int, int, int]:
+        st = os.stat(self.hosts_file)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _remember(self, hosts_file: HostsFile, key: Optional[tuple[int, int, int]] = None) -> None:
+        """Keep ``hosts_file`` as the parsed form of the file as it is now on disk."""
+        try:
+            key = key or self._file_key()
+        except OSError:
+            return
+        with self._parsed_lock:
+            self._parsed = (key, hosts_file)
+
+    def _read(self, op: OpStats) -> Optional[tuple[tuple[int, int, int], HostsFile]]:
+        """Parse the hosts file, reusing the last parse while the file is unchanged.
 
+        The caller owns the returned model and hands it back with ``_remember``.
+        """
+        start = time.perf_counter()
         try:
-            with open(self.hosts_file, "r", encoding="utf-8") as f:
-                content = f.read()
-                lines = content.splitlines(keepends=True)
+            key = self._file_key()
+            with self._parsed_lock:
+                parsed, self._parsed = self._parsed, None
+            if parsed is not None and parsed[0] == key and parsed[1].hosts_format == self.hosts_format:
+                op.parse_cached = True
+                return parsed
+            if key[1] and key[1] >= self.stream_threshold:
+                from .stream import MappedHostsFile
+
+                hosts_file = MappedHostsFile(self.hosts_file, self.hosts_format)
+                op.bytes_read = hosts_file.size
+                op.lines_scanned = hosts_file.lines_scanned
+                return hosts_file.key, hosts_file
+            # newline="" keeps CRLF endings of foreign lines intact
+            with open(self.hosts_file, "r", encoding="utf-8", newline="") as f:
+                hosts_file = HostsFile.parse(f.read(), self.hosts_format)
+                op.bytes_read = f.tell()
+            op.lines_scanned = hosts_file.lines_scanned
+            return key, hosts_file
         except PermissionError:
             logger.error("Permission denied: run as Administrator")
-            return False
         except FileNotFoundError:
             logger.error(f"Hosts file not found: {self.hosts_file}")
-            return False
         except Exception as e:
             logger.error(f"Cannot read hosts file: {e}")
+        finally:
+            op.read_time = time.perf_counter() - start
+        return None
+
+    def _write(self, hosts_file: HostsFile, op: OpStats) -> bool:
+        start = time.perf_counter()
+        try:
+            with atomic_replace(self.hosts_file) as f:
+                op.bytes_written = hosts_file.write_to(f)
+        except PermissionError:
+            logger.error("Permission denied: run as Administrator")
+            return False
+        except Exception as e:
+            logger.error(f"Cannot write hosts file: {e}")
             return False
+        finally:
+            op.write_time = time.perf_counter() - start
+        return True
 
-        new_lines = []
-        changed = False
+    def _phase(self, phase: str, entries: int) -> None:
+        if self.on_phase is not None:
+            self.on_phase(phase, entries)
 
-        for line in lines:
-            stripped = line.strip()
-            if not stripped:
-                new_lines.append(line)
-                continue
+    def _finish(self, op: OpStats, start: float, ok: bool) -> bool:
+        op.ok = ok
+        op.total_time = time.perf_counter() - start
+        self.metrics.record(op)
+        self.last_stats = op
+        return ok
+
+    def _update(
+        self,
+        operation: str,
+        change: Callable[[HostsFile], tuple[int, int]],
+        done: Optional[Callable[[HostsFile], None]] = None,
+    ) -> bool:
+        """Read the hosts file once, apply ``change`` and write at most once.
+
+        ``change`` edits the parsed file and returns (added, removed). Writes
+        are journaled, unless ``done`` is given: it is then called instead,
+        still under the lock, once the update has succeeded.
+        """
+        start = time.perf_counter()
+        op = OpStats(operation, self.hosts_file)
+        try:
+            # Hold the writer lock across read-modify-write so concurrent
+            # processes cannot lose each other's changes
+            with file_lock(self.hosts_file):
+                return self._locked_update(operation, change, op, start, done)
+        except PermissionError:
+            logger.error("Permission denied: run as Administrator")
+        except OSError as e:
+            # Includes TimeoutError from a lock held elsewhere for too long
+            logger.error(f"Cannot lock hosts file: {e}")
+        return self._finish(op, start, False)
+
+    def _locked_update(
+        self,
+        operation: str,
+        change: Callable[[HostsFile], tuple[int, int]],
+        op: OpStats,
+        start: float,
+        done: Optional[Callable[[HostsFile], None]] = None,
+    ) -> bool:
+        self._phase("reading", 0)
+        parsed = self._read(op)
+        if parsed is None:
+            return self._finish(op, start, False)
+        key, hosts_file = parsed
 
+        self._phase("comparing", hosts_file.lines_scanned)
+        diff_start = time.perf_counter()
+        # Legacy entries are only found in files not yet written by this version
+        migrated = hosts_file.migrate() if hosts_file.has_legacy else 0
+        before = hosts_file.section_hash() if self.journal is not None and done is None else None
+        op.added, op.removed = change(hosts_file)
+        op.diff_time = time.perf_counter() - diff_start
+
+        if not hosts_file.changed:
+            op.write_skipped = True
+            self._remember(hosts_file, key)
+            if done is not None:
+                done(hosts_file)
+            return self._finish(op, start, True)
+
+        self._phase("writing", len(hosts_file))
+        ok = self._finish(op, start, self._write(hosts_file, op))
+        if ok:
+            added, removed = hosts_file.changes()
+            hosts_file.commit()
+            self._remember(hosts_file)
+            if done is not None:
+                done(hosts_file)
+            elif self.journal is not None:
+                self._record(operation, added, removed, before, hosts_file.stored_hash)
+            moved = f", {migrated} legacy entries moved" if migrated else ""
+            logger.info(
+                f"Hosts file updated by {operation}: {op.added} added, {op.removed} removed"
+                f"{moved} in {op.total_time * 1000:.1f} ms"
+            )
+        return ok
+
+    def _record(
+        self,
+        operation: str,
+        added: set[str],
+        removed: set[str],
+        before: Optional[str],
+        after: Optional[str],
+    ) -> None:
+        try:
+            self.journal.append(operation, added, removed, before, after)
+        except OSError as e:
+            # The hosts file is already written; only rollback is affected
+            logger.warning(f"Cannot record the change in the journal: {e}")
+
+    def apply(self, config: "Config") -> bool:
+        """Reconcile the hosts file with every group of ``config`` at once.
+
+        The hosts file is read once and written at most once; the write is
+        skipped when the blocked entries already match the config.
+        """
+        return self.apply_hosts(desired_hosts(config))
+
+    def apply_hosts(self, desired: AbstractSet[str]) -> bool:
+        """Make the blocked entries exactly ``desired``, as ``apply`` does."""
+
+        def change(hosts_file: HostsFile) -> tuple[int, int]:
+            removed = hosts_file.prune(desired)
+            return hosts_file.add_all(desired), removed
+
+        return self._update("apply", change)
+
+    def plan(self, config: "Config") -> Optional["HostDelta"]:
+        """Return the changes ``apply`` would make, without writing anything."""
+        from .config import HostDelta
+
+        start = time.perf_counter()
+        op = OpStats("plan", self.hosts_file, write_skipped=True)
+        parsed = self._read(op)
+        if parsed is None:
+            self._finish(op, start, False)
+            return None
+        key, hosts_file = parsed
+
+        diff_start = time.perf_counter()
+        desired = desired_hosts(config)
+        present = hosts_file.hosts()
+        delta = HostDelta(added=desired - present, removed=present - desired)
+        op.added, op.removed = len(delta.added), len(delta.removed)
+        op.diff_time = time.perf_counter() - diff_start
+        self._remember(hosts_file, key)
+        self._finish(op, start, True)
+        return delta
+
+    def conflicts(self, config: "Config") -> Optional[list[HostsConflict]]:
+        """Foreign entries that give names blocked by ``config`` a real address."""
+        start = time.perf_counter()
+        op = OpStats("conflicts", self.hosts_file, write_skipped=True)
+        parsed = self._read(op)
+        if parsed is None:
+            self._finish(op, start, False)
+            return None
+        key, hosts_file = parsed
+        diff_start = time.perf_counter()
+        conflicts = hosts_file.conflicts(config.index.blocked)
+        op.diff_time = time.perf_counter() - diff_start
+        self._remember(hosts_file, key)
+        self._finish(op, start, True)
+        return conflicts
+
+    def apply_delta(self, delta: "HostDelta") -> bool:
+        """Add and remove exactly the hosts in ``delta`` with one read and write."""
+        if not delta:
+            return True
+
+        def change(hosts_file: HostsFile) -> tuple[int, int]:
+            removed = sum(hosts_file.remove(host) for host in delta.removed)
+            return hosts_file.add_all(delta.added), removed
+
+        return self._update("apply_delta", change)
+
+    def rollback(self, steps: int = 1, force: bool = False) -> bool:
+        """Undo the newest ``steps`` journaled writes with one inverse delta.
+
+        Refused when the blocked entries no longer match the newest journal
+        entry, i.e. the file was changed without being journaled, unless
+        ``force`` is set. Rolled-back entries are dropped from the journal.
+        """
+        from .journal import JournalError, inverse_delta
+
+        if self.journal is None:
+            raise ValueError("rollback needs a journal")
+        if steps < 1:
+            return True
+        entries = []
+
+        def change(hosts_file: HostsFile) -> tuple[int, int]:
+            entries.extend(self.journal.entries(steps))
+            if len(entries) < steps:
+                raise JournalError(f"only {len(entries)} changes are recorded")
+            if not force and hosts_file.section_hash() != entries[-1].after:
+                raise JournalError("the hosts file changed since the last recorded write")
+            delta = inverse_delta(entries)
+            removed = sum(hosts_file.remove(host) for host in delta.removed)
+            return hosts_file.add_all(delta.added), removed
+
+        def done(hosts_file: HostsFile) -> None:
+            self.journal.drop_last(len(entries))
+            if hosts_file.section_hash() != entries[0].before:
+                logger.warning(f"Rolled back to a state that differs from the one before #{entries[0].seq}")
+
+        try:
+            return self._update("rollback", change, done)
+        except JournalError as e:
+            logger.error(f"Cannot roll back: {e}")
+            return False
+
+    def update_group(self, hosts: Union[Sequence[str], "BlockGroup"], enable: bool) -> bool:
+        """Add or remove one group's hosts.
+
+        Passing the ``BlockGroup`` itself reuses its cached validated hosts.
+        """
+        valid = getattr(hosts, "valid_hosts", None)
+        hosts = valid if valid is not None else sanitize_hosts(hosts)
+        if not hosts:
+            return True
+
+        def change(hosts_file: HostsFile) -> tuple[int, int]:
             if enable:
-                new_lines.append(line)
-            else:
-                if any(
-                    stripped.endswith(host) and stripped.startswith(BLOCK_IP)
-                    for host in hosts
-                ):
-                    logger.info(f"Removing hosts entry: {stripped}")
-                    changed = True
-                    continue
-                new_lines.append(line)
-
-        if enable:
-            for host in hosts:
-                entry = f"{BLOCK_IP} {host}\n"
-                if entry not in lines:
-                    new_lines.append(entry)
-                    logger.info(f"Adding hosts entry: {entry.strip()}")
-                    changed = True
-
-        if changed:
-            try:
-                with open(self.hosts_file, "w", encoding="utf-8") as f:
-                    f.writelines(new_lines)
-                logger.info("Hosts file updated")
-            except PermissionError:
-                logger.error("Permission denied: run as Administrator")
-                return False
-            except Exception as e:
-                logger.error(f"Cannot write hosts file: {e}")
-                return False
-
-        return True
\ No newline at end of file
+                return hosts_file.add_all(hosts), 0
+            return 0, sum(hosts_file.remove(host) for host in hosts)
+
+        return self._update("update_group", change)
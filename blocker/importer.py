@@ -0,0 +1,132 @@
+"""Streaming import of external blocklists for RUBlocker84.
+
+Supported line formats, detected per line:
+
+- hosts file entries: ``0.0.0.0 ads.example.com [alias ...]``
+- plain domains: ``ads.example.com``
+- adblock network rules: ``||ads.example.com^``
+
+Comments (``#``, ``!``) and unsupported rules are skipped.
+"""
+
+import heapq
+import logging
+import os
+import re
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+from .config import BlockGroup, Config
+from .names import WILDCARD_PREFIX
+from .names import normalize_host as _normalize
+from .store import DomainStore
+
+logger = logging.getLogger(__name__)
+
+# Hosts entries written for local names rather than blocking
+LOCAL_NAMES = {
+    "localhost", "localhost.localdomain", "local", "broadcasthost",
+    "ip6-localhost", "ip6-loopback", "ip6-localnet", "ip6-mcastprefix",
+    "ip6-allnodes", "ip6-allrouters", "ip6-allhosts", "0.0.0.0",
+}
+
+ADBLOCK_RULE = re.compile(r"^\|\|([^/^$*|]+)\^$")
+IP_PATTERN = re.compile(r"^(\d{1,3}(\.\d{1,3}){3}|[0-9a-fA-F:]*:[0-9a-fA-F:.]*(%\w+)?)$")
+
+# Number of unique names sorted in memory before spilling to a temporary file
+CHUNK_SIZE = 200_000
+
+
+def normalize_host(host: str) -> Optional[str]:
+    """Canonical form of a blocklist name; None for invalid, local and wildcard names."""
+    host = _normalize(host)
+    if host is None or host in LOCAL_NAMES or host.startswith(WILDCARD_PREFIX):
+        return None
+    return host
+
+
+def parse_line(line: str) -> list[str]:
+    """Return the raw hostnames found on one blocklist line."""
+    line = line.strip()
+    if not line or line[0] in "#![":
+        return []
+
+    match = ADBLOCK_RULE.match(line)
+    if match:
+        return [match.group(1)]
+    if line.startswith("||") or "$" in line:
+        return []
+
+    tokens = line.split("#", 1)[0].split()
+    if not tokens:
+        return []
+    if IP_PATTERN.match(tokens[0]):
+        return tokens[1:]
+    return tokens if len(tokens) == 1 else []
+
+
+def iter_domains(path: str) -> Iterator[str]:
+    """Yield normalised, valid hostnames from a blocklist file, line by line."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            for host in parse_line(line):
+                host = normalize_host(host)
+                if host is not None:
+                    yield host
+
+
+def _spill(chunk: set[str], directory: str) -> str:
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".txt")
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.writelines(f"{host}\n" for host in sorted(chunk))
+    return path
+
+
+def _read_run(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="ascii") as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def build_store(hosts: Iterable[str], chunk_size: int = CHUNK_SIZE) -> DomainStore:
+    """Sort and de-duplicate ``hosts`` into a ``DomainStore`` in bounded memory.
+
+    At most ``chunk_size`` unique names are held in a set at a time; full
+    chunks are sorted into temporary files and merged at the end.
+    """
+    chunk: set[str] = set()
+    with tempfile.TemporaryDirectory(prefix="rublocker-import-") as directory:
+        runs: list[str] = []
+        for host in hosts:
+            chunk.add(host)
+            if len(chunk) >= chunk_size:
+                runs.append(_spill(chunk, directory))
+                chunk.clear()
+
+        if not runs:
+            return DomainStore.from_sorted(sorted(chunk))
+        streams = [_read_run(path) for path in runs]
+        streams.append(iter(sorted(chunk)))
+        chunk.clear()
+        return DomainStore.from_sorted(heapq.merge(*streams))
+
+
+def import_blocklist(
+    config: Config,
+    name: str,
+    path: str,
+    description: str = "",
+    on: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> BlockGroup:
+    """Import a blocklist file as a new group of ``config``."""
+    if name in config.groups:
+        raise ValueError(f"Group already exists: {name}")
+
+    store = build_store(iter_domains(path), chunk_size)
+    group = BlockGroup(description=description or os.path.basename(path), hosts=store)
+    config.groups[name] = group
+    if on:
+        config.set_group(name, True)
+    logger.info(f"Imported {len(store)} hosts from {path} into group {name}")
+    return group
@@ -0,0 +1,225 @@
+"""Journal of hosts-file changes for fast rollback.
+
+Every write a ``HostsManager`` makes is recorded as one JSON line holding the
+blocked entries it added and removed, plus the section hash before and after.
+Storage therefore grows with the size of the changes, not of the hosts file.
+Rolling back replays the inverse of the newest entries as a single delta and
+drops them from the journal, so undoing a 100k-entry import costs about as
+much as applying it did. The hashes detect a hosts file changed behind the
+journal's back, in which case a rollback is refused unless forced.
+
+The journal lives next to the hosts file (``hosts.journal``) and, like the
+hosts file, is only modified under its ``file_lock``.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from .fileio import atomic_write
+
+if TYPE_CHECKING:
+    from .config import HostDelta
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal"
+# Compaction drops the oldest entries once either limit is exceeded, down to
+# half of it so that the rewrite is amortised over many appends
+MAX_ENTRIES = 100
+MAX_BYTES = 32 << 20
+
+_SEQ = re.compile(rb'^\{"seq": (\d+)')
+
+
+def journal_path(hosts_file: str) -> str:
+    return hosts_file + JOURNAL_SUFFIX
+
+
+class JournalError(Exception):
+    """The journal cannot be rolled back onto the hosts file as it is."""
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    seq: int
+    time: float
+    operation: str
+    added: tuple[str, ...]
+    removed: tuple[str, ...]
+    # Section hashes before and after the write (None for an empty section)
+    before: Optional[str]
+    after: Optional[str]
+
+    def to_json(self) -> str:
+        # "seq" first: the journal finds sequence numbers without parsing lines
+        return json.dumps({
+            "seq": self.seq,
+            "time": self.time,
+            "operation": self.operation,
+            "added": list(self.added),
+            "removed": list(self.removed),
+            "before": self.before,
+            "after": self.after,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JournalEntry":
+        return cls(
+            seq=data["seq"],
+            time=data["time"],
+            operation=data["operation"],
+            added=tuple(data["added"]),
+            removed=tuple(data["removed"]),
+            before=data["before"],
+            after=data["after"],
+        )
+
+    def describe(self) -> str:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        return f"#{self.seq} {stamp} {self.operation}: +{len(self.added)} -{len(self.removed)}"
+
+
+def inverse_delta(entries: Iterable[JournalEntry]) -> "HostDelta":
+    """One delta undoing ``entries`` (oldest first), newest change undone first."""
+    from .config import HostDelta
+
+    delta = HostDelta()
+    for entry in reversed(list(entries)):
+        delta.merge(HostDelta(added=set(entry.removed), removed=set(entry.added)))
+    return delta
+
+
+class Journal:
+    """Append-only JSON-lines journal of ``JournalEntry`` records."""
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _lines(self) -> list[bytes]:
+        try:
+            with open(self.path, "rb") as f:
+                return f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+    def _seqs(self) -> list[int]:
+        """Sequence number of every line, read from its prefix only."""
+        seqs = []
+        for line in self._lines():
+            match = _SEQ.match(line)
+            if match:
+                seqs.append(int(match.group(1)))
+        return seqs
+
+    def _bounds(self) -> Optional[tuple[int, int]]:
+        """(first, last) sequence numbers, reading only both ends of the file."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            first = _SEQ.match(f.readline(64))
+            end = f.seek(0, os.SEEK_END)
+            # Walk back to the start of the last line
+            pos = end - 1
+            start = 0
+            while pos > 0:
+                block = max(0, pos - 65536)
+                f.seek(block)
+                newline = f.read(pos - block).rfind(b"\n")
+                if newline != -1:
+                    start = block + newline + 1
+                    break
+                pos = block
+            f.seek(start)
+            last = _SEQ.match(f.read(64))
+        if first is None or last is None:
+            if end == 0:
+                return None
+            # Damaged ends: fall back to reading every line
+            seqs = self._seqs()
+            return (seqs[0], seqs[-1]) if seqs else None
+        return int(first.group(1)), int(last.group(1))
+
+    def entries(self, last: Optional[int] = None) -> list[JournalEntry]:
+        """Recorded entries, oldest first; only the newest ``last`` if given."""
+        lines = self._lines()
+        if last is not None:
+            lines = lines[-last:] if last > 0 else []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(JournalEntry.from_dict(json.loads(line)))
+            except (ValueError, KeyError, TypeError):
+                # A torn write at the end of the journal, or a foreign line
+                logger.warning(f"Skipping unreadable journal line in {self.path}")
+        return entries
+
+    def __len__(self) -> int:
+        bounds = self._bounds()
+        # Entries are only dropped from either end, so numbers are contiguous
+        return bounds[1] - bounds[0] + 1 if bounds else 0
+
+    def append(
+        self,
+        operation: str,
+        added: Iterable[str],
+        removed: Iterable[str],
+        before: Optional[str],
+        after: Optional[str],
+    ) -> JournalEntry:
+        bounds = self._bounds()
+        count = bounds[1] - bounds[0] + 1 if bounds else 0
+        entry = JournalEntry(
+            seq=bounds[1] + 1 if bounds else 1,
+            time=time.time(),
+            operation=operation,
+            added=tuple(sorted(added)),
+            removed=tuple(sorted(removed)),
+            before=before,
+            after=after,
+        )
+        line = entry.to_json().encode("utf-8") + b"\n"
+        with open(self.path, "a+b") as f:
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a torn line so the new entry stays readable
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        if count + 1 > self.max_entries or os.path.getsize(self.path) > self.max_bytes:
+            self.compact()
+        return entry
+
+    def _rewrite(self, lines: list[bytes]) -> None:
+        atomic_write(self.path, b"".join(line + b"\n" for line in lines))
+
+    def compact(self) -> int:
+        """Drop the oldest entries down to half the limits; returns how many."""
+        lines = self._lines()
+        keep, size = 0, 0
+        for line in reversed(lines):
+            # The newest entry is always kept, however large
+            if keep and (keep >= self.max_entries // 2 or size + len(line) + 1 > self.max_bytes // 2):
+                break
+            keep += 1
+            size += len(line) + 1
+        dropped = len(lines) - keep
+        if dropped:
+            self._rewrite(lines[dropped:])
+            logger.info(f"Compacted hosts journal: {dropped} oldest entries dropped")
+        return dropped
+
+    def drop_last(self, count: int) -> None:
+        """Forget the newest ``count`` entries, e.g. once they are rolled back."""
+        if count > 0:
+            self._rewrite(self._lines()[:-count])
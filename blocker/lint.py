@@ -0,0 +1,196 @@
+"""Blocklist analysis for RUBlocker84.
+
+Reports, per group, entries that are repeated, invalid (silently dropped on
+every apply), not in canonical form or matched by a wildcard of the same
+group, plus the hosts shared between groups. Entries are compared in their
+normalised form (see ``blocker.names``). Every check is a constant number of hash lookups per label of
+an entry, so a million-entry config is analysed in linear time.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .config import BlockGroup, Config
+from .names import normalize_host
+from .storage import ShardHosts
+from .store import DomainStore
+from .trie import WILDCARD_PREFIX, is_wildcard
+
+
+@dataclass
+class GroupIssues:
+    duplicates: list[str] = field(default_factory=list)
+    invalid: list[str] = field(default_factory=list)
+    # (wildcard, broader wildcard of the same group that makes it redundant)
+    covered_patterns: list[tuple[str, str]] = field(default_factory=list)
+    # (hostname, wildcard of the same group matching it). Not removable: the
+    # hosts file has no wildcards, so listed names are what a wildcard expands to
+    covered_hosts: list[tuple[str, str]] = field(default_factory=list)
+    # (entry, its canonical form) for entries written differently, e.g. "MC.Ya.ru."
+    normalised: list[tuple[str, str]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.duplicates or self.invalid or self.covered_patterns or self.covered_hosts or self.normalised
+        )
+
+    @property
+    def removable(self) -> int:
+        return len(self.duplicates) + len(self.invalid) + len(self.covered_patterns)
+
+
+@dataclass
+class LintReport:
+    groups: dict[str, GroupIssues] = field(default_factory=dict)
+    # (group, group) -> number of entries both contain
+    overlap: dict[tuple[str, str], int] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return any(self.groups.values())
+
+    @property
+    def removable(self) -> int:
+        return sum(issues.removable for issues in self.groups.values())
+
+    @property
+    def normalised(self) -> int:
+        return sum(len(issues.normalised) for issues in self.groups.values())
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "groups": {
+                name: {
+                    "duplicates": issues.duplicates,
+                    "invalid": issues.invalid,
+                    "covered_patterns": [
+                        {"pattern": host, "by": pattern} for host, pattern in issues.covered_patterns
+                    ],
+                    "covered_hosts": [{"host": host, "by": pattern} for host, pattern in issues.covered_hosts],
+                    "normalised": [{"entry": entry, "as": name} for entry, name in issues.normalised],
+                }
+                for name, issues in self.groups.items()
+                if issues
+            },
+            "overlap": [{"groups": list(pair), "shared": count} for pair, count in self.overlap.items()],
+            "removable": self.removable,
+        }
+
+    def format(self) -> str:
+        lines = []
+        for name, issues in self.groups.items():
+            for host in issues.duplicates:
+                lines.append(f"{name}: duplicate entry {host}")
+            for host in issues.invalid:
+                lines.append(f"{name}: invalid entry {host!r}")
+            for host, pattern in issues.covered_patterns:
+                lines.append(f"{name}: {host} is redundant next to {pattern}")
+            for host, pattern in issues.covered_hosts:
+                lines.append(f"{name}: {host} is matched by {pattern} (kept for the hosts file)")
+            for entry, host in issues.normalised:
+                lines.append(f"{name}: {entry!r} is blocked as {host}")
+        for (first, second), count in self.overlap.items():
+            lines.append(f"{first} and {second} share {count} entries")
+        lines.append(f"{self.removable} entries can be removed without changing what is blocked")
+        return "\n".join(lines)
+
+
+def _group_issues(group: BlockGroup) -> tuple[GroupIssues, list[str]]:
+    """Issues of one group and its entries that are worth keeping."""
+    issues = GroupIssues()
+    if isinstance(group.hosts, DomainStore):
+        # Imported stores are sorted, unique and validated already
+        return issues, list(group.hosts)
+
+    seen: set[str] = set()
+    entries: list[str] = []
+    patterns: list[str] = []
+    for entry in group.hosts:
+        host = normalize_host(entry)
+        key = entry if host is None else host
+        if key in seen:
+            issues.duplicates.append(entry)
+            continue
+        seen.add(key)
+        if host is None:
+            issues.invalid.append(entry)
+            continue
+        if host != entry:
+            issues.normalised.append((entry, host))
+        if is_wildcard(host):
+            patterns.append(host)
+        entries.append(host)
+
+    if not patterns:
+        return issues, entries
+    wildcards = set(patterns)
+    kept = []
+    for host in entries:
+        wildcard = is_wildcard(host)
+        pattern = _covering_pattern(wildcards, host[len(WILDCARD_PREFIX):] if wildcard else host)
+        if pattern is None:
+            kept.append(host)
+        elif wildcard:
+            issues.covered_patterns.append((host, pattern))
+        else:
+            issues.covered_hosts.append((host, pattern))
+            kept.append(host)
+    return issues, kept
+
+
+def _covering_pattern(wildcards: set[str], host: str) -> Optional[str]:
+    """Broadest wildcard in ``wildcards`` matching ``host``: one lookup per label."""
+    labels = host.split(".")
+    for i in range(len(labels) - 1, 0, -1):
+        pattern = WILDCARD_PREFIX + ".".join(labels[i:])
+        if pattern in wildcards:
+            return pattern
+    return None
+
+
+def lint_config(config: Config, loaded_only: bool = False) -> LintReport:
+    """Analyse every group of ``config``; nothing is modified.
+
+    With ``loaded_only`` groups whose shard has not been read yet are left
+    out, so the check never loads a shard by itself.
+    """
+    report = LintReport()
+    owners: dict[str, list[str]] = {}
+    for name, group in config.groups.items():
+        if loaded_only and isinstance(group.hosts, ShardHosts) and not group.hosts.loaded:
+            continue
+        issues, kept = _group_issues(group)
+        report.groups[name] = issues
+        for host in kept:
+            owners.setdefault(host, []).append(name)
+
+    pairs: Counter = Counter()
+    for groups in owners.values():
+        if len(groups) > 1:
+            for i, first in enumerate(groups):
+                for second in groups[i + 1:]:
+                    pairs[first, second] += 1
+    report.overlap = dict(sorted(pairs.items()))
+    return report
+
+
+def minimise_config(config: Config) -> int:
+    """Drop duplicate, invalid and redundant wildcard entries; returns how many.
+
+    Remaining entries are rewritten in canonical form. What is blocked stays
+    the same. Shared hosts are kept in every group that lists them, since
+    groups are toggled independently, and so are names a wildcard matches,
+    since they are what the wildcard expands to.
+    """
+    removed = 0
+    changed = False
+    for group in config.groups.values():
+        issues, kept = _group_issues(group)
+        if issues.removable or issues.normalised:
+            # A new list also invalidates the group's validation cache
+            group.hosts = kept
+            removed += issues.removable
+            changed = True
+    if changed:
+        config._index = None
+    return removed
@@ -0,0 +1,132 @@
+"""Hot-path instrumentation for RUBlocker84.
+
+Every hosts-file operation and config reload records an ``OpStats``. The
+``Metrics`` registry keeps the latest record per operation plus cumulative
+totals, and can render them in the Prometheus text exposition format for the
+node_exporter textfile collector.
+"""
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+
+@dataclass
+class OpStats:
+    """Counters and phase timings (seconds) of one operation."""
+
+    operation: str
+    target: str = ""
+    lines_scanned: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    added: int = 0
+    removed: int = 0
+    write_skipped: bool = False
+    parse_cached: bool = False
+    ok: bool = True
+    read_time: float = 0.0
+    diff_time: float = 0.0
+    write_time: float = 0.0
+    total_time: float = 0.0
+    timestamp: float = field(default_factory=time.time)
+
+
+# Numeric OpStats fields exported as Prometheus gauges: (field, metric, help)
+_GAUGES = [
+    ("lines_scanned", "lines_scanned", "Hosts-file lines scanned by the last operation."),
+    ("bytes_read", "bytes_read", "Bytes read by the last operation."),
+    ("bytes_written", "bytes_written", "Bytes written by the last operation."),
+    ("added", "entries_added", "Entries added by the last operation."),
+    ("removed", "entries_removed", "Entries removed by the last operation."),
+    ("write_skipped", "write_skipped", "1 if the last operation skipped its write."),
+    ("parse_cached", "parse_cached", "1 if the last operation reused the parsed hosts file."),
+    ("ok", "success", "1 if the last operation succeeded."),
+    ("timestamp", "last_timestamp_seconds", "Unix time of the last operation."),
+]
+_PHASES = ["read", "diff", "write", "total"]
+
+
+class Metrics:
+    """Thread-safe registry of operation statistics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last: dict[str, OpStats] = {}
+        self._totals: dict[str, dict[str, float]] = {}
+
+    def record(self, stats: OpStats) -> None:
+        with self._lock:
+            self._last[stats.operation] = stats
+            totals = self._totals.setdefault(stats.operation, {
+                "count": 0, "errors": 0, "writes_skipped": 0, "seconds": 0.0,
+                "bytes_read": 0, "bytes_written": 0, "added": 0, "removed": 0,
+            })
+            totals["count"] += 1
+            totals["errors"] += not stats.ok
+            totals["writes_skipped"] += stats.write_skipped
+            totals["seconds"] += stats.total_time
+            totals["bytes_read"] += stats.bytes_read
+            totals["bytes_written"] += stats.bytes_written
+            totals["added"] += stats.added
+            totals["removed"] += stats.removed
+
+    def last(self, operation: str) -> Optional[OpStats]:
+        with self._lock:
+            return self._last.get(operation)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                operation: {"last": asdict(stats), "totals": dict(self._totals[operation])}
+                for operation, stats in self._last.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._last.clear()
+            self._totals.clear()
+
+    def to_prometheus(self, prefix: str = "rublocker") -> str:
+        with self._lock:
+            last = dict(self._last)
+            totals = {op: dict(t) for op, t in self._totals.items()}
+
+        out = [
+            f"# HELP {prefix}_op_duration_seconds Wall time of the last operation by phase.",
+            f"# TYPE {prefix}_op_duration_seconds gauge",
+        ]
+        for op, stats in sorted(last.items()):
+            for phase in _PHASES:
+                out.append(
+                    f'{prefix}_op_duration_seconds{{operation="{op}",phase="{phase}"}} '
+                    f"{getattr(stats, phase + '_time'):.6f}"
+                )
+        for attr, metric, help_text in _GAUGES:
+            out.append(f"# HELP {prefix}_op_{metric} {help_text}")
+            out.append(f"# TYPE {prefix}_op_{metric} gauge")
+            for op, stats in sorted(last.items()):
+                out.append(f'{prefix}_op_{metric}{{operation="{op}"}} {float(getattr(stats, attr)):g}')
+        for key in ("count", "errors", "writes_skipped", "seconds"):
+            out.append(f"# HELP {prefix}_ops_{key}_total Cumulative {key.replace('_', ' ')} per operation.")
+            out.append(f"# TYPE {prefix}_ops_{key}_total counter")
+            for op, total in sorted(totals.items()):
+                out.append(f'{prefix}_ops_{key}_total{{operation="{op}"}} {total[key]:g}')
+        return "\n".join(out) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically write the Prometheus exposition to ``path``."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+
+METRICS = Metrics()
+
+
+def stats() -> dict[str, Any]:
+    """Statistics recorded in this process by the default registry."""
+    return METRICS.snapshot()
@@ -0,0 +1,99 @@
+"""Hostname normalisation and validation for RUBlocker84.
+
+Names are brought into one canonical form when they enter the config, on
+load or import: surrounding whitespace and one trailing dot are stripped,
+case is folded and internationalised names (``пример.рф``) are converted to
+their IDNA ASCII form (``xn--e1afmkfd.xn--p1ai``), which is what resolvers
+look up. ``MC.Yandex.ru`` and ``mc.yandex.ru.`` therefore end up as the same
+entry. Wildcard patterns keep their ``*.`` prefix.
+
+``normalize_host`` memoises its results in a bounded cache. ``normalize_hosts``
+handles whole lists: a batch that is canonical already, the common case for
+saved configs and imports, is verified with a few C-level scans of the joined
+names, and only the names of batches that fail are looked at one by one.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+WILDCARD_PREFIX = "*."
+MAX_NAME_LENGTH = 253
+# Distinct names whose normal form is remembered
+NAME_CACHE_SIZE = 1 << 16
+# Names checked together by normalize_hosts, and in a failing batch
+BATCH_SIZE = 4096
+SUB_BATCH_SIZE = 64
+
+_LABEL = r"[a-z0-9](?:[a-z0-9-]*[a-z0-9])?"
+# A canonical (lowercase ASCII, RFC 1123) name
+CANONICAL_PATTERN = re.compile(rf"{_LABEL}(?:\.{_LABEL})*")
+# Newline-terminated canonical names. Each run must be followed by a character
+# it cannot contain, so backtracking into a run fails at once and a failed
+# match stays linear without possessive quantifiers (Python 3.11+ only).
+_CANONICAL_LINES = re.compile(r"(?:[a-z0-9]+(?:-+[a-z0-9]+)*[.\n])*")
+
+
+def _canonical_batch(hosts: list[str]) -> bool:
+    """Whether every entry of ``hosts`` is canonical, checked on the joined text."""
+    joined = "\n".join(hosts) + "\n"
+    return (
+        _CANONICAL_LINES.fullmatch(joined) is not None
+        # Embedded newlines would be taken for separators
+        and joined.count("\n") == len(hosts)
+        and max(map(len, hosts), default=0) <= MAX_NAME_LENGTH
+    )
+
+
+def _canonical_name(name: str) -> Optional[str]:
+    if name.endswith("."):
+        name = name[:-1]
+    name = name.casefold()
+    if not name.isascii():
+        try:
+            name = name.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    if len(name) > MAX_NAME_LENGTH or not CANONICAL_PATTERN.fullmatch(name):
+        return None
+    return name
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def normalize_host(host: str) -> Optional[str]:
+    """Canonical form of a hostname or ``*.domain`` pattern; None if invalid."""
+    host = host.strip()
+    if host.startswith(WILDCARD_PREFIX):
+        name = _canonical_name(host[len(WILDCARD_PREFIX):])
+        return None if name is None else WILDCARD_PREFIX + name
+    return _canonical_name(host)
+
+
+def is_canonical(host: str) -> bool:
+    """Whether ``host`` is a valid name already in canonical form."""
+    return len(host) <= MAX_NAME_LENGTH and CANONICAL_PATTERN.fullmatch(host) is not None
+
+
+def normalize_hosts(hosts: Iterable[str]) -> list[str]:
+    """Canonical forms of the valid entries of ``hosts``, in order."""
+    hosts = hosts if isinstance(hosts, list) else list(hosts)
+    out: list[str] = []
+    for start in range(0, len(hosts), BATCH_SIZE):
+        batch = hosts[start:start + BATCH_SIZE]
+        if _canonical_batch(batch):
+            out.extend(batch)
+            continue
+        # Narrow down to the few entries that need work
+        for sub in range(0, len(batch), SUB_BATCH_SIZE):
+            names = batch[sub:sub + SUB_BATCH_SIZE]
+            if _canonical_batch(names):
+                out.extend(names)
+                continue
+            for host in names:
+                if is_canonical(host):
+                    out.append(host)
+                else:
+                    name = normalize_host(host)
+                    if name is not None:
+                        out.append(name)
+    return out
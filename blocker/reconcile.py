@@ -0,0 +1,181 @@
+"""Background initial reconciliation for the interactive menu.
+
+Loading the config, indexing its groups and bringing the hosts file in line
+with it all scale with the size of the blocklists. ``BackgroundReconciler``
+runs these steps on a worker thread so the menu can draw at once, and exposes
+their progress for the menu header. Toggles made in the meantime go through
+``toggle``, which orders them after the initial snapshot so the writer folds
+them into the same write instead of racing it.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable, Optional
+
+from .config import Config, HostDelta, load_config
+from .hosts import HostsFormat, HostsManager, desired_hosts
+from .lint import lint_config
+from .writer import HostsWriter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Progress:
+    """Current phase of the reconciliation and how far into it the worker is."""
+
+    phase: str = "starting"
+    done: int = 0
+    total: int = 0
+    started: float = field(default_factory=time.monotonic)
+    phase_started: float = field(default_factory=time.monotonic)
+    finished: bool = False
+    error: str = ""
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left in this phase, extrapolated from its rate so far."""
+        if not self.total or not self.done or self.done >= self.total:
+            return None
+        elapsed = time.monotonic() - self.phase_started
+        return elapsed * (self.total - self.done) / self.done
+
+    def describe(self) -> str:
+        if self.error:
+            return f"Hosts file not updated: {self.error}"
+        if self.finished:
+            return f"Hosts file in sync ({time.monotonic() - self.started:.1f} s)"
+        text = self.phase.capitalize()
+        if self.total:
+            text += f": {self.done}/{self.total} entries"
+        elif self.done:
+            text += f": {self.done} entries"
+        eta = self.eta
+        if eta is not None:
+            text += f", about {eta:.0f} s left"
+        return text + "..."
+
+
+class BackgroundReconciler:
+    """Load, index and apply a config on a worker thread.
+
+    ``wait_ready`` blocks until the config is loaded and indexed, which is
+    what menu actions need; ``wait`` blocks until the hosts file is in sync.
+    """
+
+    def __init__(
+        self,
+        config_file: Optional[str],
+        manager: HostsManager,
+        writer: HostsWriter,
+        loader: Callable[[Optional[str]], Config] = load_config,
+    ):
+        self.config_file = config_file
+        self.manager = manager
+        self.writer = writer
+        self.loader = loader
+        self.config: Optional[Config] = None
+        self.error: Optional[Exception] = None
+        self.ok: Optional[bool] = None
+        # Notes for the user found along the way, e.g. lint findings
+        self.hints: list[str] = []
+        # Held while the config's groups or index change
+        self.lock = threading.RLock()
+        self._progress = Progress()
+        self._progress_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="reconciler", daemon=True)
+
+    def start(self) -> "BackgroundReconciler":
+        self._thread.start()
+        return self
+
+    @property
+    def progress(self) -> Progress:
+        with self._progress_lock:
+            return replace(self._progress)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def _set_phase(self, phase: str, done: int = 0, total: int = 0) -> None:
+        with self._progress_lock:
+            if phase != self._progress.phase:
+                self._progress.phase_started = time.monotonic()
+            self._progress.phase = phase
+            self._progress.done = done
+            self._progress.total = total
+
+    def _on_index(self, done: int, total: int) -> None:
+        self._set_phase("indexing groups", done, total)
+
+    def _on_hosts_phase(self, phase: str, entries: int) -> None:
+        self._set_phase(f"{phase} hosts file", entries)
+
+    def _run(self) -> None:
+        try:
+            self._set_phase("loading config")
+            config = self.loader(self.config_file)
+            self.manager.hosts_format = HostsFormat.from_dict(config.hosts_format)
+            self.manager.on_phase = self._on_hosts_phase
+            with self.lock:
+                config.build_index(self._on_index)
+                self.config = config
+                desired = frozenset(desired_hosts(config))
+                self._set_phase("queued", len(desired))
+                # Queued before any toggle can be, so the snapshot never drops one
+                written = self.writer.submit_hosts(desired)
+            self._ready.set()
+            self.ok = written.result()
+            self._set_phase("checking config")
+            self._lint(config)
+        except Exception as e:
+            logger.error(f"Initial reconciliation failed: {e}")
+            self.error = e
+            self.ok = False
+        finally:
+            self.manager.on_phase = None
+            with self._progress_lock:
+                self._progress.finished = True
+                if self.ok is False:
+                    self._progress.error = str(self.error or "see the log")
+            self._ready.set()
+            self._done.set()
+
+    def _lint(self, config: Config) -> None:
+        """Add a hint if the loaded groups hold entries ``rucli lint`` would remove.
+
+        Runs without ``lock`` so toggles are never held up by it, and skips
+        shards that are not loaded, i.e. disabled groups of a sharded config.
+        """
+        try:
+            report = lint_config(config, loaded_only=True)
+        except Exception as e:
+            logger.warning(f"Cannot check the config: {e}")
+            return
+        if report.removable:
+            self.hints.append(
+                f"Config has {report.removable} redundant or invalid entries; run 'rucli lint' for details"
+            )
+
+    def wait_ready(self, timeout: Optional[float] = None) -> Optional[Config]:
+        """The loaded, indexed config (None if loading failed)."""
+        self._ready.wait(timeout)
+        return self.config
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def toggle(self, name: str) -> HostDelta:
+        """Toggle a group and queue the delta behind the initial snapshot."""
+        config = self.wait_ready()
+        if config is None:
+            raise RuntimeError("config is not loaded")
+        with self.lock:
+            delta = config.toggle_group(name)
+            self.writer.submit(delta)
+        return delta
@@ -0,0 +1,106 @@
+"""Sharded per-group host storage for RUBlocker84.
+
+In the sharded layout ``config.json`` is a small index holding only group
+metadata; each group's hosts live in their own shard file, one host per line,
+in a ``<config name>.groups`` directory next to it. Shards are read lazily,
+so disabled groups that are never inspected are never loaded, and toggling a
+group only rewrites the index.
+"""
+
+import hashlib
+import os
+import re
+from typing import Iterator, Optional, Sequence, Union
+
+from .store import DomainStore
+
+SHARD_SUFFIX = ".hosts"
+
+
+def shard_dir(config_file: str) -> str:
+    return os.path.splitext(config_file)[0] + ".groups"
+
+
+def shard_name(group: str, taken: set[str]) -> str:
+    """File name for a group's shard, unique among ``taken``."""
+    base = re.sub(r"[^A-Za-z0-9_.-]", "_", group).lstrip(".") or "group"
+    name, n = base, 1
+    while name + SHARD_SUFFIX in taken:
+        n += 1
+        name = f"{base}_{n}"
+    return name + SHARD_SUFFIX
+
+
+class ShardHosts(Sequence[str]):
+    """Host list of one group, read from its shard file on first use."""
+
+    def __init__(
+        self,
+        path: str,
+        count: Optional[int] = None,
+        digest: Optional[str] = None,
+        compact: bool = False,
+    ):
+        self.path = path
+        self.count = count
+        self.digest = digest
+        self.compact = compact
+        self._hosts: Optional[Sequence[str]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._hosts is not None
+
+    def hosts(self) -> Sequence[str]:
+        if self._hosts is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    lines = [line.rstrip("\r\n") for line in f if line.strip()]
+            except FileNotFoundError:
+                lines = []
+            self._hosts = DomainStore.from_sorted(lines) if self.compact else lines
+            self.count = len(self._hosts)
+        return self._hosts
+
+    def __len__(self) -> int:
+        if self._hosts is None and self.count is not None:
+            return self.count
+        return len(self.hosts())
+
+    def __getitem__(self, index: Union[int, slice]):
+        return self.hosts()[index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.hosts())
+
+    def __contains__(self, host: object) -> bool:
+        return host in self.hosts()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ShardHosts) and self.digest and other.digest:
+            return self.digest == other.digest
+        if isinstance(other, (ShardHosts, DomainStore, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ShardHosts({self.path!r}, count={self.count})"
+
+
+def write_shard(path: str, hosts: Sequence[str]) -> ShardHosts:
+    """Write ``hosts`` to a shard file and return its lazy handle, already loaded."""
+    data = "".join(f"{host}\n" for host in hosts).encode("utf-8")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+    shard = ShardHosts(
+        path,
+        count=len(hosts),
+        digest=hashlib.sha256(data).hexdigest(),
+        compact=isinstance(hosts, DomainStore),
+    )
+    shard._hosts = hosts
+    return shard
@@ -0,0 +1,82 @@
+"""Compact storage for large host lists."""
+
+import bisect
+from array import array
+from typing import Iterable, Iterator, Sequence, Union, overload
+
+
+class DomainStore(Sequence[str]):
+    """Immutable, sorted, de-duplicated list of ASCII hostnames.
+
+    All names share one ``bytes`` buffer indexed by an array of 32-bit offsets,
+    which takes a fraction of the memory of a Python list of strings.
+    Membership is a binary search.
+    """
+
+    __slots__ = ("_data", "_offsets")
+
+    def __init__(self, data: bytes = b"", offsets: "array[int]" = None):
+        self._data = data
+        self._offsets = offsets if offsets is not None else array("I", [0])
+
+    @classmethod
+    def from_sorted(cls, hosts: Iterable[str]) -> "DomainStore":
+        """Build from names already in ascending order; adjacent duplicates are dropped."""
+        data = bytearray()
+        offsets = array("I", [0])
+        previous = None
+        for host in hosts:
+            if host == previous:
+                continue
+            previous = host
+            data += host.encode("ascii")
+            offsets.append(len(data))
+        return cls(bytes(data), offsets)
+
+    @classmethod
+    def from_hosts(cls, hosts: Iterable[str]) -> "DomainStore":
+        return cls.from_sorted(sorted(set(hosts)))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, list[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("DomainStore index out of range")
+        return self._data[self._offsets[index]:self._offsets[index + 1]].decode("ascii")
+
+    def __iter__(self) -> Iterator[str]:
+        data, offsets = self._data, self._offsets
+        for i in range(len(offsets) - 1):
+            yield data[offsets[i]:offsets[i + 1]].decode("ascii")
+
+    def __contains__(self, host: object) -> bool:
+        if not isinstance(host, str):
+            return False
+        i = bisect.bisect_left(self, host)
+        return i < len(self) and self[i] == host
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, DomainStore):
+            return self._data == other._data and self._offsets == other._offsets
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"DomainStore({len(self)} hosts)"
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the stored names."""
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
@@ -0,0 +1,356 @@
+"""Streaming model of very large hosts files.
+
+``HostsFile`` keeps every line of the file as a string, so an update holds
+several copies of the file in memory. ``MappedHostsFile`` instead memory-maps
+the file and records only byte offsets: where the managed section is and
+where legacy ``BLOCK_IP`` lines outside it are. Searching for those runs in C
+(``mmap.find``) one window at a time, and a rewrite copies the untouched byte
+ranges straight from the mapping to the output, so only blocker-owned lines
+are ever decoded. Pages behind the cursor are released as it moves, which
+keeps peak memory independent of the file size.
+"""
+
+import bisect
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from typing import AbstractSet, BinaryIO, Iterator, Optional
+
+from .hosts import (
+    BLOCK_IP,
+    CLASSIC_FORMAT,
+    SECTION_BEGIN,
+    SECTION_END,
+    SINK_ADDRESSES,
+    HostsConflict,
+    HostsEntry,
+    HostsFile,
+    HostsFormat,
+    _blocked_host,
+    _section_hash,
+    _section_hosts,
+    parse_entry,
+)
+
+# Bytes searched, copied or counted per step; a multiple of the page size
+WINDOW = 1 << 20
+
+_BEGIN = SECTION_BEGIN.encode("ascii")
+_END = SECTION_END.encode("ascii")
+_BLOCK = BLOCK_IP.encode("ascii")
+
+
+def _release(mm: mmap.mmap, start: int, end: int) -> None:
+    """Drop the pages of ``[start, end)`` from memory; they are re-read on access."""
+    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+        start -= start % mmap.PAGESIZE
+        if end > start:
+            mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def _at_line_start(mm: mmap.mmap, needle: bytes, start: int, stop: int) -> int:
+    """First occurrence of ``needle`` in ``[start, stop)`` that begins a line."""
+    while True:
+        hit = mm.find(needle, start, stop)
+        if hit == -1 or not mm[mm.rfind(b"\n", 0, hit) + 1:hit].strip():
+            return hit
+        start = hit + 1
+
+
+def _line_bounds(mm: mmap.mmap, pos: int) -> tuple[int, int]:
+    """Byte range of the line containing ``pos``, including its line ending."""
+    end = mm.find(b"\n", pos)
+    return mm.rfind(b"\n", 0, pos) + 1, len(mm) if end == -1 else end + 1
+
+
+class _Scanner:
+    """Forward-only windowed search that counts and releases what it passes."""
+
+    def __init__(self, mm: mmap.mmap):
+        self.mm = mm
+        self.size = len(mm)
+        self.released = 0
+        self.newlines = 0
+        # needle -> (start, stop, hit) of its last search; bytes already
+        # searched for a needle are not searched again
+        self._searched: dict[bytes, tuple[int, int, int]] = {}
+
+    def advance(self, upto: int) -> None:
+        """Count the lines of, and release, every whole window below ``upto``."""
+        upto = min(upto, self.size)
+        while self.released + WINDOW <= upto or (upto == self.size and self.released < upto):
+            end = min(self.released + WINDOW, upto)
+            self.newlines += self.mm[self.released:end].count(b"\n")
+            _release(self.mm, self.released, end)
+            self.released = end
+
+    def find(self, needles: tuple[bytes, ...], start: int) -> tuple[int, bytes]:
+        """Earliest occurrence of any of ``needles`` at or after ``start``."""
+        self.advance(start)
+        pos = start
+        while pos < self.size:
+            end = min(pos + WINDOW, self.size)
+            best, found = -1, b""
+            for needle in needles:
+                # Allow a match to run past the window, but not start after it
+                hit = self._search(needle, pos, min(end + len(needle) - 1, self.size))
+                if hit != -1 and (best == -1 or hit < best):
+                    best, found = hit, needle
+            if best != -1:
+                return best, found
+            self.advance(end)
+            pos = end
+        return -1, b""
+
+    def _search(self, needle: bytes, start: int, stop: int) -> int:
+        """``mm.find(needle, start, stop)``, answered from the last search when it covers it."""
+        cached = self._searched.get(needle)
+        if cached is not None:
+            lo, hi, hit = cached
+            # ``hit`` is the first occurrence at or after ``lo``, if any before ``hi``
+            if lo <= start <= hit:
+                return hit if hit + len(needle) <= stop else -1
+            if lo <= start < hi and hit == -1:
+                if stop <= hi:
+                    return -1
+                # Only the part past the last search is new
+                hit = self.mm.find(needle, max(start, hi - len(needle) + 1), stop)
+                self._searched[needle] = (lo, stop, hit)
+                return hit
+        hit = self.mm.find(needle, start, stop)
+        self._searched[needle] = (start, stop, hit)
+        return hit
+
+
+class MappedHostsFile(HostsFile):
+    """``HostsFile`` backed by byte offsets into the file on disk.
+
+    Behaves like a ``HostsFile`` parsed from the same content; foreign lines
+    are never loaded, so every access to them maps the file again. The model
+    is tied to the file it was read from: writing it out after the file was
+    changed by someone else raises ``RuntimeError``.
+    """
+
+    def __init__(self, path: str, hosts_format: HostsFormat = CLASSIC_FORMAT):
+        super().__init__([], hosts_format)
+        self.path = path
+        self.size = 0
+        # Byte range of the section from its begin marker through its end marker
+        self._section_range: Optional[tuple[int, int]] = None
+        # Non-sink lines found inside the section, written right after it
+        self._section_kept: list[str] = []
+        # Line start -> (line end, host) of each legacy entry
+        self._legacy: dict[int, tuple[int, str]] = {}
+        self._dropped: set[int] = set()
+        # (inode, size, mtime) of the file the offsets refer to
+        self.key: Optional[tuple[int, int, int]] = None
+        # Copied ranges (source start, source end, output start) of the last write
+        self._written: list[tuple[int, int, int]] = []
+        self._written_section: Optional[tuple[int, int]] = None
+        self._written_size = 0
+        with self._mapped(check=False) as mm:
+            self._scan(mm)
+
+    @classmethod
+    def parse(cls, content: str, hosts_format: HostsFormat = CLASSIC_FORMAT) -> HostsFile:
+        raise TypeError("MappedHostsFile reads from a path; use HostsFile.parse for text")
+
+    @contextmanager
+    def _mapped(self, check: bool = True) -> Iterator[mmap.mmap]:
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            key = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if check and key != self.key:
+                raise RuntimeError(f"{self.path} changed since it was read")
+            self.key = key
+            if not st.st_size:
+                raise ValueError("cannot map an empty hosts file")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                yield mm
+            finally:
+                mm.close()
+
+    def _scan(self, mm: mmap.mmap) -> None:
+        self.size = len(mm)
+        first = mm.find(b"\n")
+        if first > 0 and mm[first - 1:first] == b"\r":
+            self.newline = "\r\n"
+        elif first != -1:
+            self.newline = "\n"
+
+        scanner = _Scanner(mm)
+        pos = 0
+        unterminated = False
+        while True:
+            needles = (_BLOCK,) if self._section_range or unterminated else (_BEGIN, _BLOCK)
+            hit, needle = scanner.find(needles, pos)
+            if hit == -1:
+                break
+            start, end = _line_bounds(mm, hit)
+            pos = end
+            if mm[start:hit].strip():
+                # Not at the start of the line
+                continue
+            if needle == _BLOCK:
+                host = _blocked_host(mm[start:end].decode("utf-8", "replace"))
+                if host is not None:
+                    self._index.setdefault(host, []).append(start)
+                    self._legacy[start] = (end, host)
+                continue
+            bounds = self._find_end(mm, scanner, end)
+            if bounds is None:
+                # Without an end marker there is no section; the rest is foreign
+                unterminated = True
+            elif _at_line_start(mm, _BEGIN, end, bounds[0]) == -1:
+                pos = self._scan_section(mm, start, end, *bounds)
+            # Otherwise a later begin marker opens the section
+
+        scanner.advance(self.size)
+        self.lines_scanned = scanner.newlines + (mm[-1:] != b"\n")
+
+    def _find_end(self, mm: mmap.mmap, scanner: _Scanner, pos: int) -> Optional[tuple[int, int]]:
+        """Byte range of the first end marker line at or after ``pos``."""
+        while True:
+            hit, _ = scanner.find((_END,), pos)
+            if hit == -1:
+                return None
+            line_start, line_end = _line_bounds(mm, hit)
+            if mm[line_start:line_end].strip() == _END:
+                return line_start, line_end
+            pos = line_end
+
+    def _scan_section(self, mm: mmap.mmap, start: int, body_start: int, body_end: int, end: int) -> int:
+        """Parse the section spanning ``[start, end)``, its body ``[body_start, body_end)``."""
+        marker = mm[start:body_start].decode("utf-8", "replace").strip()
+        self.stored_hash = marker[len(SECTION_BEGIN):].strip().partition("sha256=")[2] or None
+        body = []
+        for line in mm[body_start:body_end].decode("utf-8").splitlines(keepends=True):
+            body.append(line.rstrip("\r\n") + "\n")
+            hosts = _section_hosts(line)
+            if hosts:
+                self._section.update(hosts)
+            else:
+                self._section_kept.append(line)
+        self._intact = _section_hash(body) == self.stored_hash
+        self._section_range = (start, end)
+        return end
+
+    def _drop_legacy(self, positions: list[int]) -> None:
+        self._dropped.update(positions)
+
+    def _holes(self) -> list[tuple[int, int, bool]]:
+        """Byte ranges not copied verbatim, in order; the flag marks the section."""
+        holes = [(start, self._legacy[start][0], False) for start in self._dropped]
+        if self._section_range is not None:
+            holes.append((*self._section_range, True))
+        else:
+            holes.append((self.size, self.size, True))
+        return sorted(holes)
+
+    def write_to(self, out: BinaryIO) -> int:
+        section = "".join(self._section_lines()).encode("utf-8")
+        kept = "".join(self._section_kept).encode("utf-8")
+        written: list[tuple[int, int, int]] = []
+        self._written_section = None
+        size = 0
+        last = b"\n"
+        with self._mapped() as mm:
+            pos = 0
+            for start, end, is_section in [*self._holes(), (self.size, self.size, False)]:
+                while pos < start:
+                    stop = min(start, (pos // WINDOW + 1) * WINDOW)
+                    chunk = mm[pos:stop]
+                    out.write(chunk)
+                    written.append((pos, stop, size))
+                    size += len(chunk)
+                    last = chunk[-1:]
+                    _release(mm, pos, stop)
+                    pos = stop
+                if is_section and section:
+                    if size and last != b"\n":
+                        newline = self.newline.encode("ascii")
+                        out.write(newline)
+                        size += len(newline)
+                    out.write(section)
+                    self._written_section = (size, size + len(section))
+                    size += len(section)
+                    last = b"\n"
+                if is_section and kept:
+                    out.write(kept)
+                    size += len(kept)
+                    last = kept[-1:]
+                pos = max(pos, end)
+        self._written = written
+        self._written_size = size
+        return size
+
+    def lines(self) -> list[str]:
+        return self.render().splitlines(keepends=True)
+
+    def render(self) -> str:
+        out = io.BytesIO()
+        self.write_to(out)
+        return out.getvalue().decode("utf-8")
+
+    def commit(self) -> None:
+        """Re-point the offsets at the file written by the last ``write_to``."""
+        starts = [source for source, _, _ in self._written]
+        legacy = {}
+        self._index = {}
+        for start, (end, host) in sorted(self._legacy.items()):
+            if start in self._dropped:
+                continue
+            source, _, target = self._written[bisect.bisect_right(starts, start) - 1]
+            moved = start - source + target
+            legacy[moved] = (end - start + moved, host)
+            self._index.setdefault(host, []).append(moved)
+        self._legacy = legacy
+        self._dropped = set()
+        self._section_range = self._written_section
+        self._section_kept = []
+        self.size = self._written_size
+        self._written = []
+        st = os.stat(self.path)
+        self.key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self.stored_hash = self.section_hash()
+        self._intact = True
+        self._lines_changed = False
+        self._added, self._removed = set(), set()
+
+    def _foreign_lines(self) -> Iterator[str]:
+        """Lines outside the section that a rewrite would keep."""
+        with self._mapped() as mm:
+            pos = 0
+            for start, end, is_section in [*self._holes(), (self.size, self.size, False)]:
+                while pos < start:
+                    line_end = mm.find(b"\n", pos, start)
+                    line_end = start if line_end == -1 else line_end + 1
+                    yield mm[pos:line_end].decode("utf-8", "replace")
+                    if line_end // WINDOW != pos // WINDOW:
+                        _release(mm, pos - pos % WINDOW, line_end - line_end % WINDOW)
+                    pos = line_end
+                if is_section:
+                    yield from self._section_kept
+                pos = max(pos, end)
+
+    def entries(self) -> Iterator[HostsEntry]:
+        for line in self._foreign_lines():
+            entry = parse_entry(line)
+            if entry is not None:
+                yield entry
+
+    def conflicts(self, blocked: AbstractSet[str]) -> list[HostsConflict]:
+        # One pass per call: an index of every foreign name would grow with the file
+        found = []
+        for line in self._foreign_lines():
+            entry = parse_entry(line)
+            if entry is None or entry.address in SINK_ADDRESSES:
+                continue
+            for name in entry.names:
+                if name.lower() in blocked:
+                    found.append(HostsConflict(name.lower(), entry.address, line.strip()))
+        return sorted(found, key=lambda conflict: conflict.host)
@@ -0,0 +1,113 @@
+"""Domain suffix trie for RUBlocker84.
+
+Group host lists may contain wildcard entries such as ``*.yandex.ru``, which
+match every subdomain of ``yandex.ru`` (but not ``yandex.ru`` itself).
+"""
+
+import bisect
+from typing import Iterable
+
+from .names import WILDCARD_PREFIX, normalize_hosts
+
+# Node keys that can never collide with a valid hostname label
+_EXACT = "\0"
+_WILDCARD = "*"
+
+
+def is_wildcard(pattern: str) -> bool:
+    return pattern.startswith(WILDCARD_PREFIX)
+
+
+def split_hosts(hosts: Iterable[str]) -> tuple[list[str], list[str]]:
+    """Normalise valid entries and split them into hostnames and wildcard patterns."""
+    names = normalize_hosts(hosts)
+    if "*" not in "".join(names):
+        return names, []
+    concrete, patterns = [], []
+    for host in names:
+        (patterns if is_wildcard(host) else concrete).append(host)
+    return concrete, patterns
+
+
+def reverse_host(host: str) -> str:
+    """``mc.yandex.ru`` -> ``ru.yandex.mc``, so subdomains sort together."""
+    return ".".join(reversed(host.split(".")))
+
+
+class DomainTrie:
+    """Reference-counted trie of reversed domain labels.
+
+    Holds exact hostnames and ``*.domain`` patterns; ``is_blocked`` walks at
+    most one node per label of the queried name.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._root: dict = {}
+        self._size = 0
+        for pattern in patterns:
+            self.add(pattern)
+
+    @staticmethod
+    def _key(pattern: str) -> tuple[list[str], str]:
+        if is_wildcard(pattern):
+            return pattern[len(WILDCARD_PREFIX):].split("."), _WILDCARD
+        return pattern.split("."), _EXACT
+
+    def add(self, pattern: str) -> None:
+        labels, key = self._key(pattern)
+        node = self._root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+        if key not in node:
+            self._size += 1
+        node[key] = node.get(key, 0) + 1
+
+    def remove(self, pattern: str) -> bool:
+        """Drop one reference to ``pattern``; return False if it was absent."""
+        labels, key = self._key(pattern)
+        path = []
+        node = self._root
+        for label in reversed(labels):
+            child = node.get(label)
+            if child is None:
+                return False
+            path.append((node, label))
+            node = child
+        if key not in node:
+            return False
+
+        node[key] -= 1
+        if node[key]:
+            return True
+        del node[key]
+        self._size -= 1
+        for parent, label in reversed(path):
+            if parent[label]:
+                break
+            del parent[label]
+        return True
+
+    def is_blocked(self, host: str) -> bool:
+        node = self._root
+        for label in reversed(host.split(".")):
+            if _WILDCARD in node:
+                return True
+            node = node.get(label)
+            if node is None:
+                return False
+        return _EXACT in node
+
+    __contains__ = is_blocked
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def expand_wildcard(pattern: str, reversed_names: list[str]) -> list[str]:
+    """Concrete names matched by ``pattern``, given a sorted list of reversed names."""
+    prefix = reverse_host(pattern[len(WILDCARD_PREFIX):]) + "."
+    start = bisect.bisect_left(reversed_names, prefix)
+    end = bisect.bisect_left(reversed_names, prefix[:-1] + "/")
+    return [reverse_host(name) for name in reversed_names[start:end]]
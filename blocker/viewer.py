@@ -0,0 +1,127 @@
+"""Paged, searchable view of the blocked hosts.
+
+The blocked set is sorted once per change of the config's ``HostIndex`` and
+kept as a list plus one newline-joined string. Prefix searches bisect the
+list; substring searches run ``str.find`` over the joined string in C and
+map hits back to hosts through their offsets. Results are index ranges or
+arrays, so rendering a page touches only that page's hosts.
+"""
+
+import bisect
+from array import array
+from itertools import accumulate
+from typing import Iterator, Optional, Sequence, Union
+
+from .config import Config
+from .names import normalize_host
+
+PAGE_SIZE = 20
+# Substring queries hitting more than 1/DENSE_MATCHES of the hosts scan them all
+DENSE_MATCHES = 20
+
+
+class HostList(Sequence[str]):
+    """Hosts of a ``SortedHosts`` selected by position, without copying them."""
+
+    def __init__(self, source: "SortedHosts", positions: Union[range, array]):
+        self.source = source
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.source.hosts[i] for i in self.positions[index]]
+        return self.source.hosts[self.positions[index]]
+
+    def __iter__(self) -> Iterator[str]:
+        hosts = self.source.hosts
+        return (hosts[i] for i in self.positions)
+
+    def pages(self, page_size: int = PAGE_SIZE) -> int:
+        return max(1, -(-len(self) // page_size))
+
+    def page(self, number: int, page_size: int = PAGE_SIZE) -> list[str]:
+        """Hosts on page ``number`` (0-based)."""
+        return self[number * page_size:(number + 1) * page_size]
+
+
+class SortedHosts:
+    """Sorted host list with prefix and substring search."""
+
+    def __init__(self, hosts: Sequence[str]):
+        self.hosts = sorted(hosts)
+        self._text: Optional[str] = None
+        self._starts: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def all(self) -> HostList:
+        return HostList(self, range(len(self.hosts)))
+
+    def prefix(self, query: str) -> HostList:
+        lo = bisect.bisect_left(self.hosts, query)
+        hi = bisect.bisect_left(self.hosts, query + "\U0010ffff", lo)
+        return HostList(self, range(lo, hi))
+
+    def _joined(self) -> tuple[str, array]:
+        if self._text is None:
+            self._text = "\n".join(self.hosts) + "\n"
+            self._starts = array("L", accumulate((len(host) + 1 for host in self.hosts[:-1]), initial=0))
+        return self._text, self._starts
+
+    def substring(self, query: str) -> HostList:
+        if not query:
+            return self.all()
+        if "\n" in query:
+            return HostList(self, range(0))
+        text, starts = self._joined()
+        if text.count(query) * DENSE_MATCHES > len(self.hosts):
+            # Most hosts match: one containment test per host beats a find per hit
+            return HostList(self, array("L", [i for i, host in enumerate(self.hosts) if query in host]))
+        positions = array("L")
+        find = text.find
+        pos = find(query)
+        while pos != -1:
+            line = bisect.bisect_right(starts, pos) - 1
+            positions.append(line)
+            # Continue after this host so each host is listed once
+            pos = find(query, starts[line + 1] if line + 1 < len(starts) else len(text))
+        return HostList(self, positions)
+
+
+class BlockedHostsView:
+    """Browsable blocked hosts of ``config``, re-sorted only after toggles."""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._version: Optional[tuple[int, int]] = None
+        self._all: Optional[SortedHosts] = None
+        self._groups: dict[str, SortedHosts] = {}
+
+    def _sync(self) -> None:
+        index = self.config.index
+        version = (id(index), index.version)
+        if version != self._version:
+            self._all = SortedHosts(index.blocked)
+            self._groups = {}
+            self._version = version
+
+    def hosts(self, group: Optional[str] = None) -> SortedHosts:
+        """All blocked hosts, or those the enabled ``group`` contributes."""
+        self._sync()
+        if group is None:
+            return self._all
+        if group not in self._groups:
+            self._groups[group] = SortedHosts(self.config.index.hosts_of(group))
+        return self._groups[group]
+
+    def search(self, query: str = "", group: Optional[str] = None, prefix: bool = False) -> HostList:
+        hosts = self.hosts(group)
+        return hosts.prefix(query) if prefix else hosts.substring(query)
+
+    def groups_blocking(self, host: str) -> list[str]:
+        name = normalize_host(host)
+        return sorted(self.config.index.groups_blocking(name)) if name else []
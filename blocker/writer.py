@@ -0,0 +1,124 @@
+"""Coalescing single-writer queue for hosts-file updates.
+
+Toggles and config reloads hand their changes to a ``HostsWriter`` instead of
+writing the hosts file themselves. A single background thread waits a short
+window after the first pending change and folds everything that arrived in
+the meantime into one ``HostsManager`` update, so a burst of toggles costs a
+single read and write.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, AbstractSet, Optional
+
+from .config import HostDelta
+from .hosts import desired_hosts
+
+if TYPE_CHECKING:
+    from .config import Config
+    from .hosts import HostsManager
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW = 0.2
+
+
+class HostsWriter:
+    """Queue of pending hosts-file changes drained by one writer thread.
+
+    ``submit`` queues a delta and ``submit_hosts``/``submit_config`` a full
+    reconciliation, which supersedes the deltas queued before it; deltas
+    queued after it are folded into the same write. All return a future that
+    resolves to the success of the write that includes the change.
+    """
+
+    def __init__(self, manager: "HostsManager", window: float = COALESCE_WINDOW):
+        self.manager = manager
+        self.window = window
+        self.batches = 0
+        self._cond = threading.Condition()
+        self._delta = HostDelta()
+        self._hosts: Optional[frozenset[str]] = None
+        self._futures: list[Future] = []
+        self._closed = False
+        self._flushing = False
+        self._thread = threading.Thread(target=self._run, name="hosts-writer", daemon=True)
+        self._thread.start()
+
+    def _enqueue(self) -> Future:
+        if self._closed:
+            raise RuntimeError("HostsWriter is closed")
+        future: Future = Future()
+        self._futures.append(future)
+        self._cond.notify()
+        return future
+
+    def submit(self, delta: HostDelta) -> Future:
+        with self._cond:
+            self._delta.merge(delta)
+            return self._enqueue()
+
+    def submit_hosts(self, desired: AbstractSet[str]) -> Future:
+        """Queue making the blocked entries exactly ``desired``."""
+        desired = frozenset(desired)
+        with self._cond:
+            self._hosts = desired
+            self._delta = HostDelta()
+            return self._enqueue()
+
+    def submit_config(self, config: "Config") -> Future:
+        # Snapshot now: the config may be toggled again before the write
+        return self.submit_hosts(desired_hosts(config))
+
+    @property
+    def pending(self) -> bool:
+        with self._cond:
+            return bool(self._futures)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for everything queued so far to be written."""
+        with self._cond:
+            futures = list(self._futures)
+            if futures:
+                # Skip the rest of the coalescing window
+                self._flushing = True
+                self._cond.notify()
+        return all(future.result(timeout) for future in futures)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._futures and not self._closed:
+                    self._cond.wait()
+                if not self._futures:
+                    return
+                deadline = time.monotonic() + self.window
+                while not (self._closed or self._flushing):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._flushing = False
+                delta, hosts, futures = self._delta, self._hosts, self._futures
+                self._delta, self._hosts, self._futures = HostDelta(), None, []
+
+            try:
+                if hosts is not None:
+                    ok = self.manager.apply_hosts((hosts - delta.removed) | delta.added)
+                else:
+                    ok = self.manager.apply_delta(delta)
+            except Exception as e:
+                logger.error(f"Hosts writer failed: {e}")
+                ok = False
+            self.batches += 1
+            for future in futures:
+                future.set_result(ok)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write what is still queued and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
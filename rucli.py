@@ -1,21 +1,44 @@
 """
 RUBlocker84 CLI Application.
 
-Provides interactive command-line interface for managing the tracker blocker.
+Provides interactive command-line interface for managing the tracker blocker,
+plus non-interactive subcommands for scripted use:
+
+    rucli apply              reconcile the hosts file with the config
+    rucli apply --target GLOB [--jobs N]
+                             reconcile many hosts files (chroots, images) in parallel
+    rucli enable <group>     enable a group and apply it
+    rucli disable <group>    disable a group and apply it
+    rucli status [--json]    show group states (JSON adds hosts-file sync state and metrics)
+    rucli diff               show what ``apply`` would change
+    rucli import <file> <group> [--description TEXT] [--enable]
+                             import a hosts/domain/adblock list as a new group
+    rucli convert            move host lists into per-group shard files
+    rucli lint [--json] [--fix]
+                             report duplicate, invalid and overlapping entries
+    rucli dns [--listen ADDR] [--upstream ADDR] [--nxdomain]
+                             run a local DNS sinkhole instead of editing hosts
+    rucli rollback [N] [--list] [--force]
+                             undo the last N hosts-file changes from the journal
+
+Importing this module has no side effects; the blocker package is loaded only
+when a command needs it.
 """
 
+from __future__ import annotations
+
 import os
-import subprocess
 import sys
 import time
-import ctypes
-
-import logging
 
 
 # Ensure the script is running with administrator privileges
 def run_as_admin() -> None:
     """Re-launch the script with administrator privileges if not already running as admin."""
+    if os.name != "nt":
+        return
+    import ctypes
+
     try:
         is_admin = ctypes.windll.shell32.IsUserAnAdmin()
     except Exception:
@@ -28,35 +51,26 @@ def run_as_admin() -> None:
         sys.exit(0)
 
 
-# Run the admin check at startup
-run_as_admin()
+def setup_logging() -> None:
+    import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-    ],
-)
-logger = logging.getLogger(__name__)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+        ],
+    )
 
-# Import from blocker package
-from blocker.config import (
-    Config, load_config, save_config, get_blocked_hosts
-)
-from blocker.hosts import HostsManager
 
-# Global state
-config: Config = load_config()
-blocked_hosts: list[str] = get_blocked_hosts(config)
-hosts_manager = HostsManager()
-
-# Apply initial hosts file state based on config
-def _apply_initial_hosts_state() -> None:
-    for group_name, group in config.groups.items():
-        hosts_manager.update_group(group.hosts, enable=group.on)
-_apply_initial_hosts_state()
+# Global state of the interactive menu, set up by run_interactive()
+config = None
+config_path: str | None = None
+blocked_hosts = None
+hosts_manager = None
+hosts_writer = None
+blocked_view = None
+reconciler = None
 
 
 def clear_console() -> None:
@@ -85,88 +99,16 @@ def print_status(text: str, status: str) -> None:
 
 
 def log(msg: str) -> None:
-    logger.info(msg)
+    import logging
+
+    logging.getLogger(__name__).info(msg)
 
 
 def show_unlock_animation() -> None:
     """Show a full-screen ASCII animation of a lock opening."""
-    lock_closed = """                                                                                                
-                                     .:=#%@@@@@@@@@@@@@@@@%#=:.                                     
-                              ..:*@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@*:..                              
-                          .:+@@@@@@@@%+-..                ..-+%@@@@@@@@+:.                          
-                       :*@@@@@@%*-.                              .:+%@@@@@@*:                       
-                    -%@@@@@%=.                                        .=%@@@@@%=                    
-                .=@@@@@@+.                                                .+@@@@@@=.                
-             .=@@@@@%-                     .-*@@@@@@@@*-.                     -%@@@@@=.             
-           :%@@@@%-.                    :#@@@@@@@@@@@@@@@@#:                    .-%@@@@%:           
-        .*@@@@@=.                     :@@@@@@@@@@@@@@@@@@@@@@:                     .-@@@@@*.        
-      .%@@@@#                        *@@@@@@@@@@@@@@@@@@@@@@@@#                        *@@@@%.      
-    :%@@@@-.                       .@@@@@@@@@@@@@@@@@@@@@@@@@@@@.                       .-@@@@@:    
-   -@@@%:                          +@@@@@@@@@@@@@@@@@@@@@@@@@@@@+                          :%@@@-   
-  .@@@%.                          .@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@.                          .%@@@.  
-  -@@@-                           .@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@:                           -@@@-  
-  .@@@%.                          .@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@.                          .%@@@.  
-   -@@@%:                          +@@@@@@@@@@@@@@@@@@@@@@@@@@@@+                          :%@@@-   
-    :%@@@@-.                       .@@@@@@@@@@@@@@@@@@@@@@@@@@@@.                       .-@@@@@:    
-      .%@@@@#                        *@@@@@@@@@@@@@@@@@@@@@@@@#                        *@@@@%.      
-        .*@@@@@=.                     :@@@@@@@@@@@@@@@@@@@@@@:                     .-@@@@@*.        
-           :%@@@@%-.                    :#@@@@@@@@@@@@@@@@#:                    .-%@@@@%:           
-             .=@@@@@%-                     .-*@@@@@@@@*-.                     -%@@@@@=.             
-                .=@@@@@@+.                                                .+@@@@@@=.                
-                    -%@@@@@%=.                                        .=%@@@@@%=                    
-                       :*@@@@@@%*-.                              .:+%@@@@@@*:                       
-                          .:+@@@@@@@@%+-..                ..-+%@@@@@@@@+:.                          
-                              ..:*@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@*:..                              
-                                     .:=#%@@@@@@@@@@@@@@@@%#=:.                                     
-    """
-
-    lock_opening = """          
-                                                                                .*@@@:              
-                                                                              .*@@@@@=              
-                                                                            .*@@@@@#.               
-                                                                          .*@@@@@*.                 
-                                      .-#%@@@@@@@@@@@@@@@@%%+:.         .*@@@@@*.                   
-                               ..=@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@#-. .*@@@@@*.                     
-                          ..=%@@@@@@@%*=:.                 .:+#@@@+ .*@@@@@*.                       
-                       .=%@@@@@@#=..                              .*@@@@@+..:                       
-                    .#@@@@@@*:.                                 .#@@@@@+. +@@@@=                    
-                 .#@@@@@%:                                    .#@@@@@+    .=@@@@@@+.                
-              :#@@@@@#.                    .:+%@@@@@@@#=:.  .#@@@@@+.         -%@@@@@=.             
-           .+@@@@@+.                    .*@@@@@@@@@@@@@@= .#@@@@@+.             .-#@@@@%-           
-         :%@@@@#.                     .%@@@@@@@@@@@@@@=..%@@@@@+.                   -@@@@@#.        
-       =@@@@@-                       -@@@@@@@@@@@@@@- .%@@@@@+                         *@@@@%.      
-     =@@@@#.                        =@@@@@@@@@@@@@= .#@@@@@+..*@.                        -@@@@%:    
-   .#@@@*.                         :@@@@@@@@@@@@= .#@@@@@+..*@@@#.                         :%@@@-   
-   -@@@=                          .*@@@@@@@@@@= .#@@@@@=..*@@@@@@.                          .#@@@.  
-   *@@@.                          .#@@@@@@@@- .%@@@@@=  *@@@@@@@@:                           -@@@-  
-   -@@@=                          .*@@@@@@-..#@@@@@= .*@@@@@@@@@@.                          .#@@@.  
-   .#@@@*.                         :@@@@- .#@@@@@=..*@@@@@@@@@@@#.                         :%@@@-   
-     =@@@@#.                        =@- .%@@@@@-..#@@@@@@@@@@@@@.                        -@@@@%:    
-       =@@@@@-                        .@@@@@@-  #@@@@@@@@@@@@@@.                       *@@@@%.      
-         :%@@@@#.                   .@@@@@@= .#@@@@@@@@@@@@@@+                      -@@@@@#.        
-           .+@@@@@+.              .%@@@@@=..#@@@@@@@@@@@@@%-.                   .-#@@@@%-           
-              :#@@@@@#.         .%@@@@@-.  .:+%@@@@@@@#=:                     -%@@@@@=.             
-                 .#@@@@@%:    .%@@@@@-.                                   .=@@@@@@+.                
-                    .#@@@@: :%@@@@@-                                  .-%@@@@@@=                    
-                       .: :%@@@@@-                               .:+%@@@@@@*:                       
-                        .%@@@@@-..%@@%*=:.                 .:+#@@@@@@@@*:.                          
-                      .@@@@@@:. .=@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@#-..                              
-                    :@@@@@@-          .-#%@@@@@@@@@@@@@@@@%%+:.                                     
-                  :@@@@@@-                                                                          
-                :%@@@@@-                                                                            
-               #@@@@@:.                                                                             
-               +@@@:                                                                                
-    """
-
-    freedom = """
-
-          ✨ ✨ ✨
-       ✨  FREE  ✨
-          ✨ ✨ ✨
-
-    """
-
-    frames = [lock_closed, lock_opening, freedom]
+    from blocker.art import FREEDOM, LOCK_CLOSED, LOCK_OPENING
+
+    frames = [LOCK_CLOSED, LOCK_OPENING, FREEDOM]
     durations = [0.6, 0.6, 0.6]
 
     sys.stdout.write("\033[?25l")
@@ -203,10 +145,31 @@ def show_unlock_animation() -> None:
         sys.stdout.flush()
 
 
+def _wait_for_config() -> bool:
+    """Block until the background load has indexed the config."""
+    global blocked_hosts, config
+    from blocker.config import get_blocked_hosts
+
+    if not reconciler.wait_ready(0):
+        print_status("Loading presets...", "info")
+    loaded = reconciler.wait_ready()
+    if loaded is None:
+        print_status(f"Config could not be loaded: {reconciler.error}", "error")
+        input("\nPress Enter to return...")
+        return False
+    if config is not loaded:
+        config = loaded
+        blocked_hosts = get_blocked_hosts(config)
+    return True
+
+
 def menu_presets() -> None:
     """Menu for toggling preset groups."""
     global blocked_hosts, config
+    from blocker.config import get_blocked_hosts, save_config
 
+    if not _wait_for_config():
+        return
     while True:
         clear_console()
         print("=== RUBlocker84 Presets ===\n")
@@ -236,18 +199,73 @@ def menu_presets() -> None:
 
         name = list(groups.keys())[idx]
         group = groups[name]
-        group.on = not group.on
-        save_config(config)
+        reconciler.toggle(name)
+        save_config(config, config_path)
         status_str = "ON" if group.on else "OFF"
         print(f"\nPreset '{name}' toggled {status_str}")
         if group.on:  # Show unlock animation when enabling (unlocking)
             show_unlock_animation()
         log(f"Preset {name} toggled {status_str}")
         blocked_hosts = get_blocked_hosts(config)
-        hosts_manager.update_group(group.hosts, enable=group.on)
         time.sleep(1)
 
 
+def show_blocked_hosts() -> None:
+    """Paged browser of the blocked hosts with search and group filter."""
+    global blocked_view
+    from blocker.viewer import PAGE_SIZE, BlockedHostsView
+
+    if not _wait_for_config():
+        return
+    if blocked_view is None or blocked_view.config is not config:
+        blocked_view = BlockedHostsView(config)
+    query, group, prefix, page, note = "", None, False, 0, ""
+
+    while True:
+        results = blocked_view.search(query, group, prefix)
+        pages = results.pages(PAGE_SIZE)
+        page = min(page, pages - 1)
+        clear_console()
+        print_header("Active Blocked Hosts")
+        scope = f"group {group}" if group else "all groups"
+        search = f", {'prefix' if prefix else 'containing'} '{query}'" if query else ""
+        print(f"{len(results)} hosts ({scope}{search}) - page {page + 1}/{pages}\n")
+        if results:
+            for host in results.page(page, PAGE_SIZE):
+                print(f" - {host}")
+        else:
+            print_status("No hosts currently blocked" if not (query or group) else "Nothing found", "warning")
+        if note:
+            print(f"\n{note}")
+            note = ""
+        print("\n[Enter] next  [b] back  [<number>] page  [/text] search  [^text] prefix")
+        print("[g name] group filter (g alone clears)  [?host] which groups block it  [q] return")
+
+        choice = input(">>> ").strip()
+        if choice in ("q", "0"):
+            break
+        elif choice == "":
+            page = (page + 1) % pages
+        elif choice == "b":
+            page = max(0, page - 1)
+        elif choice.isdigit():
+            page = max(0, int(choice) - 1)
+        elif choice[0] in "/^":
+            query, prefix, page = choice[1:].strip().lower(), choice[0] == "^", 0
+        elif choice == "g" or choice.startswith("g "):
+            name = choice[1:].strip() or None
+            if name is not None and name not in config.groups:
+                note = f"Unknown group: {name}"
+            else:
+                group, page = name, 0
+        elif choice[0] == "?":
+            host = choice[1:].strip()
+            groups = blocked_view.groups_blocking(host)
+            note = f"{host}: blocked by {', '.join(groups)}" if groups else f"{host}: not blocked"
+        else:
+            note = "Unknown command"
+
+
 def main_menu() -> None:
     """Main application menu."""
     global blocked_hosts, config
@@ -255,32 +273,350 @@ def main_menu() -> None:
     while True:
         clear_console()
         print_header("RUBlocker84 - Tracker Blocker")
+        progress = reconciler.progress
+        if progress.error:
+            print_status(progress.describe(), "error")
+        elif not progress.finished:
+            print_status(progress.describe(), "warning")
+        for hint in reconciler.hints:
+            print_status(hint, "warning")
         print_status("Choose an option:", "info")
         print("1. Presets")
         print("2. Show active blocked hosts")
         print("0. Exit")
+        if not progress.finished:
+            print("[Enter] refresh progress")
 
         choice = input("\n>>> ").strip()
 
         if choice == "1":
             menu_presets()
         elif choice == "2":
-            clear_console()
-            print_header("Active Blocked Hosts")
-            if blocked_hosts:
-                for h in blocked_hosts:
-                    print(f" - {h}")
-                print_status(f"Total: {len(blocked_hosts)} hosts blocked", "success")
-            else:
-                print_status("No hosts currently blocked", "warning")
-            input("\nPress Enter to return...")
+            show_blocked_hosts()
         elif choice == "0":
             print_status("Goodbye!", "success")
             break
+        elif choice == "":
+            continue
         else:
             print_status("Invalid choice, try again...", "error")
             time.sleep(1)
 
 
+def run_interactive(config_file: str | None = None, hosts_file: str | None = None) -> None:
+    """Start the interactive menu while the config is applied in the background."""
+    global config_path, hosts_manager, hosts_writer, reconciler
+    from functools import partial
+
+    from blocker.config import load_config
+    from blocker.hosts import HOSTS_FILE, HostsManager
+    from blocker.journal import Journal, journal_path
+    from blocker.reconcile import BackgroundReconciler
+    from blocker.writer import HostsWriter
+
+    config_path = config_file
+    hosts_file = hosts_file or HOSTS_FILE
+    # The hosts format is filled in once the config is loaded
+    hosts_manager = HostsManager(hosts_file, journal=Journal(journal_path(hosts_file)))
+    # Rapid toggles in the menu are coalesced into one hosts-file write
+    hosts_writer = HostsWriter(hosts_manager)
+    reconciler = BackgroundReconciler(
+        config_file, hosts_manager, hosts_writer, loader=partial(load_config, refresh_cache=True)
+    ).start()
+    try:
+        main_menu()
+    finally:
+        if not reconciler.done:
+            print_status("Finishing hosts-file update...", "info")
+        reconciler.wait()
+        hosts_writer.close()
+
+
+def _manager(args, cfg):
+    from blocker.hosts import HOSTS_FILE, HostsFormat, HostsManager
+    from blocker.journal import Journal, journal_path
+
+    hosts_file = args.hosts_file or HOSTS_FILE
+    return HostsManager(
+        hosts_file,
+        hosts_format=HostsFormat.from_dict(cfg.hosts_format),
+        journal=Journal(journal_path(hosts_file)),
+    )
+
+
+def cmd_apply(args) -> int:
+    from blocker.config import load_config
+
+    cfg = load_config(args.config, refresh_cache=True)
+    if args.target:
+        from blocker.fanout import apply_many, expand_targets
+        from blocker.hosts import HostsFormat
+
+        targets = expand_targets(args.target)
+        if not targets:
+            print("No hosts files match the given targets", file=sys.stderr)
+            return 2
+        report = apply_many(cfg, targets, args.jobs, HostsFormat.from_dict(cfg.hosts_format))
+        print(report.summary())
+        return 0 if report.ok else 1
+    return 0 if _manager(args, cfg).apply(cfg) else 1
+
+
+def cmd_set_group(args) -> int:
+    from blocker.config import load_config, save_config
+
+    cfg = load_config(args.config)
+    if args.group not in cfg.groups:
+        print(f"Unknown group: {args.group}", file=sys.stderr)
+        return 2
+    delta = cfg.set_group(args.group, args.command == "enable")
+    save_config(cfg, args.config)
+    return 0 if _manager(args, cfg).apply_delta(delta) else 1
+
+
+def cmd_status(args) -> int:
+    from blocker.config import CONFIG_FILE, get_blocked_hosts, load_config
+
+    cfg = load_config(args.config)
+    if args.json:
+        import json
+
+        from blocker.metrics import stats
+
+        manager = _manager(args, cfg)
+        delta = manager.plan(cfg)
+        conflicts = manager.conflicts(cfg) or []
+        status = {
+            "config": args.config or CONFIG_FILE,
+            "groups": {
+                name: {"on": group.on, "description": group.description, "hosts": len(group.hosts)}
+                for name, group in cfg.groups.items()
+            },
+            "blocked": len(get_blocked_hosts(cfg)),
+            "hosts_file": {
+                "path": manager.hosts_file,
+                "readable": delta is not None,
+                "in_sync": delta is not None and not delta,
+                "pending_added": len(delta.added) if delta else 0,
+                "pending_removed": len(delta.removed) if delta else 0,
+                "conflicts": [
+                    {"host": c.host, "address": c.address, "line": c.line} for c in conflicts
+                ],
+            },
+            "metrics": stats(),
+        }
+        print(json.dumps(status, indent=2))
+        return 0
+
+    for name, group in cfg.groups.items():
+        print(f"{'ON ' if group.on else 'OFF'} {name} - {group.description} ({len(group.hosts)} hosts)")
+    print(f"Total: {len(get_blocked_hosts(cfg))} hosts blocked")
+    return 0
+
+
+def cmd_diff(args) -> int:
+    from blocker.config import load_config
+
+    cfg = load_config(args.config)
+    manager = _manager(args, cfg)
+    delta = manager.plan(cfg)
+    if delta is None:
+        return 2
+    for host in sorted(delta.added):
+        print(f"+ {host}")
+    for host in sorted(delta.removed):
+        print(f"- {host}")
+    for conflict in manager.conflicts(cfg) or []:
+        print(f"! {conflict.host} is also mapped to {conflict.address}: {conflict.line}", file=sys.stderr)
+    return 1 if delta else 0
+
+
+def cmd_import(args) -> int:
+    from blocker.config import load_config, save_config
+    from blocker.importer import import_blocklist
+
+    cfg = load_config(args.config)
+    try:
+        group = import_blocklist(cfg, args.group, args.file, args.description, on=args.enable)
+    except (OSError, ValueError) as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 2
+    save_config(cfg, args.config)
+    print(f"Imported {len(group.hosts)} hosts into group {args.group}")
+    if args.enable:
+        return 0 if _manager(args, cfg).apply(cfg) else 1
+    return 0
+
+
+def cmd_convert(args) -> int:
+    from blocker.config import convert_to_sharded
+
+    cfg = convert_to_sharded(args.config)
+    print(f"Converted {len(cfg.groups)} groups to the sharded layout")
+    return 0
+
+
+def cmd_lint(args) -> int:
+    from blocker.config import load_config, save_config
+    from blocker.lint import lint_config, minimise_config
+
+    cfg = load_config(args.config)
+    report = lint_config(cfg)
+    if args.json:
+        import json
+
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print(report.format())
+    if args.fix and (report.removable or report.normalised):
+        removed = minimise_config(cfg)
+        save_config(cfg, args.config)
+        print(
+            f"Removed {removed} entries from the config, rewrote {report.normalised} in canonical form",
+            file=sys.stderr,
+        )
+        return 0
+    return 1 if report.removable else 0
+
+
+def cmd_rollback(args) -> int:
+    from blocker.config import load_config
+
+    manager = _manager(args, load_config(args.config, refresh_cache=not args.list))
+    if args.list:
+        entries = manager.journal.entries()
+        for entry in reversed(entries):
+            print(entry.describe())
+        if not entries:
+            print("No hosts-file changes recorded")
+        return 0
+    if not manager.rollback(args.steps, args.force):
+        return 1
+    print(f"Rolled back {args.steps} change(s); the config is unchanged, 'rucli apply' re-applies it")
+    return 0
+
+
+def _address(value: str, default_port: int = 53) -> tuple[str, int]:
+    host, sep, port = value.rpartition(":")
+    if not sep or not port.isdigit():
+        return value, default_port
+    return host.strip("[]"), int(port)
+
+
+def cmd_dns(args) -> int:
+    import asyncio
+
+    from blocker.config import CONFIG_FILE, ConfigWatcher, load_config
+    from blocker.dns import DnsSinkhole
+
+    config = load_config(args.config, refresh_cache=True)
+    sinkhole = DnsSinkhole(config, upstream=_address(args.upstream), nxdomain=args.nxdomain)
+    watcher = ConfigWatcher(
+        args.config or CONFIG_FILE, lambda diff: sinkhole.update(diff.config), config=config, refresh_cache=True
+    )
+    watcher.start()
+    host, port = _address(args.listen)
+    try:
+        asyncio.run(sinkhole.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        # Ports below 1024 need root (or CAP_NET_BIND_SERVICE) outside Windows
+        print(f"Cannot listen on {args.listen}: {e.strerror or e}", file=sys.stderr)
+        return 2
+    finally:
+        watcher.stop()
+    return 0
+
+
+COMMANDS = {
+    "apply": cmd_apply,
+    "enable": cmd_set_group,
+    "disable": cmd_set_group,
+    "status": cmd_status,
+    "diff": cmd_diff,
+    "import": cmd_import,
+    "convert": cmd_convert,
+    "lint": cmd_lint,
+    "dns": cmd_dns,
+    "rollback": cmd_rollback,
+}
+
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="rucli", description="RUBlocker84 - Tracker Blocker")
+    parser.add_argument("--config", help="path to config.json")
+    parser.add_argument("--hosts-file", help="path to the hosts file")
+    parser.add_argument("--metrics-file", help="write Prometheus textfile metrics here on exit")
+    sub = parser.add_subparsers(dest="command")
+    apply = sub.add_parser("apply", help="reconcile the hosts file with the config")
+    apply.add_argument(
+        "--target", action="append", metavar="PATH",
+        help="apply to this hosts file or glob instead (repeatable), e.g. '/srv/roots/*/etc/hosts'",
+    )
+    apply.add_argument("--jobs", type=int, default=16, help="targets processed in parallel")
+    for name in ("enable", "disable"):
+        cmd = sub.add_parser(name, help=f"{name} a group and apply it")
+        cmd.add_argument("group")
+    status = sub.add_parser("status", help="show group states")
+    status.add_argument("--json", action="store_true", help="machine-readable output")
+    sub.add_parser("diff", help="show what apply would change (exit 1 if anything)")
+    imp = sub.add_parser("import", help="import a blocklist file as a new group")
+    imp.add_argument("file")
+    imp.add_argument("group")
+    imp.add_argument("--description", default="")
+    imp.add_argument("--enable", action="store_true", help="enable the group and apply it")
+    sub.add_parser("convert", help="store each group's hosts in its own shard file")
+    lint = sub.add_parser("lint", help="analyse the blocklists (exit 1 if entries can be removed)")
+    lint.add_argument("--json", action="store_true", help="machine-readable output")
+    lint.add_argument("--fix", action="store_true", help="write back the minimised config")
+    dns = sub.add_parser("dns", help="run a local DNS sinkhole for the enabled groups")
+    dns.add_argument("--listen", default="127.0.0.1:53", help="address to serve on")
+    dns.add_argument("--upstream", default="1.1.1.1:53", help="resolver for names that are not blocked")
+    dns.add_argument("--nxdomain", action="store_true", help="answer blocked names with NXDOMAIN")
+    rollback = sub.add_parser("rollback", help="undo the last hosts-file changes")
+    rollback.add_argument("steps", nargs="?", type=int, default=1, help="number of changes to undo")
+    rollback.add_argument("--list", action="store_true", help="show the recorded changes instead")
+    rollback.add_argument("--force", action="store_true", help="roll back even if the hosts file was edited since")
+    return parser
+
+
+# Commands that only read state and never need elevation
+READ_ONLY_COMMANDS = {"status", "diff", "lint"}
+
+
+def needs_elevation(args) -> bool:
+    """Whether the parsed command writes the hosts file, fixes the config or binds privileged ports."""
+    if args.command == "lint":
+        return args.fix
+    if args.command == "rollback":
+        # --list only reads the journal
+        return not args.list
+    if args.command == "import":
+        # Without --enable only the config is written
+        return args.enable
+    return args.command not in READ_ONLY_COMMANDS
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if needs_elevation(args):
+        run_as_admin()
+    setup_logging()
+
+    try:
+        if args.command is None:
+            run_interactive(args.config, args.hosts_file)
+            return 0
+        return COMMANDS[args.command](args)
+    finally:
+        if args.metrics_file:
+            from blocker.metrics import METRICS
+
+            METRICS.write_textfile(args.metrics_file)
+
+
 if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""Smoke tests for the benchmark suite."""
+
+import os
+import unittest
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import suite
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_smoke_profile_runs(self):
+        results = suite.run("smoke")
+        self.assertIn("hosts.update_group[lines=100]", results)
+        self.assertIn("config.load.cold[groups=2,hosts=50]", results)
+        self.assertIn("watcher.latency", results)
+        self.assertIn("journal.rollback[hosts=1000]", results)
+        self.assertIn("dns.resolve.forward[queries=200]", results)
+        self.assertTrue(all(seconds >= 0 for seconds in results.values()))
+
+    def test_compare(self):
+        report = suite.compare(
+            {"a": 1.3, "b": 1.0, "c": 0.5, "d": 1.0},
+            {"a": 1.0, "b": 1.0, "c": 1.0},
+            threshold=0.25,
+        )
+        self.assertEqual(
+            {case: entry["status"] for case, entry in report.items()},
+            {"a": "regression", "b": "ok", "c": "improved", "d": "new"},
+        )
+
+    def test_stored_baseline_loads(self):
+        baseline, threshold = suite.load_baseline(suite.BASELINE_FILE)
+        self.assertIn("watcher.latency", baseline)
+        self.assertGreater(threshold, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Tests for the compiled config snapshot cache."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.cache import cache_path, read_snapshot
+from blocker.config import BlockGroup, Config, load_config, save_config
+from blocker.store import DomainStore
+
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, "config.json")
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            json.dump({"groups": {
+                "g": {"on": True, "description": "G", "hosts": ["a.com", "bad/host", "*.b.com"]},
+            }}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_loading_never_writes(self):
+        load_config(self.config_path)
+        self.assertEqual(os.listdir(self.temp_dir), ["config.json"])
+
+    def test_snapshot_is_created_and_reused(self):
+        save_config(load_config(self.config_path), self.config_path)
+        self.assertTrue(os.path.exists(cache_path(self.config_path)))
+        first = load_config(self.config_path)
+
+        with unittest.mock.patch("blocker.cache.json.loads", side_effect=AssertionError("parsed")), \
+                unittest.mock.patch("blocker.trie.normalize_hosts", side_effect=AssertionError("validated")):
+            cached = load_config(self.config_path)
+            self.assertEqual(cached, first)
+            self.assertEqual(cached.groups["g"].split_hosts(), (["a.com"], ["*.b.com"]))
+
+            # Same content with a new mtime is recognised by its hash
+            os.utime(self.config_path, ns=(0, 0))
+            self.assertEqual(load_config(self.config_path), first)
+
+    def test_stale_snapshot_is_ignored(self):
+        save_config(load_config(self.config_path), self.config_path)
+        st = os.stat(self.config_path)
+        # Same size and mtime, different content
+        with open(self.config_path, "r+", encoding="utf-8") as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content.replace('"on": true', '"on":false'))
+        os.utime(self.config_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(os.path.getsize(self.config_path), st.st_size)
+        config = load_config(self.config_path)
+        self.assertFalse(config.groups["g"].on)
+
+    def test_unchanged_file_is_not_hashed(self):
+        save_config(load_config(self.config_path), self.config_path)
+        with unittest.mock.patch("blocker.cache.content_hash", side_effect=AssertionError("hashed")):
+            self.assertTrue(load_config(self.config_path).groups["g"].on)
+
+    def test_stale_snapshot_is_refreshed_on_request(self):
+        save_config(load_config(self.config_path), self.config_path)
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            json.dump({"groups": {"g": {"on": False, "hosts": ["c.com"]}}}, f)
+        snapshot = read_snapshot(self.config_path)
+        load_config(self.config_path)
+        self.assertEqual(read_snapshot(self.config_path), snapshot)
+
+        self.assertFalse(load_config(self.config_path, refresh_cache=True).groups["g"].on)
+        with unittest.mock.patch("blocker.cache.json.loads", side_effect=AssertionError("parsed")), \
+                unittest.mock.patch("blocker.cache.content_hash", side_effect=AssertionError("hashed")):
+            self.assertEqual(load_config(self.config_path).groups["g"].hosts, ["c.com"])
+
+    def test_snapshot_from_another_runtime_is_ignored(self):
+        save_config(load_config(self.config_path), self.config_path)
+        self.assertIsNotNone(read_snapshot(self.config_path))
+        with unittest.mock.patch("blocker.cache.RUNTIME", ("cpython-0", 0)):
+            self.assertIsNone(read_snapshot(self.config_path))
+            self.assertEqual(load_config(self.config_path).groups["g"].hosts[0], "a.com")
+
+    def test_save_config_refreshes_snapshot(self):
+        config = Config(groups={
+            "list": BlockGroup(on=True, hosts=["a.com"]),
+            "store": BlockGroup(hosts=DomainStore.from_hosts(["x.com", "y.com"])),
+        })
+        save_config(config, self.config_path)
+        with unittest.mock.patch("blocker.cache.json.loads", side_effect=AssertionError("parsed")):
+            loaded = load_config(self.config_path)
+        self.assertIsInstance(loaded.groups["store"].hosts, DomainStore)
+        self.assertEqual(list(loaded.groups["store"].hosts), ["x.com", "y.com"])
+        self.assertEqual(loaded.groups["list"].hosts, ["a.com"])
+
+    def test_corrupt_snapshot_is_ignored(self):
+        save_config(load_config(self.config_path), self.config_path)
+        with open(cache_path(self.config_path), "wb") as f:
+            f.write(b"garbage")
+        self.assertEqual(load_config(self.config_path).groups["g"].hosts[0], "a.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Tests for the rucli command-line interface."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from blocker.hosts import BLOCK_IP
+
+# Total import time allowed for ``rucli status`` (measured with -X importtime)
+STARTUP_BUDGET_MS = 100
+
+
+def run_cli(*args, importtime=False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    return subprocess.run(
+        cmd + [os.path.join(ROOT, "rucli.py"), *args],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, "config.json")
+        self.hosts_path = os.path.join(self.temp_dir, "hosts")
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            json.dump({"groups": {
+                "a": {"on": False, "description": "A", "hosts": ["a.com", "shared.com"]},
+                "b": {"on": True, "description": "B", "hosts": ["shared.com"]},
+            }}, f)
+        with open(self.hosts_path, "w", encoding="utf-8") as f:
+            f.write("127.0.0.1 localhost\n")
+        self.base = ["--config", self.config_path, "--hosts-file", self.hosts_path]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_hosts(self):
+        with open(self.hosts_path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_import_has_no_side_effects(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, rucli; print([m for m in sys.modules if m.startswith('blocker')])"],
+            capture_output=True, text=True, cwd=ROOT,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_diff_apply_enable_disable(self):
+        result = run_cli(*self.base, "diff")
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stdout.split("\n")[0], "+ shared.com")
+        self.assertNotIn("shared.com", self.read_hosts())
+
+        self.assertEqual(run_cli(*self.base, "apply").returncode, 0)
+        self.assertEqual(run_cli(*self.base, "diff").returncode, 0)
+
+        self.assertEqual(run_cli(*self.base, "enable", "a").returncode, 0)
+        self.assertIn(f"{BLOCK_IP} a.com\n", self.read_hosts())
+
+        self.assertEqual(run_cli(*self.base, "disable", "a").returncode, 0)
+        content = self.read_hosts()
+        self.assertNotIn("a.com", content)
+        self.assertIn(f"{BLOCK_IP} shared.com\n", content)
+
+        self.assertEqual(run_cli(*self.base, "enable", "missing").returncode, 2)
+
+    def test_rollback(self):
+        self.assertEqual(run_cli(*self.base, "apply").returncode, 0)
+        self.assertEqual(run_cli(*self.base, "enable", "a").returncode, 0)
+        result = run_cli(*self.base, "rollback", "--list")
+        lines = result.stdout.strip().split("\n")
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("#2 "))
+        self.assertTrue(lines[0].endswith("apply_delta: +1 -0"))
+
+        self.assertEqual(run_cli(*self.base, "rollback").returncode, 0)
+        content = self.read_hosts()
+        self.assertNotIn("a.com", content)
+        self.assertIn(f"{BLOCK_IP} shared.com\n", content)
+        self.assertEqual(run_cli(*self.base, "rollback").returncode, 0)
+        self.assertNotIn("shared.com", self.read_hosts())
+        self.assertEqual(run_cli(*self.base, "rollback").returncode, 1)
+
+    def test_import(self):
+        blocklist = os.path.join(self.temp_dir, "list.txt")
+        with open(blocklist, "w", encoding="utf-8") as f:
+            f.write("||x.com^\n0.0.0.0 y.com\n")
+        result = run_cli(*self.base, "import", blocklist, "extra", "--enable")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn(f"{BLOCK_IP} x.com\n", self.read_hosts())
+        with open(self.config_path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["groups"]["extra"]["hosts"], ["x.com", "y.com"])
+        self.assertEqual(run_cli(*self.base, "import", blocklist, "extra").returncode, 2)
+
+    def test_elevation(self):
+        from rucli import build_parser, needs_elevation
+
+        parser = build_parser()
+        for argv, expected in (
+            (["status"], False), (["diff"], False), (["lint"], False),
+            (["lint", "--fix"], True), (["dns"], True), (["apply"], True),
+            (["rollback", "--list"], False), (["rollback"], True),
+            (["import", "list.txt", "g"], False), (["import", "list.txt", "g", "--enable"], True),
+        ):
+            with self.subTest(argv=argv):
+                self.assertEqual(needs_elevation(parser.parse_args(argv)), expected)
+
+    def test_dns_reports_bind_errors(self):
+        import socket
+
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as taken:
+            taken.bind(("127.0.0.1", 0))
+            port = taken.getsockname()[1]
+            result = run_cli(*self.base, "dns", "--listen", f"127.0.0.1:{port}")
+        self.assertEqual(result.returncode, 2)
+        self.assertIn(f"Cannot listen on 127.0.0.1:{port}", result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+
+    def test_status_json(self):
+        result = run_cli(*self.base, "status", "--json")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        status = json.loads(result.stdout)
+        self.assertEqual(status["blocked"], 1)
+        self.assertEqual(status["groups"]["b"], {"on": True, "description": "B", "hosts": 1})
+
+    def test_status_startup_budget(self):
+        result = run_cli(*self.base, "status", "--json", importtime=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        total_us = 0
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # Only count top-level imports; nested ones are part of their parent
+            if not name.startswith("  "):
+                total_us += int(cumulative)
+        self.assertLess(total_us / 1000, STARTUP_BUDGET_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()
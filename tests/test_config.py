@@ -2,13 +2,18 @@
 
 import json
 import os
+import shutil
 import tempfile
+import threading
 import unittest
+import unittest.mock
 
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from blocker.config import Config, BlockGroup, load_config, save_config, get_blocked_hosts
+from blocker.config import (
+    Config, BlockGroup, ConfigWatcher, diff_configs, load_config, save_config, get_blocked_hosts
+)
 
 
 class TestConfig(unittest.TestCase):
@@ -44,6 +49,51 @@ class TestConfig(unittest.TestCase):
         hosts = get_blocked_hosts(config)
         self.assertEqual(set(hosts), {"a.com", "b.com"})
 
+    def test_toggle_keeps_hosts_shared_with_enabled_groups(self):
+        config = Config(groups={
+            "lite": BlockGroup(on=True, hosts=["a.com", "b.com"]),
+            "full": BlockGroup(on=True, hosts=["a.com", "b.com", "c.com"]),
+        })
+        delta = config.toggle_group("lite")
+        self.assertFalse(config.groups["lite"].on)
+        self.assertEqual(delta.removed, set())
+        self.assertEqual(delta.added, set())
+
+        delta = config.toggle_group("full")
+        self.assertEqual(delta.removed, {"a.com", "b.com", "c.com"})
+        self.assertEqual(set(get_blocked_hosts(config)), set())
+
+        delta = config.set_group("lite", True)
+        self.assertEqual(delta.added, {"a.com", "b.com"})
+        self.assertEqual(config.index.groups_for("a.com"), {"lite"})
+
+    def test_diff_configs(self):
+        old = Config(groups={
+            "lite": BlockGroup(on=True, hosts=["a.com"]),
+            "full": BlockGroup(on=False, hosts=["a.com", "b.com"]),
+            "gone": BlockGroup(on=True, hosts=["x.com"]),
+        })
+        new = Config(groups={
+            "lite": BlockGroup(on=True, hosts=["a.com", "c.com"]),
+            "full": BlockGroup(on=True, hosts=["a.com", "b.com"]),
+            "new": BlockGroup(on=False, hosts=["d.com"]),
+        })
+        diff = diff_configs(old, new)
+        self.assertEqual(diff.groups_added, ["new"])
+        self.assertEqual(diff.groups_removed, ["gone"])
+        self.assertEqual(diff.groups_toggled, {"full": True})
+        self.assertEqual(diff.hosts_added, {"lite": {"c.com"}})
+        self.assertEqual(diff.hosts_removed, {})
+        self.assertEqual(diff.delta.added, {"b.com", "c.com"})
+        self.assertEqual(diff.delta.removed, {"x.com"})
+        self.assertFalse(diff_configs(new, new))
+
+        reformatted = Config(groups=new.groups, hosts_format={"compact": True})
+        diff = diff_configs(new, reformatted)
+        self.assertTrue(diff)
+        self.assertTrue(diff.format_changed)
+        self.assertFalse(diff.delta)
+
 
 class TestConfigFile(unittest.TestCase):
     def setUp(self):
@@ -51,21 +101,98 @@ class TestConfigFile(unittest.TestCase):
         self.config_path = os.path.join(self.temp_dir, "config.json")
 
     def tearDown(self):
-        if os.path.exists(self.config_path):
-            os.remove(self.config_path)
-        os.rmdir(self.temp_dir)
+        shutil.rmtree(self.temp_dir)
 
     def test_save_and_load(self):
         config = Config(
             active_groups=["test"],
             groups={"test": BlockGroup(on=True, hosts=["example.com"], description="Test")}
         )
+        save_config(config, self.config_path)
+        with open(self.config_path) as f:
+            self.assertEqual(json.load(f), config.to_dict())
+
+        loaded = load_config(self.config_path)
+        self.assertEqual(loaded, config)
+        self.assertEqual(set(get_blocked_hosts(loaded)), {"example.com"})
+
+    def test_load_missing_or_invalid(self):
+        self.assertEqual(load_config(self.config_path), Config())
+        with open(self.config_path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(load_config(self.config_path), Config())
+
+    def _watch(self, poll: bool):
+        config = Config(groups={"g": BlockGroup(on=False, hosts=["a.com"])})
+        with open(self.config_path, "w") as f:
+            json.dump(config.to_dict(), f)
+
+        diffs = []
+        fired = threading.Event()
+
+        def callback(diff):
+            diffs.append(diff)
+            fired.set()
+
+        watcher = ConfigWatcher(self.config_path, callback, debounce=0.05)
+        if poll:
+            with unittest.mock.patch("blocker.inotify.available", return_value=False):
+                watcher.start(interval=0.01)
+        else:
+            watcher.start()
+        try:
+            config.groups["g"].on = True
+            for _ in range(3):
+                with open(self.config_path, "w") as f:
+                    json.dump(config.to_dict(), f)
+            self.assertTrue(fired.wait(5))
+        finally:
+            watcher.stop()
+        self.assertEqual(len(diffs), 1)
+        self.assertEqual(diffs[0].groups_toggled, {"g": True})
+        self.assertEqual(diffs[0].delta.added, {"a.com"})
+
+    def test_watcher_survives_callback_errors(self):
+        config = Config(groups={"g": BlockGroup(on=False, hosts=["a.com"])})
+        save_config(config, self.config_path)
+        diffs = []
+
+        def callback(diff):
+            diffs.append(diff)
+            raise RuntimeError("callback failed")
+
+        watcher = ConfigWatcher(self.config_path, callback, config=load_config(self.config_path))
+        for change in ({"hosts_format": {"compact": True}}, {"groups": {"g": {"on": True, "hosts": ["a.com"]}}}):
+            with open(self.config_path, "w") as f:
+                json.dump({**config.to_dict(), **change}, f)
+            os.utime(self.config_path, ns=(len(diffs), len(diffs)))
+            with self.assertLogs("blocker.config", "ERROR"):
+                watcher._check()
+        self.assertEqual(len(diffs), 2)
+        self.assertTrue(diffs[0].format_changed)
+        self.assertEqual(diffs[1].groups_toggled, {"g": True})
+
+    def test_watcher_refreshes_snapshot(self):
+        from blocker.cache import content_hash, read_snapshot
+
+        config = Config(groups={"g": BlockGroup(on=False, hosts=["a.com"])})
+        save_config(config, self.config_path)
+        watcher = ConfigWatcher(self.config_path, lambda diff: None, config=config, refresh_cache=True)
+        config.groups["g"].on = True
         with open(self.config_path, "w") as f:
             json.dump(config.to_dict(), f)
+        watcher._check()
+        with open(self.config_path, "rb") as f:
+            self.assertEqual(read_snapshot(self.config_path)["hash"], content_hash(f.read()))
+
+    def test_watcher_polling(self):
+        self._watch(poll=True)
 
-        loaded = load_config()
-        # Note: load_config reads from default path, so we need to mock it
-        # This test verifies the serialization format
+    def test_watcher_inotify(self):
+        from blocker import inotify
+        if not inotify.available():
+            self.skipTest("inotify not available")
+        self._watch(poll=False)
 
 
 if __name__ == "__main__":
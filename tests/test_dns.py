@@ -0,0 +1,289 @@
+"""Tests for the DNS sinkhole, run offline against a local stub upstream."""
+
+import asyncio
+import errno
+import os
+import struct
+import unittest
+import unittest.mock
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config
+from blocker.dns import (
+    FLAG_TC,
+    RCODE_NOERROR,
+    RCODE_NXDOMAIN,
+    RCODE_SERVFAIL,
+    TYPE_A,
+    TYPE_AAAA,
+    DnsSinkhole,
+    ResponseCache,
+    build_response,
+    parse_question,
+    parse_records,
+)
+
+
+def make_query(name: str, qtype: int = TYPE_A, msg_id: int = 0x1234) -> bytes:
+    qname = b"".join(bytes([len(label)]) + label.encode() for label in name.split(".")) + b"\0"
+    return struct.pack("!HHHHHH", msg_id, 0x0100, 1, 0, 0, 0) + qname + struct.pack("!HH", qtype, 1)
+
+
+def answers(response: bytes) -> list[tuple[int, int, bytes]]:
+    """(type, ttl, rdata) of each answer record; names are always 0xC00C here."""
+    ancount = struct.unpack_from("!H", response, 6)[0]
+    offset = parse_question(response)[5]
+    out = []
+    for _ in range(ancount):
+        rtype, _, ttl, rdlength = struct.unpack_from("!HHIH", response, offset + 2)
+        offset += 12
+        out.append((rtype, ttl, response[offset:offset + rdlength]))
+        offset += rdlength
+    return out
+
+
+class StubUpstream(asyncio.DatagramProtocol):
+    """Answers every A query with 10.0.0.<n>; holds replies back until ``hold`` queries arrived."""
+
+    def __init__(self, ttl: int = 60, hold: int = 0):
+        self.ttl = ttl
+        self.hold = hold
+        self.queries = []
+        self._held = []
+        # Optional rewrite of each response, e.g. to spoof or truncate it
+        self.tamper = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        _, _, qname, _, _, end = parse_question(data)
+        self.queries.append(qname)
+        rdata = bytes([10, 0, 0, len(self.queries)])
+        response = bytearray(build_response(data, end, RCODE_NOERROR, [(TYPE_A, rdata)]))
+        struct.pack_into("!I", response, end + 6, self.ttl)
+        if self.tamper is not None:
+            response = self.tamper(response)
+        self._held.append((bytes(response), addr))
+        if len(self._held) >= self.hold:
+            # Release in reverse order to exercise out-of-order matching
+            for held in reversed(self._held):
+                self.transport.sendto(*held)
+            self._held = []
+
+
+class TestDnsSinkhole(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.config = Config(groups={
+            "ads": BlockGroup(on=True, hosts=["ads.example.com", "*.tracker.ru"]),
+            "off": BlockGroup(on=False, hosts=["off.example.com"]),
+        })
+        self.now = 1000.0
+        self.stub = StubUpstream()
+        loop = asyncio.get_running_loop()
+        self.stub_transport, _ = await loop.create_datagram_endpoint(
+            lambda: self.stub, local_addr=("127.0.0.1", 0)
+        )
+        upstream = self.stub_transport.get_extra_info("sockname")[:2]
+        self.sinkhole = DnsSinkhole(self.config, upstream=upstream, timeout=1.0, clock=lambda: self.now)
+
+    async def asyncTearDown(self):
+        await self.sinkhole.close()
+        self.stub_transport.close()
+
+    async def test_blocked_names_get_sink_addresses(self):
+        response = await self.sinkhole.resolve(make_query("ads.example.com"))
+        self.assertEqual(response[:2], b"\x12\x34")
+        self.assertEqual(answers(response), [(TYPE_A, 300, bytes(4))])
+
+        response = await self.sinkhole.resolve(make_query("a.b.TRACKER.ru", TYPE_AAAA))
+        self.assertEqual(answers(response), [(TYPE_AAAA, 300, bytes(16))])
+        self.assertEqual(self.stub.queries, [])
+
+    async def test_nxdomain_mode(self):
+        self.sinkhole.nxdomain = True
+        response = await self.sinkhole.resolve(make_query("ads.example.com"))
+        self.assertEqual(struct.unpack_from("!H", response, 2)[0] & 0xF, RCODE_NXDOMAIN)
+        self.assertEqual(answers(response), [])
+
+    async def test_forwards_and_caches(self):
+        first = await self.sinkhole.resolve(make_query("off.example.com", msg_id=1))
+        self.assertEqual(answers(first), [(TYPE_A, 60, bytes([10, 0, 0, 1]))])
+
+        self.now += 25
+        second = await self.sinkhole.resolve(make_query("off.example.com", msg_id=2))
+        self.assertEqual(second[:2], b"\x00\x02")
+        self.assertEqual(answers(second), [(TYPE_A, 35, bytes([10, 0, 0, 1]))])
+        self.assertEqual(self.stub.queries, ["off.example.com"])
+
+        self.now += 60
+        third = await self.sinkhole.resolve(make_query("off.example.com", msg_id=3))
+        self.assertEqual(answers(third)[0][2], bytes([10, 0, 0, 2]))
+
+    async def test_update_switches_config(self):
+        self.config.toggle_group("off")
+        self.sinkhole.update(self.config)
+        response = await self.sinkhole.resolve(make_query("off.example.com"))
+        self.assertEqual(answers(response)[0][2], bytes(4))
+
+    async def test_pipelined_queries_are_matched(self):
+        self.stub.hold = 20
+        names = [f"site{i}.example.org" for i in range(20)]
+        responses = await asyncio.gather(*(
+            self.sinkhole.resolve(make_query(name, msg_id=i)) for i, name in enumerate(names)
+        ))
+        for i, (name, response) in enumerate(zip(names, responses)):
+            self.assertEqual(struct.unpack_from("!H", response)[0], i)
+            self.assertEqual(parse_question(response)[2], name)
+            self.assertEqual(answers(response)[0][2][3], self.stub.queries.index(name) + 1)
+
+    async def test_upstream_timeout_is_servfail(self):
+        self.sinkhole.upstream.timeout = 0.05
+        self.stub.hold = 1000
+        response = await self.sinkhole.resolve(make_query("slow.example.org"))
+        self.assertEqual(struct.unpack_from("!H", response, 2)[0] & 0xF, RCODE_SERVFAIL)
+
+    async def test_mismatched_question_is_ignored(self):
+        self.sinkhole.upstream.timeout = 0.1
+        spoofed = make_query("evil.example.com")
+        # Same ID, answer for another name
+        self.stub.tamper = lambda response: response[:2] + build_response(
+            spoofed, parse_question(spoofed)[5], RCODE_NOERROR, [(TYPE_A, bytes([6, 6, 6, 6]))]
+        )[2:]
+        response = await self.sinkhole.resolve(make_query("site.example.org"))
+        self.assertEqual(struct.unpack_from("!H", response, 2)[0] & 0xF, RCODE_SERVFAIL)
+        self.assertEqual(len(self.sinkhole.cache), 0)
+
+    async def test_truncated_answer_is_retried_over_tcp(self):
+        def truncate(response):
+            struct.pack_into("!H", response, 2, struct.unpack_from("!H", response, 2)[0] | FLAG_TC)
+            return response
+
+        async def tcp_upstream(reader, writer):
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+            query = await reader.readexactly(length)
+            end = parse_question(query)[5]
+            response = build_response(query, end, RCODE_NOERROR, [(TYPE_A, bytes([10, 9, 9, n])) for n in range(40)])
+            writer.write(struct.pack("!H", len(response)) + response)
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(tcp_upstream, *self.sinkhole.upstream.address)
+        self.stub.tamper = truncate
+        try:
+            udp = await self.sinkhole.resolve(make_query("big.example.org"))
+            self.assertTrue(struct.unpack_from("!H", udp, 2)[0] & FLAG_TC)
+            tcp = await self.sinkhole.resolve(make_query("big.example.org", msg_id=7), tcp=True)
+        finally:
+            server.close()
+            await server.wait_closed()
+        self.assertEqual(tcp[:2], b"\x00\x07")
+        self.assertFalse(struct.unpack_from("!H", tcp, 2)[0] & FLAG_TC)
+        self.assertEqual(len(answers(tcp)), 40)
+        self.assertEqual(len(self.sinkhole.cache), 0)
+
+    async def test_udp_tasks_are_referenced_until_done(self):
+        import gc
+
+        host, port = await self.sinkhole.start("127.0.0.1", 0)
+        protocol = self.sinkhole._servers[0].get_protocol()
+        self.stub.hold = 2
+        loop = asyncio.get_running_loop()
+        received = loop.create_future()
+
+        class Client(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                received.set_result(data)
+
+        transport, _ = await loop.create_datagram_endpoint(Client, remote_addr=(host, port))
+        transport.sendto(make_query("slow.example.org"))
+        while not self.stub.queries:
+            await asyncio.sleep(0.01)
+        self.assertEqual(len(protocol._tasks), 1)
+        gc.collect()
+        # The held reply goes out once a second query arrives
+        await self.sinkhole.resolve(make_query("other.example.org"))
+        response = await asyncio.wait_for(received, 2)
+        transport.close()
+        self.assertEqual(parse_question(response)[2], "slow.example.org")
+        await asyncio.sleep(0)
+        self.assertEqual(protocol._tasks, set())
+
+    async def test_port_zero_retries_when_tcp_port_is_taken(self):
+        import socket
+
+        real_start_server = asyncio.start_server
+        calls = []
+
+        async def start_server(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OSError(errno.EADDRINUSE, "in use")
+            return await real_start_server(*args, **kwargs)
+
+        with unittest.mock.patch("blocker.dns.asyncio.start_server", start_server):
+            host, port = await self.sinkhole.start("127.0.0.1", 0)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[1][2], port)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client:
+            client.connect((host, port))
+
+    async def test_malformed_query_is_dropped(self):
+        self.assertIsNone(await self.sinkhole.resolve(b"\x00\x01"))
+
+    async def test_udp_and_tcp_listeners(self):
+        host, port = await self.sinkhole.start("127.0.0.1", 0)
+        loop = asyncio.get_running_loop()
+        received = loop.create_future()
+
+        class Client(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                received.set_result(data)
+
+        transport, _ = await loop.create_datagram_endpoint(Client, remote_addr=(host, port))
+        transport.sendto(make_query("ads.example.com"))
+        response = await asyncio.wait_for(received, 2)
+        transport.close()
+        self.assertEqual(answers(response)[0][2], bytes(4))
+
+        reader, writer = await asyncio.open_connection(host, port)
+        query = make_query("off.example.com")
+        writer.write(struct.pack("!H", len(query)) + query)
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+        response = await reader.readexactly(length)
+        writer.close()
+        self.assertEqual(answers(response)[0][2], bytes([10, 0, 0, 1]))
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_bounded_lru(self):
+        cache = ResponseCache(maxsize=2, clock=lambda: 0.0)
+        query = make_query("a.com")
+        end = parse_question(query)[5]
+        response = build_response(query, end, RCODE_NOERROR, [(TYPE_A, bytes(4))])
+        for key in ("a", "b"):
+            cache.put((key,), response)
+        cache.get(("a",))
+        cache.put(("c",), response)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(("b",)))
+        self.assertIsNotNone(cache.get(("a",)))
+
+    def test_errors_are_not_cached(self):
+        cache = ResponseCache(clock=lambda: 0.0)
+        query = make_query("a.com")
+        cache.put(("a",), build_response(query, parse_question(query)[5], RCODE_SERVFAIL))
+        self.assertEqual(len(cache), 0)
+
+    def test_parse_records_collects_ttls(self):
+        query = make_query("a.com")
+        response = build_response(query, parse_question(query)[5], RCODE_NOERROR, [(TYPE_A, bytes(4))] * 2)
+        offsets, ttl = parse_records(response)
+        self.assertEqual(len(offsets), 2)
+        self.assertEqual(ttl, 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
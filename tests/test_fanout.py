@@ -0,0 +1,62 @@
+"""Tests for multi-target apply."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config
+from blocker.fanout import apply_many, expand_targets
+from blocker.hosts import BLOCK_IP
+from blocker.metrics import Metrics
+
+
+class TestFanout(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(12):
+            etc = os.path.join(self.temp_dir, f"root{i}", "etc")
+            os.makedirs(etc)
+            path = os.path.join(etc, "hosts")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"127.0.0.1 localhost\n{BLOCK_IP} old.com\n")
+            self.paths.append(path)
+        self.config = Config(groups={"g": BlockGroup(on=True, hosts=["a.com", "b.com"])})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_expand_targets(self):
+        pattern = os.path.join(self.temp_dir, "*", "etc", "hosts")
+        self.assertEqual(expand_targets([pattern, self.paths[0]]), sorted(self.paths))
+        self.assertEqual(expand_targets([os.path.join(self.temp_dir, "**", "hosts")]), sorted(self.paths))
+
+    def test_apply_many(self):
+        report = apply_many(self.config, self.paths, jobs=4, metrics=Metrics())
+        self.assertTrue(report.ok)
+        self.assertEqual([r.path for r in report.results], self.paths)
+        for path, result in zip(self.paths, report.results):
+            self.assertEqual((result.added, result.removed), (2, 1))
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            self.assertIn(f"{BLOCK_IP} a.com\n", content)
+            self.assertNotIn("old.com", content)
+
+        again = apply_many(self.config, self.paths, jobs=4, metrics=Metrics())
+        self.assertTrue(all(result.write_skipped for result in again.results))
+        self.assertIn("12 targets: 12 ok, 0 failed", again.summary())
+
+    def test_failed_target_is_reported(self):
+        missing = os.path.join(self.temp_dir, "root0", "etc", "missing")
+        report = apply_many(self.config, [self.paths[0], missing], metrics=Metrics())
+        self.assertFalse(report.ok)
+        self.assertEqual([r.path for r in report.failed], [missing])
+        self.assertIn("1 failed", report.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
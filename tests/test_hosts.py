@@ -0,0 +1,283 @@
+"""Tests for hosts file module."""
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import Config, BlockGroup
+from blocker.metrics import Metrics
+from blocker.hosts import HostsEntry, HostsFile, HostsFormat, HostsManager, BLOCK_IP, SECTION_BEGIN, SECTION_END, parse_entry
+
+
+class TestHostsFile(unittest.TestCase):
+    def test_index_matches_exact_hostnames(self):
+        hosts_file = HostsFile.parse(
+            "127.0.0.1 localhost\n"
+            f"{BLOCK_IP} mail.ru\n"
+            f"{BLOCK_IP} top.mail.ru\n"
+        )
+        self.assertIn("mail.ru", hosts_file)
+        self.assertTrue(hosts_file.remove("mail.ru"))
+        self.assertEqual(
+            hosts_file.render(),
+            f"127.0.0.1 localhost\n{BLOCK_IP} top.mail.ru\n",
+        )
+
+    def test_add_writes_managed_section(self):
+        hosts_file = HostsFile.parse("127.0.0.1 localhost")
+        self.assertTrue(hosts_file.add("a.com"))
+        self.assertFalse(hosts_file.add("a.com"))
+        lines = hosts_file.lines()
+        self.assertEqual(lines[0], "127.0.0.1 localhost\n")
+        self.assertTrue(lines[1].startswith(f"{SECTION_BEGIN} sha256="))
+        self.assertEqual(lines[2:], [f"{BLOCK_IP} a.com\n", f"{SECTION_END}\n"])
+
+    def test_section_hash_round_trip(self):
+        hosts_file = HostsFile.parse("# header\n")
+        hosts_file.add("a.com")
+        hosts_file.add("b.com")
+        reparsed = HostsFile.parse(hosts_file.render() + "# footer\n")
+        self.assertFalse(reparsed.changed)
+        self.assertEqual(reparsed.hosts(), {"a.com", "b.com"})
+        reparsed.remove("a.com")
+        self.assertTrue(reparsed.changed)
+        self.assertTrue(reparsed.render().endswith(f"{SECTION_END}\n# footer\n"))
+
+    def test_edited_section_is_rewritten(self):
+        hosts_file = HostsFile.parse("")
+        hosts_file.add("a.com")
+        tampered = HostsFile.parse(hosts_file.render().replace("a.com", "x.com"))
+        tampered.prune({"a.com"})
+        tampered.add("a.com")
+        self.assertTrue(tampered.changed)
+
+    def test_migrate_moves_legacy_entries(self):
+        hosts_file = HostsFile.parse(
+            f"{BLOCK_IP} a.com\n127.0.0.1 localhost\n{BLOCK_IP} a.com\n{BLOCK_IP} b.com\n"
+        )
+        self.assertEqual(hosts_file.legacy_hosts, {"a.com", "b.com"})
+        self.assertEqual(hosts_file.migrate(), 2)
+        self.assertEqual(hosts_file.legacy_hosts, set())
+        self.assertFalse(hosts_file.has_legacy)
+        self.assertEqual(hosts_file.migrate(), 0)
+        lines = hosts_file.lines()
+        self.assertEqual(lines[0], "127.0.0.1 localhost\n")
+        self.assertEqual(lines[2:], [f"{BLOCK_IP} a.com\n", f"{BLOCK_IP} b.com\n", f"{SECTION_END}\n"])
+
+
+    def test_begin_without_end_is_not_a_section(self):
+        content = f"# BEGIN RUBlocker84 sha256=abc\n127.0.0.1 localhost\n10.0.0.1 myserver\n{BLOCK_IP} a.com\n"
+        hosts_file = HostsFile.parse(content)
+        self.assertEqual(hosts_file.legacy_hosts, {"a.com"})
+        hosts_file.migrate()
+        hosts_file.add("b.com")
+        rendered = hosts_file.render()
+        for line in ("# BEGIN RUBlocker84 sha256=abc\n", "127.0.0.1 localhost\n", "10.0.0.1 myserver\n"):
+            self.assertIn(line, rendered)
+        # The stray marker stays a comment; the real section is the one that is closed
+        reparsed = HostsFile.parse(rendered)
+        self.assertFalse(reparsed.changed)
+        self.assertEqual(reparsed.hosts(), {"a.com", "b.com"})
+        self.assertEqual(reparsed.render(), rendered)
+
+    def test_hand_edited_section_keeps_foreign_lines(self):
+        hosts_file = HostsFile.parse("127.0.0.1 localhost\n")
+        hosts_file.add("a.com")
+        edited = hosts_file.render().replace(f"{BLOCK_IP} a.com\n", f"{BLOCK_IP} a.com\n10.0.0.1 myserver\n# note\n")
+        reparsed = HostsFile.parse(edited)
+        self.assertTrue(reparsed.changed)
+        self.assertEqual(reparsed.hosts(), {"a.com"})
+        self.assertEqual([entry.names for entry in reparsed.entries()], [("localhost",), ("myserver",)])
+        self.assertTrue(reparsed.render().endswith(f"{SECTION_END}\n10.0.0.1 myserver\n# note\n"))
+
+
+class TestHostsFormat(unittest.TestCase):
+    def test_compact_lines_are_sorted_and_packed(self):
+        fmt = HostsFormat(sink="0.0.0.0", aliases=2, ipv6=True)
+        self.assertEqual(fmt.lines(["c.com", "a.com", "b.com"]), [
+            "0.0.0.0 a.com b.com\n", ":: a.com b.com\n",
+            "0.0.0.0 c.com\n", ":: c.com\n",
+        ])
+
+    def test_invalid_format_rejected(self):
+        with self.assertRaises(ValueError):
+            HostsFormat(sink="10.0.0.1")
+        with self.assertRaises(ValueError):
+            HostsFormat(aliases=0)
+        self.assertEqual(HostsFormat.from_dict({"compact": True, "aliases": 10_000}), HostsFormat.compact())
+
+    def test_both_layouts_parse_and_switching_rewrites(self):
+        classic = HostsFile.parse("# header\n")
+        for host in ("a.com", "b.com", "c.com"):
+            classic.add(host)
+        compact_format = HostsFormat(sink="0.0.0.0", aliases=2)
+
+        reread = HostsFile.parse(classic.render(), compact_format)
+        self.assertEqual(reread.hosts(), {"a.com", "b.com", "c.com"})
+        self.assertTrue(reread.changed)
+        self.assertIn("0.0.0.0 a.com b.com\n", reread.lines())
+
+        compact = HostsFile.parse(reread.render(), compact_format)
+        self.assertEqual(compact.hosts(), {"a.com", "b.com", "c.com"})
+        self.assertFalse(compact.changed)
+        self.assertEqual(HostsFile.parse(compact.render()).hosts(), compact.hosts())
+
+    def test_section_is_rendered_once_per_change(self):
+        hosts_file = HostsFile.parse("# header\n")
+        hosts_file.add_all({"a.com", "b.com"})
+        with unittest.mock.patch.object(HostsFormat, "lines", autospec=True, side_effect=HostsFormat.lines) as lines:
+            first = hosts_file.render()
+            self.assertEqual(hosts_file.render(), first)
+            hosts_file.section_hash()
+            self.assertEqual(lines.call_count, 1)
+            hosts_file.remove("a.com")
+            self.assertNotIn("a.com", hosts_file.render())
+            hosts_file.hosts_format = HostsFormat.compact()
+            self.assertIn("0.0.0.0 b.com\n", hosts_file.render())
+            self.assertEqual(lines.call_count, 3)
+
+
+class TestHostsParser(unittest.TestCase):
+    def test_parse_entry(self):
+        self.assertEqual(
+            parse_entry("10.0.0.1\tnas.lan  nas\t# storage\r\n"),
+            HostsEntry("10.0.0.1", ("nas.lan", "nas"), "storage"),
+        )
+        self.assertEqual(parse_entry("fe80::1%eth0 router"), HostsEntry("fe80::1%eth0", ("router",)))
+        self.assertEqual(parse_entry("::1 localhost ip6-localhost").names, ("localhost", "ip6-localhost"))
+        for line in ("# 10.0.0.1 commented", "", "   \t", "10.0.0.1", "notanip host", "999.1.1.1 host"):
+            self.assertIsNone(parse_entry(line), line)
+
+    def test_crlf_is_preserved(self):
+        hosts_file = HostsFile.parse("127.0.0.1 localhost\r\n# note\r\n")
+        hosts_file.add("a.com")
+        rendered = hosts_file.render()
+        self.assertNotIn("\n", rendered.replace("\r\n", ""))
+        self.assertIn(f"{BLOCK_IP} a.com\r\n", rendered)
+        self.assertFalse(HostsFile.parse(rendered).changed)
+
+    def test_conflicts(self):
+        hosts_file = HostsFile.parse(
+            "10.0.0.5 Ads.example.com www.example.com\n"
+            f"{BLOCK_IP} tracker.com\n"
+            "# 10.0.0.6 tracker.com\n"
+        )
+        conflicts = hosts_file.conflicts({"ads.example.com", "tracker.com"})
+        self.assertEqual([(c.host, c.address) for c in conflicts], [("ads.example.com", "10.0.0.5")])
+
+    def test_commit_matches_reparse(self):
+        hosts_file = HostsFile.parse(f"127.0.0.1 localhost\n{BLOCK_IP} old.com\n10.0.0.1 nas")
+        hosts_file.migrate()
+        hosts_file.add("a.com")
+        hosts_file.remove("old.com")
+        rendered = hosts_file.render()
+        hosts_file.commit()
+        fresh = HostsFile.parse(rendered)
+        self.assertFalse(hosts_file.changed)
+        self.assertEqual(hosts_file.render(), rendered)
+        self.assertEqual(hosts_file.hosts(), fresh.hosts())
+        self.assertEqual(hosts_file.stored_hash, fresh.stored_hash)
+
+
+class TestHostsManagerApply(unittest.TestCase):
+    def setUp(self):
+        fd, self.hosts_path = tempfile.mkstemp()
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("127.0.0.1 localhost\n")
+        self.manager = HostsManager(self.hosts_path)
+
+    def tearDown(self):
+        os.remove(self.hosts_path)
+        if os.path.exists(self.hosts_path + ".lock"):
+            os.remove(self.hosts_path + ".lock")
+
+    def read(self):
+        with open(self.hosts_path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_apply_adds_enabled_and_removes_disabled(self):
+        with open(self.hosts_path, "a", encoding="utf-8") as f:
+            f.write(f"{BLOCK_IP} c.com\n")
+        config = Config(groups={
+            "group1": BlockGroup(on=True, hosts=["a.com", "b.com", "bad/host"]),
+            "group2": BlockGroup(on=False, hosts=["c.com"]),
+        })
+        self.assertTrue(self.manager.apply(config))
+        content = self.read()
+        self.assertIn("127.0.0.1 localhost\n", content)
+        self.assertIn(f"{BLOCK_IP} a.com\n", content)
+        self.assertIn(f"{BLOCK_IP} b.com\n", content)
+        self.assertNotIn("c.com", content)
+        self.assertNotIn("bad/host", content)
+
+    def test_apply_keeps_shared_hosts(self):
+        config = Config(groups={
+            "lite": BlockGroup(on=False, hosts=["a.com"]),
+            "full": BlockGroup(on=True, hosts=["a.com", "b.com"]),
+        })
+        self.manager.apply(config)
+        self.assertIn(f"{BLOCK_IP} a.com\n", self.read())
+
+    def test_apply_skips_write_when_unchanged(self):
+        config = Config(groups={"g": BlockGroup(on=True, hosts=["a.com"])})
+        self.manager.apply(config)
+        mtime = os.stat(self.hosts_path).st_mtime_ns
+        os.utime(self.hosts_path, ns=(0, 0))
+        self.manager.apply(config)
+        self.assertEqual(os.stat(self.hosts_path).st_mtime_ns, 0)
+        self.assertNotEqual(mtime, 0)
+
+    def test_apply_delta(self):
+        config = Config(groups={
+            "lite": BlockGroup(on=True, hosts=["a.com"]),
+            "full": BlockGroup(on=True, hosts=["a.com", "b.com"]),
+        })
+        self.manager.apply(config)
+        self.assertTrue(self.manager.apply_delta(config.toggle_group("full")))
+        content = self.read()
+        self.assertIn(f"{BLOCK_IP} a.com\n", content)
+        self.assertNotIn("b.com", content)
+
+    def test_update_group_disable_keeps_subdomains(self):
+        self.manager.update_group(["mail.ru", "top.mail.ru"], enable=True)
+        self.manager.update_group(["mail.ru"], enable=False)
+        content = self.read()
+        self.assertIn(f"{BLOCK_IP} top.mail.ru\n", content)
+        self.assertNotIn(f"{BLOCK_IP} mail.ru\n", content)
+
+    def test_apply_keeps_lines_after_truncated_section(self):
+        with open(self.hosts_path, "w", encoding="utf-8") as f:
+            f.write(f"# BEGIN RUBlocker84 sha256=abc\n{BLOCK_IP} old.com\n127.0.0.1 localhost\n10.0.0.1 myserver\n")
+        self.assertTrue(self.manager.apply(Config(groups={"g": BlockGroup(on=True, hosts=["a.com"])})))
+        content = self.read()
+        self.assertIn("127.0.0.1 localhost\n", content)
+        self.assertIn("10.0.0.1 myserver\n", content)
+        self.assertNotIn("old.com", content)
+        self.assertIn(f"{BLOCK_IP} a.com\n{SECTION_END}\n", content)
+
+    def test_parse_is_reused_until_file_changes(self):
+        manager = HostsManager(self.hosts_path, metrics=Metrics())
+        manager.update_group(["a.com"], enable=True)
+        manager.update_group(["b.com"], enable=True)
+        self.assertTrue(manager.last_stats.parse_cached)
+
+        with open(self.hosts_path, "a", encoding="utf-8") as f:
+            f.write("10.0.0.1 a.com\n")
+        self.assertEqual([c.address for c in manager.conflicts(Config(groups={
+            "g": BlockGroup(on=True, hosts=["a.com"]),
+        }))], ["10.0.0.1"])
+        self.assertFalse(manager.last_stats.parse_cached)
+        manager.update_group(["a.com"], enable=False)
+        self.assertTrue(manager.last_stats.parse_cached)
+        content = self.read()
+        self.assertIn(f"{BLOCK_IP} b.com\n", content)
+        self.assertIn("10.0.0.1 a.com\n", content)
+        self.assertNotIn(f"{BLOCK_IP} a.com", content)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Tests for blocklist import."""
+
+import os
+import tempfile
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config, get_blocked_hosts
+from blocker.importer import build_store, import_blocklist, iter_domains, parse_line
+from blocker.store import DomainStore
+
+
+class TestParseLine(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_line("0.0.0.0 ads.example.com tracker.example.com # ads"),
+                         ["ads.example.com", "tracker.example.com"])
+        self.assertEqual(parse_line(":: ads.example.com"), ["ads.example.com"])
+        self.assertEqual(parse_line("ads.example.com"), ["ads.example.com"])
+        self.assertEqual(parse_line("||ads.example.com^"), ["ads.example.com"])
+        self.assertEqual(parse_line("||ads.example.com^$script"), [])
+        self.assertEqual(parse_line("! adblock comment"), [])
+        self.assertEqual(parse_line("[Adblock Plus 2.0]"), [])
+        self.assertEqual(parse_line("# comment"), [])
+
+
+class TestImport(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(
+                "# list\n"
+                "127.0.0.1 localhost\n"
+                "0.0.0.0 B.example.com.\n"
+                "||a.example.com^\n"
+                "a.example.com\n"
+                "bad_host!\n"
+                "c.example.com\r\n"
+            )
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_iter_domains_normalises(self):
+        self.assertEqual(
+            list(iter_domains(self.path)),
+            ["b.example.com", "a.example.com", "a.example.com", "c.example.com"],
+        )
+
+    def test_build_store_spills_chunks(self):
+        hosts = [f"h{i % 50}.example.com" for i in range(500)]
+        store = build_store(hosts, chunk_size=7)
+        self.assertEqual(list(store), sorted(set(hosts)))
+
+    def test_import_blocklist(self):
+        config = Config(groups={"preset": BlockGroup(on=True, hosts=["a.example.com"])})
+        group = import_blocklist(config, "imported", self.path, on=True)
+        self.assertIsInstance(group.hosts, DomainStore)
+        self.assertEqual(list(group.hosts), ["a.example.com", "b.example.com", "c.example.com"])
+        self.assertEqual(config.index.groups_for("a.example.com"), {"preset", "imported"})
+        self.assertEqual(len(get_blocked_hosts(config)), 3)
+        self.assertEqual(config.to_dict()["groups"]["imported"]["hosts"], list(group.hosts))
+        with self.assertRaises(ValueError):
+            import_blocklist(config, "imported", self.path)
+
+
+class TestDomainStore(unittest.TestCase):
+    def test_sequence_behaviour(self):
+        store = DomainStore.from_hosts(["b.com", "a.com", "b.com", "c.com"])
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store[0], "a.com")
+        self.assertEqual(store[-1], "c.com")
+        self.assertEqual(store[1:], ["b.com", "c.com"])
+        self.assertIn("b.com", store)
+        self.assertNotIn("d.com", store)
+        self.assertEqual(store, ["a.com", "b.com", "c.com"])
+        self.assertNotEqual(store, ["a.com"])
+        with self.assertRaises(IndexError):
+            store[3]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Tests for the hosts-file change journal and rollback."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import HostDelta
+from blocker.hosts import BLOCK_IP, HostsManager
+from blocker.journal import Journal, inverse_delta, journal_path
+from blocker.metrics import Metrics
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "hosts.journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_append_and_read(self):
+        journal = Journal(self.path)
+        self.assertEqual(len(journal), 0)
+        journal.append("apply", {"b.com", "a.com"}, set(), None, "h1")
+        journal.append("apply_delta", set(), {"a.com"}, "h1", "h2")
+        entries = journal.entries()
+        self.assertEqual([entry.seq for entry in entries], [1, 2])
+        self.assertEqual(entries[0].added, ("a.com", "b.com"))
+        self.assertEqual(journal.entries(1), entries[1:])
+        self.assertEqual(len(journal), 2)
+
+    def test_inverse_delta_undoes_newest_first(self):
+        journal = Journal(self.path)
+        journal.append("x", {"a.com"}, set(), None, "h1")
+        journal.append("y", set(), {"a.com"}, "h1", "h2")
+        journal.append("z", {"b.com"}, {"c.com"}, "h2", "h3")
+        self.assertEqual(
+            inverse_delta(journal.entries()),
+            HostDelta(added={"c.com"}, removed={"a.com", "b.com"}),
+        )
+        self.assertEqual(inverse_delta(journal.entries(1)), HostDelta(added={"c.com"}, removed={"b.com"}))
+
+    def test_compaction_bounds_entries_and_bytes(self):
+        journal = Journal(self.path, max_entries=10)
+        for i in range(25):
+            journal.append("apply", {f"h{i}.com"}, set(), None, None)
+        self.assertLessEqual(len(journal), 10)
+        self.assertEqual(journal.entries()[-1].seq, 25)
+
+        big = Journal(os.path.join(self.temp_dir, "big.journal"), max_bytes=4096)
+        for i in range(20):
+            big.append("import", {f"host{i}-{j}.example.com" for j in range(40)}, set(), None, None)
+        self.assertLessEqual(os.path.getsize(big.path), 4096)
+        # The newest entry survives even when it alone exceeds the budget
+        self.assertEqual(big.entries()[-1].seq, 20)
+
+    def test_torn_line_is_skipped(self):
+        journal = Journal(self.path)
+        journal.append("apply", {"a.com"}, set(), None, "h1")
+        with open(self.path, "ab") as f:
+            f.write(b'{"seq": 2, "time": 1, "oper')
+        self.assertEqual([entry.seq for entry in journal.entries()], [1])
+        entry = journal.append("apply", {"b.com"}, set(), "h1", "h2")
+        self.assertEqual([e.seq for e in journal.entries()], [1, entry.seq])
+
+
+class TestRollback(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.hosts_path = os.path.join(self.temp_dir, "hosts")
+        with open(self.hosts_path, "w", encoding="utf-8") as f:
+            f.write("127.0.0.1 localhost\n")
+        self.journal = Journal(journal_path(self.hosts_path))
+        self.manager = HostsManager(self.hosts_path, metrics=Metrics(), journal=self.journal)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self):
+        with open(self.hosts_path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_rollback_restores_previous_content(self):
+        original = self.read()
+        self.assertTrue(self.manager.update_group(["a.com", "b.com"], enable=True))
+        after_first = self.read()
+        imported = [f"h{i}.example.com" for i in range(1000)]
+        self.assertTrue(self.manager.apply_hosts(set(imported) | {"a.com"}))
+        entry = self.journal.entries()[-1]
+        self.assertEqual((len(entry.added), entry.removed), (1000, ("b.com",)))
+
+        self.assertTrue(self.manager.rollback())
+        self.assertEqual(self.read(), after_first)
+        self.assertEqual(len(self.journal), 1)
+        self.assertTrue(self.manager.rollback())
+        self.assertEqual(self.read(), original)
+        self.assertEqual(len(self.journal), 0)
+        self.assertFalse(self.manager.rollback())
+
+    def test_rollback_several_steps_at_once(self):
+        original = self.read()
+        for host in ("a.com", "b.com", "c.com"):
+            self.assertTrue(self.manager.update_group([host], enable=True))
+        self.assertTrue(self.manager.update_group(["a.com"], enable=False))
+        self.assertTrue(self.manager.rollback(4))
+        self.assertEqual(self.read(), original)
+        self.assertEqual(self.manager.last_stats.operation, "rollback")
+
+    def test_unjournaled_edit_refuses_rollback(self):
+        self.assertTrue(self.manager.update_group(["a.com"], enable=True))
+        HostsManager(self.hosts_path, metrics=Metrics()).update_group(["x.com"], enable=True)
+        self.assertFalse(self.manager.rollback())
+        self.assertIn(f"{BLOCK_IP} a.com", self.read())
+        self.assertTrue(self.manager.rollback(force=True))
+        content = self.read()
+        self.assertNotIn("a.com", content)
+        self.assertIn(f"{BLOCK_IP} x.com", content)
+
+    def test_skipped_writes_are_not_journaled(self):
+        self.assertTrue(self.manager.update_group(["a.com"], enable=True))
+        self.assertTrue(self.manager.update_group(["a.com"], enable=True))
+        self.assertEqual(len(self.journal), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
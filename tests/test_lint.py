@@ -0,0 +1,51 @@
+"""Tests for the blocklist analyzer."""
+
+import os
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config
+from blocker.lint import lint_config, minimise_config
+from blocker.store import DomainStore
+
+
+class TestLint(unittest.TestCase):
+    def make_config(self):
+        return Config(groups={
+            "lite": BlockGroup(on=True, hosts=["a.com", "b.com", "a.com", "vk.com/js/api"]),
+            "full": BlockGroup(on=False, hosts=[
+                "a.com", "*.x.ru", "*.deep.x.ru", "mc.x.ru", "x.ru", "*.bad_", "c.com",
+            ]),
+            "store": BlockGroup(on=False, hosts=DomainStore.from_hosts(["b.com", "d.com"])),
+        })
+
+    def test_report(self):
+        report = lint_config(self.make_config())
+        lite, full = report.groups["lite"], report.groups["full"]
+        self.assertEqual(lite.duplicates, ["a.com"])
+        self.assertEqual(lite.invalid, ["vk.com/js/api"])
+        self.assertEqual(full.invalid, ["*.bad_"])
+        self.assertEqual(full.covered_patterns, [("*.deep.x.ru", "*.x.ru")])
+        self.assertEqual(full.covered_hosts, [("mc.x.ru", "*.x.ru")])
+        self.assertFalse(report.groups["store"])
+        self.assertEqual(report.overlap, {("lite", "full"): 1, ("lite", "store"): 1})
+        self.assertEqual(report.removable, 4)
+        self.assertIn("full: *.deep.x.ru is redundant next to *.x.ru", report.format())
+        self.assertEqual(report.to_dict()["removable"], 4)
+
+    def test_minimise_keeps_what_is_blocked(self):
+        config = self.make_config()
+        config.groups["full"].on = True
+        before = set(config.index.blocked)
+        self.assertEqual(minimise_config(config), 4)
+        self.assertEqual(config.groups["lite"].hosts, ["a.com", "b.com"])
+        self.assertEqual(config.groups["full"].hosts, ["a.com", "*.x.ru", "mc.x.ru", "x.ru", "c.com"])
+        self.assertEqual(set(config.index.blocked), before)
+        self.assertTrue(config.is_blocked("a.deep.x.ru"))
+        self.assertEqual(lint_config(config).removable, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
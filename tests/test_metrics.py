@@ -0,0 +1,82 @@
+"""Tests for hot-path instrumentation."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config, ConfigWatcher, save_config
+from blocker.hosts import HostsManager
+from blocker.metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.hosts_path = os.path.join(self.temp_dir, "hosts")
+        with open(self.hosts_path, "w", encoding="utf-8") as f:
+            f.write("127.0.0.1 localhost\n# comment\n")
+        self.metrics = Metrics()
+        self.manager = HostsManager(self.hosts_path, metrics=self.metrics)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_apply_records_stats(self):
+        config = Config(groups={"g": BlockGroup(on=True, hosts=["a.com", "b.com"])})
+        self.manager.apply(config)
+        self.manager.apply(config)
+        self.assertTrue(self.metrics.last("apply").parse_cached)
+        self.assertEqual(self.metrics.last("apply").bytes_read, 0)
+
+        # A fresh manager has no parse to reuse
+        HostsManager(self.hosts_path, metrics=self.metrics).apply(config)
+        stats = self.manager.stats()["apply"]
+        last = stats["last"]
+        self.assertFalse(last["parse_cached"])
+        self.assertEqual(last["lines_scanned"], 6)
+        self.assertEqual(last["bytes_read"], os.path.getsize(self.hosts_path))
+        self.assertEqual((last["added"], last["removed"]), (0, 0))
+        self.assertTrue(last["write_skipped"])
+        self.assertEqual(last["bytes_written"], 0)
+        self.assertEqual(stats["totals"]["count"], 3)
+        self.assertEqual(stats["totals"]["added"], 2)
+        self.assertEqual(stats["totals"]["writes_skipped"], 2)
+        self.assertGreater(stats["totals"]["bytes_written"], 0)
+
+    def test_failed_read_is_recorded(self):
+        manager = HostsManager(os.path.join(self.temp_dir, "missing"), metrics=self.metrics)
+        self.assertFalse(manager.update_group(["a.com"], enable=True))
+        self.assertFalse(self.metrics.last("update_group").ok)
+
+    def test_prometheus_textfile(self):
+        self.manager.update_group(["a.com"], enable=True)
+        path = os.path.join(self.temp_dir, "rublocker.prom")
+        self.metrics.write_textfile(path)
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn('rublocker_op_entries_added{operation="update_group"} 1\n', text)
+        self.assertIn('rublocker_ops_count_total{operation="update_group"} 1\n', text)
+        self.assertIn('rublocker_op_duration_seconds{operation="update_group",phase="write"}', text)
+
+    def test_watcher_reload_is_recorded(self):
+        config_path = os.path.join(self.temp_dir, "config.json")
+        config = Config(groups={"g": BlockGroup(on=False, hosts=["a.com"])})
+        save_config(config, config_path)
+        watcher = ConfigWatcher(config_path, lambda diff: None, metrics=self.metrics)
+        watcher.config = Config(groups={"g": BlockGroup(on=False, hosts=["a.com"])})
+        config.groups["g"].on = True
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(config.to_dict(), f)
+        watcher._check()
+        last = self.metrics.last("watcher_reload")
+        self.assertEqual(last.added, 1)
+        self.assertGreaterEqual(last.total_time, last.read_time)
+
+
+if __name__ == "__main__":
+    unittest.main()
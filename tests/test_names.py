@@ -0,0 +1,77 @@
+"""Tests for hostname normalisation and validation."""
+
+import os
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config
+from blocker.hosts import sanitize_hosts
+from blocker.lint import lint_config, minimise_config
+from blocker.names import BATCH_SIZE, is_canonical, normalize_host, normalize_hosts
+
+
+class TestNormalizeHost(unittest.TestCase):
+    def test_canonical_forms(self):
+        cases = {
+            "mc.yandex.ru": "mc.yandex.ru",
+            "MC.Yandex.ru": "mc.yandex.ru",
+            "mc.yandex.ru.": "mc.yandex.ru",
+            " ads.example.com\t": "ads.example.com",
+            "пример.рф": "xn--e1afmkfd.xn--p1ai",
+            "ПРИМЕР.РФ.": "xn--e1afmkfd.xn--p1ai",
+            "*.Пример.рф": "*.xn--e1afmkfd.xn--p1ai",
+            "*.YANDEX.ru": "*.yandex.ru",
+            "xn--p1ai": "xn--p1ai",
+        }
+        for host, expected in cases.items():
+            with self.subTest(host=host):
+                self.assertEqual(normalize_host(host), expected)
+                self.assertTrue(is_canonical(expected.removeprefix("*.")))
+
+    def test_invalid_names(self):
+        for host in ["", ".", "a..b", "a.com..", "-a.com", "a-.com", "bad_host", "vk.com/js/api",
+                     "*.", "*.bad_", "a" * 254, "a.com\nb.com"]:
+            with self.subTest(host=host):
+                self.assertIsNone(normalize_host(host))
+
+
+class TestNormalizeHosts(unittest.TestCase):
+    def test_batch_matches_single_names(self):
+        hosts = [f"h{i}.example.com" for i in range(2 * BATCH_SIZE + 5)]
+        hosts[3] = "Upper.Example.com"
+        hosts[BATCH_SIZE + 7] = "bad host"
+        hosts[-1] = "пример.рф."
+        expected = [name for name in map(normalize_host, hosts) if name is not None]
+        self.assertEqual(normalize_hosts(hosts), expected)
+        self.assertEqual(len(expected), len(hosts) - 1)
+        self.assertEqual(normalize_hosts(iter(hosts[:10])), expected[:10])
+        self.assertEqual(normalize_hosts([]), [])
+
+    def test_batch_rejects_smuggled_separators(self):
+        self.assertEqual(normalize_hosts(["a.com\nb.com", "c.com"]), ["c.com"])
+        self.assertEqual(normalize_hosts(["a.com", ""]), ["a.com"])
+
+    def test_sanitize_drops_wildcards(self):
+        self.assertEqual(sanitize_hosts(["A.com.", "*.b.com", "c.com"]), ["a.com", "c.com"])
+
+
+class TestConfigNormalisation(unittest.TestCase):
+    def test_spellings_of_one_name_are_one_entry(self):
+        config = Config(groups={
+            "a": BlockGroup(on=True, hosts=["MC.Yandex.ru", "mc.yandex.ru.", "реклама.рф", "*.Tracker.ru"]),
+        })
+        self.assertEqual(set(config.index.blocked), {"mc.yandex.ru", "xn--80aanufhx.xn--p1ai"})
+        self.assertTrue(config.is_blocked("x.tracker.ru"))
+
+        report = lint_config(config)
+        self.assertEqual(report.groups["a"].duplicates, ["mc.yandex.ru."])
+        self.assertEqual(report.normalised, 3)
+        self.assertEqual(minimise_config(config), 1)
+        self.assertEqual(config.groups["a"].hosts, ["mc.yandex.ru", "xn--80aanufhx.xn--p1ai", "*.tracker.ru"])
+        self.assertFalse(lint_config(config))
+
+
+if __name__ == "__main__":
+    unittest.main()
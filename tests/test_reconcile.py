@@ -0,0 +1,149 @@
+"""Tests for the background initial reconciliation."""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config, save_config
+from blocker.hosts import BLOCK_IP, HostsManager
+from blocker.lint import lint_config
+from blocker.reconcile import BackgroundReconciler, Progress
+from blocker.writer import HostsWriter
+
+
+class TestBackgroundReconciler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.hosts_path = os.path.join(self.temp_dir, "hosts")
+        with open(self.hosts_path, "w", encoding="utf-8") as f:
+            f.write("127.0.0.1 localhost\n")
+        self.manager = HostsManager(self.hosts_path)
+        self.writer = HostsWriter(self.manager, window=0.05)
+        self.config = Config(groups={
+            "a": BlockGroup(on=True, hosts=["a.com", "a.com"]),
+            "b": BlockGroup(on=False, hosts=["b.com"]),
+        }, hosts_format={"aliases": 4})
+
+    def tearDown(self):
+        self.writer.close()
+        shutil.rmtree(self.temp_dir)
+
+    def read(self):
+        with open(self.hosts_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_reconciles_and_reports_progress(self):
+        phases = []
+        reconciler = BackgroundReconciler(None, self.manager, self.writer, loader=lambda path: self.config)
+        original = reconciler._set_phase
+        reconciler._set_phase = lambda phase, *args: (phases.append(phase), original(phase, *args))
+        reconciler.start()
+        self.assertTrue(reconciler.wait(10))
+        self.assertTrue(reconciler.ok)
+        self.assertIs(reconciler.config, self.config)
+        self.assertEqual(self.manager.hosts_format.aliases, 4)
+        self.assertIn(f"{BLOCK_IP} a.com", self.read())
+        self.assertEqual(phases[:2], ["loading config", "indexing groups"])
+        self.assertIn("writing hosts file", phases)
+        progress = reconciler.progress
+        self.assertTrue(progress.finished)
+        self.assertTrue(progress.describe().startswith("Hosts file in sync"))
+        # The duplicate entry of group "a" is reported, not fatal
+        self.assertEqual(len(reconciler.hints), 1)
+
+    def test_toggle_during_reconciliation_is_merged(self):
+        release = threading.Event()
+
+        def loader(path):
+            release.wait(10)
+            return self.config
+
+        reconciler = BackgroundReconciler(None, self.manager, self.writer, loader=loader).start()
+        # The menu is up while the worker is still loading
+        self.assertIsNone(reconciler.wait_ready(0))
+        self.assertFalse(reconciler.progress.finished)
+        toggler = threading.Thread(target=reconciler.toggle, args=("b",))
+        toggler.start()
+        release.set()
+        toggler.join(10)
+        self.assertTrue(reconciler.wait(10))
+        self.assertTrue(self.writer.flush(10))
+        # Four names per line, as configured
+        self.assertIn(f"{BLOCK_IP} a.com b.com\n", self.read())
+
+    def test_toggle_right_after_ready_is_not_lost(self):
+        toggled = threading.Event()
+        submit, submit_hosts = self.writer.submit, self.writer.submit_hosts
+
+        def late_submit_hosts(desired):
+            # Give a toggle the chance to slip in before the snapshot is queued
+            toggled.wait(0.5)
+            return submit_hosts(desired)
+
+        self.writer.submit = lambda delta: (toggled.set(), submit(delta))[1]
+        self.writer.submit_hosts = late_submit_hosts
+        reconciler = BackgroundReconciler(None, self.manager, self.writer, loader=lambda path: self.config)
+        toggler = threading.Thread(target=reconciler.toggle, args=("b",))
+        toggler.start()
+        reconciler.start()
+        toggler.join(10)
+        self.assertTrue(reconciler.wait(10))
+        self.assertTrue(self.writer.flush(10))
+        self.assertTrue(self.config.groups["b"].on)
+        self.assertIn("b.com", self.read())
+
+    def test_lint_does_not_block_toggles_or_load_shards(self):
+        config_path = os.path.join(self.temp_dir, "config.json")
+        self.config.sharded = True
+        save_config(self.config, config_path)
+        linting, release = threading.Event(), threading.Event()
+
+        def slow_lint(config, loaded_only=False):
+            self.assertTrue(loaded_only)
+            linting.set()
+            release.wait(10)
+            return lint_config(config, loaded_only)
+
+        with unittest.mock.patch("blocker.reconcile.lint_config", slow_lint):
+            reconciler = BackgroundReconciler(config_path, self.manager, self.writer).start()
+            self.assertTrue(linting.wait(10))
+            config = reconciler.wait_ready()
+            self.assertFalse(config.groups["b"].hosts.loaded)
+            # The toggle goes through while the lint is still running
+            toggler = threading.Thread(target=reconciler.toggle, args=("a",))
+            toggler.start()
+            toggler.join(10)
+            self.assertFalse(toggler.is_alive())
+            release.set()
+            self.assertTrue(reconciler.wait(10))
+        self.assertEqual(len(reconciler.hints), 1)
+
+    def test_load_failure_is_reported(self):
+        def loader(path):
+            raise ValueError("broken config")
+
+        reconciler = BackgroundReconciler(None, self.manager, self.writer, loader=loader).start()
+        self.assertTrue(reconciler.wait(10))
+        self.assertIsNone(reconciler.wait_ready())
+        self.assertFalse(reconciler.ok)
+        self.assertIn("broken config", reconciler.progress.describe())
+        with self.assertRaises(RuntimeError):
+            reconciler.toggle("a")
+        self.assertEqual(self.read(), "127.0.0.1 localhost\n")
+
+    def test_progress_eta(self):
+        progress = Progress(phase="writing hosts file", done=50, total=100)
+        progress.phase_started -= 2
+        self.assertAlmostEqual(progress.eta, 2, delta=0.5)
+        self.assertIn("50/100", progress.describe())
+        self.assertIsNone(Progress(total=10).eta)
+
+
+if __name__ == "__main__":
+    unittest.main()
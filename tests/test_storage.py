@@ -0,0 +1,97 @@
+"""Tests for the sharded config layout."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, convert_to_sharded, get_blocked_hosts, load_config, save_config
+from blocker.storage import ShardHosts, shard_dir, shard_name
+from blocker.store import DomainStore
+
+
+class TestShardedLayout(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, "config.json")
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            json.dump({"groups": {
+                "on": {"on": True, "description": "On", "hosts": ["a.com", "b.com"]},
+                "off/group": {"on": False, "description": "Off", "hosts": ["c.com"]},
+            }}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def shard(self, name):
+        return os.path.join(shard_dir(self.config_path), name)
+
+    def test_convert_writes_index_and_shards(self):
+        convert_to_sharded(self.config_path)
+        with open(self.config_path, encoding="utf-8") as f:
+            index = json.load(f)
+        self.assertEqual(index["layout"], "sharded")
+        self.assertNotIn("hosts", index["groups"]["on"])
+        self.assertEqual(index["groups"]["off/group"]["shard"], os.path.join("config.groups", "off_group.hosts"))
+        with open(self.shard("on.hosts"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "a.com\nb.com\n")
+
+    def test_shards_load_lazily(self):
+        convert_to_sharded(self.config_path)
+        os.remove(os.path.join(self.temp_dir, "config.cache"))
+        config = load_config(self.config_path)
+        self.assertEqual(set(get_blocked_hosts(config)), {"a.com", "b.com"})
+        off = config.groups["off/group"].hosts
+        self.assertIsInstance(off, ShardHosts)
+        self.assertFalse(off.loaded)
+        self.assertEqual(len(off), 1)
+        self.assertFalse(off.loaded)
+        self.assertEqual(list(off), ["c.com"])
+
+    def test_wildcard_group_leaves_disabled_shards_unread(self):
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            json.dump({"groups": {
+                "wild": {"on": False, "hosts": ["*.tracker.com"]},
+                "on": {"on": True, "hosts": ["x.tracker.com"]},
+                "off/group": {"on": False, "hosts": ["y.tracker.com"]},
+            }}, f)
+        convert_to_sharded(self.config_path)
+        os.remove(os.path.join(self.temp_dir, "config.cache"))
+        config = load_config(self.config_path)
+        delta = config.toggle_group("wild")
+        self.assertFalse(config.groups["off/group"].hosts.loaded)
+        self.assertEqual(delta.added, set())
+        self.assertEqual(set(config.index.hosts_of("wild")), {"x.tracker.com"})
+
+    def test_toggle_rewrites_only_index(self):
+        convert_to_sharded(self.config_path)
+        config = load_config(self.config_path)
+        os.utime(self.shard("on.hosts"), ns=(0, 0))
+        config.toggle_group("off/group")
+        save_config(config, self.config_path)
+        self.assertEqual(os.stat(self.shard("on.hosts")).st_mtime_ns, 0)
+        self.assertTrue(load_config(self.config_path).groups["off/group"].on)
+
+    def test_new_groups_get_shards(self):
+        convert_to_sharded(self.config_path)
+        config = load_config(self.config_path)
+        config.groups["off_group"] = BlockGroup(hosts=DomainStore.from_hosts(["x.com"]))
+        save_config(config, self.config_path)
+        self.assertTrue(os.path.exists(self.shard("off_group_2.hosts")))
+        os.remove(os.path.join(self.temp_dir, "config.cache"))
+        loaded = load_config(self.config_path).groups["off_group"].hosts
+        self.assertIsInstance(loaded.hosts(), DomainStore)
+        self.assertEqual(list(loaded), ["x.com"])
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("a/b", set()), "a_b.hosts")
+        self.assertEqual(shard_name("a/b", {"a_b.hosts"}), "a_b_2.hosts")
+        self.assertEqual(shard_name("..", set()), "group.hosts")
+
+
+if __name__ == "__main__":
+    unittest.main()
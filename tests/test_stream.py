@@ -0,0 +1,203 @@
+"""Tests for the memory-mapped streaming hosts-file model."""
+
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker import stream
+from blocker.fileio import atomic_replace
+from blocker.hosts import BLOCK_IP, STREAM_THRESHOLD, HostsFile, HostsFormat, HostsManager
+from blocker.metrics import Metrics
+from blocker.stream import MappedHostsFile
+
+SAMPLES = {
+    "plain": "127.0.0.1 localhost\n::1 localhost\n",
+    "no trailing newline": "127.0.0.1 localhost\n10.0.0.1 nas",
+    "crlf legacy": f"127.0.0.1 localhost\r\n{BLOCK_IP} old.com\r\n  {BLOCK_IP}\tindented.com\r\n# {BLOCK_IP} comment.com\r\n",
+    "section in the middle": (
+        "127.0.0.1 localhost\n# BEGIN RUBlocker84 sha256=bogus\n"
+        f"{BLOCK_IP} a.com\n{BLOCK_IP} b.com\n# END RUBlocker84\n10.0.0.1 nas\n{BLOCK_IP} late.com\n"
+    ),
+    "unterminated section": f"127.0.0.1 localhost\n# BEGIN RUBlocker84\n{BLOCK_IP} a.com\n",
+    "stray begin before section": (
+        "# BEGIN RUBlocker84 sha256=old\n10.0.0.1 nas\n# BEGIN RUBlocker84 sha256=bogus\n"
+        f"{BLOCK_IP} a.com\n# END RUBlocker84\n"
+    ),
+    "hand-edited section": (
+        f"127.0.0.1 localhost\n# BEGIN RUBlocker84 sha256=bogus\n{BLOCK_IP} a.com\n"
+        "10.1.1.1 tracker.com\n# note\n# END RUBlocker84\n"
+    ),
+    "foreign conflict": "10.1.1.1 Tracker.com a.com\n127.0.0.1 localhost\n",
+}
+
+
+class TestMappedHostsFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "hosts")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, content):
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+
+    def assertSameModel(self, content, change, hosts_format=HostsFormat()):
+        self.write(content)
+        expected = HostsFile.parse(content, hosts_format)
+        mapped = MappedHostsFile(self.path, hosts_format)
+        self.assertEqual(mapped.hosts(), expected.hosts())
+        self.assertEqual(mapped.newline, expected.newline)
+        self.assertEqual(mapped.lines_scanned, expected.lines_scanned)
+        self.assertEqual(list(mapped.entries()), list(expected.entries()))
+        for model in (expected, mapped):
+            model.migrate()
+            change(model)
+        self.assertEqual(mapped.changed, expected.changed)
+        self.assertEqual(mapped.conflicts({"a.com", "tracker.com"}), expected.conflicts({"a.com", "tracker.com"}))
+        self.assertEqual(mapped.render(), expected.render())
+
+    def test_matches_in_memory_model(self):
+        changes = {
+            "add": lambda model: model.add_all({"new.com", "a.com"}),
+            "remove": lambda model: [model.remove(host) for host in ("a.com", "old.com", "late.com")],
+            "prune all": lambda model: model.prune(set()),
+            "nothing": lambda model: None,
+        }
+        for name, content in SAMPLES.items():
+            for change_name, change in changes.items():
+                with self.subTest(sample=name, change=change_name):
+                    self.assertSameModel(content, change)
+        with self.subTest("compact format"):
+            self.assertSameModel(SAMPLES["section in the middle"], changes["add"], HostsFormat.compact(ipv6=True))
+
+    def test_legacy_lines_kept_until_removed(self):
+        content = SAMPLES["crlf legacy"]
+        self.write(content)
+        mapped = MappedHostsFile(self.path)
+        self.assertEqual(mapped.legacy_hosts, {"old.com", "indented.com"})
+        mapped.add("new.com")
+        expected = HostsFile.parse(content)
+        expected.add("new.com")
+        self.assertEqual(mapped.render(), expected.render())
+
+    def test_write_commit_and_rewrite(self):
+        self.write(SAMPLES["section in the middle"])
+        mapped = MappedHostsFile(self.path)
+        mapped.remove("late.com")
+        mapped.add("c.com")
+        with atomic_replace(self.path) as f:
+            mapped.write_to(f)
+        mapped.commit()
+        self.assertFalse(mapped.changed)
+        # The committed offsets describe the new file exactly
+        fresh = MappedHostsFile(self.path)
+        self.assertEqual(fresh.hosts(), mapped.hosts())
+        self.assertEqual(fresh.render(), mapped.render())
+        self.assertFalse(fresh.changed)
+
+    def test_stale_model_is_not_written(self):
+        self.write(SAMPLES["plain"])
+        mapped = MappedHostsFile(self.path)
+        mapped.add("a.com")
+        self.write(SAMPLES["plain"] + "10.0.0.9 other\n")
+        with self.assertRaises(RuntimeError):
+            mapped.render()
+
+    def test_matches_across_windows(self):
+        # Entries straddling window boundaries must still be found
+        old_window = stream.WINDOW
+        stream.WINDOW = 4096
+        try:
+            lines = ["127.0.0.1 localhost\n"]
+            for i in range(3000):
+                lines.append(f"{BLOCK_IP} legacy{i}.com\n" if i % 7 == 0 else f"10.0.{i % 256}.1 host{i}.lan\n")
+            content = "".join(lines)
+            self.assertSameModel(content, lambda model: model.add_all({"new.com"}))
+        finally:
+            stream.WINDOW = old_window
+
+
+class TestStreamingManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "hosts")
+        self.manager = HostsManager(self.path, metrics=Metrics())
+        self.manager.stream_threshold = 1
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self):
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def test_update_group_streams_large_file(self):
+        foreign = "".join(f"10.{i % 256}.0.1 host{i}.lan\n" for i in range(200_000))
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(foreign)
+        size = os.path.getsize(self.path)
+        tracemalloc.start()
+        try:
+            self.assertTrue(self.manager.update_group(["a.com", "b.com"], enable=True))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Peak stays at a few windows, far below the file size
+        self.assertLess(peak, 4 * stream.WINDOW)
+        self.assertGreater(size, 2 * peak)
+        content = self.read()
+        self.assertTrue(content.startswith(foreign))
+        self.assertIn(f"{BLOCK_IP} a.com\n", content)
+
+        # The committed model is reused for the next update
+        self.assertTrue(self.manager.update_group(["a.com"], enable=False))
+        self.assertTrue(self.manager.last_stats.parse_cached)
+        self.assertNotIn("a.com", self.read())
+        self.assertIn(f"{BLOCK_IP} b.com\n", self.read())
+
+    def test_truncated_section_in_large_file_keeps_foreign_lines(self):
+        manager = HostsManager(self.path, metrics=Metrics())
+        foreign = "".join(f"10.{i % 256}.{i // 256 % 256}.1 host{i}.lan\n" for i in range(800_000))
+        content = f"127.0.0.1 localhost\n# BEGIN RUBlocker84 sha256=abc\n{BLOCK_IP} old.com\n{foreign}"
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content)
+        self.assertGreaterEqual(os.path.getsize(self.path), STREAM_THRESHOLD)
+        self.assertTrue(manager.update_group(["a.com"], enable=True))
+        self.assertGreater(manager.last_stats.bytes_read, 0)
+        written = self.read()
+        # The legacy entry moves into the new section; everything else stays
+        self.assertTrue(written.startswith(content.replace(f"{BLOCK_IP} old.com\n", "")))
+        self.assertEqual(MappedHostsFile(self.path).hosts(), {"a.com", "old.com"})
+
+    def test_many_legacy_lines_in_large_file(self):
+        manager = HostsManager(self.path, metrics=Metrics())
+        legacy = "".join(f"{BLOCK_IP} legacy{i}.example.com\n" for i in range(150_000))
+        foreign = "".join(f"10.{i % 256}.0.1 host{i}.lan\n" for i in range(600_000))
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(f"127.0.0.1 localhost\n{legacy}{foreign}")
+        self.assertGreaterEqual(os.path.getsize(self.path), STREAM_THRESHOLD)
+        start = time.perf_counter()
+        self.assertTrue(manager.update_group(["a.com"], enable=True))
+        # Every legacy hit used to search a whole window for the begin marker again
+        self.assertLess(time.perf_counter() - start, 10)
+        hosts = MappedHostsFile(self.path).hosts()
+        self.assertEqual(len(hosts), 150_001)
+        self.assertIn("legacy149999.example.com", hosts)
+
+    def test_empty_file_is_read_in_memory(self):
+        with open(self.path, "w", encoding="utf-8"):
+            pass
+        self.assertTrue(self.manager.update_group(["a.com"], enable=True))
+        self.assertIn(f"{BLOCK_IP} a.com\n", self.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Tests for the domain suffix trie and wildcard groups."""
+
+import os
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config, get_blocked_hosts
+from blocker.trie import DomainTrie, expand_wildcard, reverse_host, split_hosts
+
+
+class TestDomainTrie(unittest.TestCase):
+    def test_exact_and_wildcard(self):
+        trie = DomainTrie(["mc.yandex.ru", "*.mail.ru"])
+        self.assertTrue(trie.is_blocked("mc.yandex.ru"))
+        self.assertFalse(trie.is_blocked("yandex.ru"))
+        self.assertFalse(trie.is_blocked("a.mc.yandex.ru"))
+        self.assertTrue(trie.is_blocked("top.mail.ru"))
+        self.assertTrue(trie.is_blocked("a.b.mail.ru"))
+        self.assertFalse(trie.is_blocked("mail.ru"))
+        self.assertFalse(trie.is_blocked("gmail.ru"))
+        self.assertEqual(len(trie), 2)
+
+    def test_remove_is_reference_counted(self):
+        trie = DomainTrie(["*.mail.ru", "*.mail.ru"])
+        self.assertTrue(trie.remove("*.mail.ru"))
+        self.assertIn("top.mail.ru", trie)
+        self.assertTrue(trie.remove("*.mail.ru"))
+        self.assertNotIn("top.mail.ru", trie)
+        self.assertFalse(trie.remove("*.mail.ru"))
+        self.assertEqual(len(trie), 0)
+
+    def test_split_and_expand(self):
+        concrete, patterns = split_hosts(["a.ru", "*.b.ru", "*.bad/", "bad/"])
+        self.assertEqual((concrete, patterns), (["a.ru"], ["*.b.ru"]))
+        known = sorted(reverse_host(h) for h in ["x.b.ru", "b.ru", "y.z.b.ru", "bb.ru"])
+        self.assertEqual(sorted(expand_wildcard("*.b.ru", known)), ["x.b.ru", "y.z.b.ru"])
+
+
+class TestWildcardGroups(unittest.TestCase):
+    def test_wildcards_expand_to_known_names(self):
+        config = Config(groups={
+            "wild": BlockGroup(on=True, hosts=["*.yandex.ru"]),
+            "list": BlockGroup(on=False, hosts=["mc.yandex.ru", "yandex.ru", "vk.com"]),
+        })
+        self.assertEqual(set(get_blocked_hosts(config)), {"mc.yandex.ru"})
+        self.assertTrue(config.is_blocked("anything.yandex.ru"))
+        self.assertFalse(config.is_blocked("yandex.ru"))
+
+        delta = config.toggle_group("list")
+        self.assertEqual(delta.added, {"yandex.ru", "vk.com"})
+        delta = config.toggle_group("wild")
+        self.assertEqual(delta.removed, set())
+        self.assertFalse(config.is_blocked("anything.yandex.ru"))
+        delta = config.toggle_group("list")
+        self.assertEqual(delta.removed, {"mc.yandex.ru", "yandex.ru", "vk.com"})
+
+
+if __name__ == "__main__":
+    unittest.main()
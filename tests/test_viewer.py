@@ -0,0 +1,56 @@
+"""Tests for the blocked-hosts viewer."""
+
+import os
+import unittest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocker.config import BlockGroup, Config
+from blocker.viewer import BlockedHostsView, SortedHosts
+
+
+class TestSortedHosts(unittest.TestCase):
+    def setUp(self):
+        self.hosts = SortedHosts([f"h{i}.example.com" for i in range(1000)] + ["mc.yandex.ru"])
+
+    def test_pages(self):
+        everything = self.hosts.all()
+        self.assertEqual(everything.pages(20), 51)
+        self.assertEqual(everything.page(0, 3), ["h0.example.com", "h1.example.com", "h10.example.com"])
+        self.assertEqual(everything.page(50, 20), ["mc.yandex.ru"])
+        self.assertEqual(everything.page(99, 20), [])
+
+    def test_prefix(self):
+        self.assertEqual(list(self.hosts.prefix("h99")), [f"h{i}.example.com" for i in [99, 990, 991, 992, 993, 994, 995, 996, 997, 998, 999]])
+        self.assertEqual(len(self.hosts.prefix("zz")), 0)
+
+    def test_substring(self):
+        self.assertEqual(list(self.hosts.substring("yandex")), ["mc.yandex.ru"])
+        self.assertEqual(len(self.hosts.substring("99")), sum("99" in str(i) for i in range(1000)))
+        # Dense queries take the scan-everything path
+        self.assertEqual(len(self.hosts.substring(".com")), 1000)
+        self.assertEqual(len(self.hosts.substring("\n")), 0)
+
+
+class TestBlockedHostsView(unittest.TestCase):
+    def test_groups_and_refresh(self):
+        config = Config(groups={
+            "lite": BlockGroup(on=True, hosts=["a.com", "mc.yandex.ru"]),
+            "full": BlockGroup(on=True, hosts=["a.com", "b.com", "*.yandex.ru"]),
+            "off": BlockGroup(on=False, hosts=["c.com"]),
+        })
+        view = BlockedHostsView(config)
+        self.assertEqual(list(view.search()), ["a.com", "b.com", "mc.yandex.ru"])
+        self.assertEqual(list(view.search(group="lite")), ["a.com", "mc.yandex.ru"])
+        self.assertEqual(view.groups_blocking("a.com"), ["full", "lite"])
+        self.assertEqual(view.groups_blocking("x.yandex.ru"), ["full"])
+        self.assertEqual(view.groups_blocking("c.com"), [])
+
+        config.toggle_group("off")
+        self.assertEqual(list(view.search("c", prefix=True)), ["c.com"])
+        self.assertEqual(list(view.search(group="off")), ["c.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""Tests for the coalescing hosts writer, file locking and atomic writes."""
+
+import errno
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import textwrap
+import unittest
+import unittest.mock
+
+import sys
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from blocker.config import BlockGroup, Config, HostDelta
+from blocker.fileio import atomic_write, file_lock
+from blocker.hosts import BLOCK_IP, HostsManager
+from blocker.metrics import Metrics
+from blocker.writer import HostsWriter
+
+
+class TestHostsWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.hosts_path = os.path.join(self.temp_dir, "hosts")
+        with open(self.hosts_path, "w", encoding="utf-8") as f:
+            f.write("127.0.0.1 localhost\n")
+        self.metrics = Metrics()
+        self.manager = HostsManager(self.hosts_path, metrics=self.metrics)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self):
+        with open(self.hosts_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_burst_of_toggles_is_one_write(self):
+        config = Config(groups={
+            "a": BlockGroup(on=False, hosts=["a.com"]),
+            "b": BlockGroup(on=False, hosts=["b.com"]),
+        })
+        writer = HostsWriter(self.manager, window=0.2)
+        try:
+            futures = [writer.submit(config.toggle_group(name)) for name in ("a", "b", "a", "a")]
+            self.assertTrue(writer.flush(5))
+        finally:
+            writer.close()
+        self.assertTrue(all(future.result() for future in futures))
+        self.assertEqual(writer.batches, 1)
+        self.assertEqual(self.metrics.snapshot()["apply_delta"]["totals"]["count"], 1)
+        content = self.read()
+        self.assertIn(f"{BLOCK_IP} a.com\n", content)
+        self.assertIn(f"{BLOCK_IP} b.com\n", content)
+
+    def test_config_supersedes_earlier_deltas(self):
+        config = Config(groups={"g": BlockGroup(on=True, hosts=["g.com"])})
+        writer = HostsWriter(self.manager, window=0.05)
+        writer.submit(HostDelta(added={"stale.com"}))
+        writer.submit_config(config)
+        writer.close()
+        content = self.read()
+        self.assertIn(f"{BLOCK_IP} g.com\n", content)
+        self.assertNotIn("stale.com", content)
+        with self.assertRaises(RuntimeError):
+            writer.submit(HostDelta())
+
+    def test_delta_merge_later_wins(self):
+        delta = HostDelta(added={"a.com", "b.com"}, removed={"c.com"})
+        delta.merge(HostDelta(added={"c.com"}, removed={"a.com"}))
+        self.assertEqual(delta, HostDelta(added={"b.com", "c.com"}, removed={"a.com"}))
+
+    def test_concurrent_processes_do_not_lose_updates(self):
+        script = textwrap.dedent(f"""
+            import sys
+            sys.path.insert(0, {ROOT!r})
+            from blocker.hosts import HostsManager
+            manager = HostsManager({self.hosts_path!r})
+            for i in range(20):
+                manager.update_group([f"p{{sys.argv[1]}}-{{i}}.com"], enable=True)
+        """)
+        procs = [subprocess.Popen([sys.executable, "-c", script, str(n)]) for n in range(3)]
+        for proc in procs:
+            self.assertEqual(proc.wait(60), 0)
+        content = self.read()
+        for n in range(3):
+            for i in range(20):
+                self.assertIn(f"{BLOCK_IP} p{n}-{i}.com\n", content)
+
+
+class TestFileIO(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "hosts")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_lock_times_out_while_held(self):
+        with file_lock(self.path):
+            with self.assertRaises(TimeoutError):
+                with file_lock(self.path, timeout=0.05):
+                    pass
+        with file_lock(self.path, timeout=0.05):
+            pass
+
+    @unittest.skipIf(os.name == "nt", "POSIX permissions")
+    def test_atomic_write_keeps_mode(self):
+        with open(self.path, "w") as f:
+            f.write("old\n")
+        os.chmod(self.path, 0o640)
+        atomic_write(self.path, b"new\n")
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"new\n")
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+        self.assertEqual(os.listdir(self.temp_dir), ["hosts"])
+
+    @unittest.skipIf(os.name == "nt", "symlinks need privileges on Windows")
+    def test_atomic_write_keeps_symlink(self):
+        target = os.path.join(self.temp_dir, "real-hosts")
+        with open(target, "w") as f:
+            f.write("old\n")
+        os.symlink(target, self.path)
+        with file_lock(self.path):
+            atomic_write(self.path, b"new\n")
+        self.assertTrue(os.path.islink(self.path))
+        with open(target, "rb") as f:
+            self.assertEqual(f.read(), b"new\n")
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["hosts", "real-hosts", "real-hosts.lock"])
+
+    def test_busy_target_is_rewritten_in_place(self):
+        with open(self.path, "w") as f:
+            f.write("old content that is longer\n")
+        inode = os.stat(self.path).st_ino
+        for code in (errno.EBUSY, errno.EXDEV):
+            with self.subTest(errno=errno.errorcode[code]):
+                with unittest.mock.patch("blocker.fileio.os.replace", side_effect=OSError(code, "busy")):
+                    atomic_write(self.path, b"new\n")
+                with open(self.path, "rb") as f:
+                    self.assertEqual(f.read(), b"new\n")
+                self.assertEqual(os.stat(self.path).st_ino, inode)
+                self.assertEqual(os.listdir(self.temp_dir), ["hosts"])
+        with unittest.mock.patch("blocker.fileio.os.replace", side_effect=OSError(errno.EACCES, "denied")):
+            with self.assertRaises(OSError):
+                atomic_write(self.path, b"other\n")
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"new\n")
+
+
+if __name__ == "__main__":
+    unittest.main()